@@ -0,0 +1,211 @@
+# src/tenantsec/app/dataset_graph.py
+from __future__ import annotations
+import threading, time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from tenantsec.app import event_bus, job_runner
+
+
+@dataclass
+class Node:
+    """One dataset: fn() produces it once all `inputs` have finished."""
+    name: str
+    fn: Callable[[], Any]
+    inputs: Tuple[str, ...] = ()
+    cost: float = 1.0          # rough relative cost (≈ Graph pages)
+    priority: int = 0          # tie-breaker; higher runs first among equal ranks
+    on_done: Optional[Callable[[Any, Optional[BaseException]], None]] = None
+    # filled in by the scheduler
+    rank: float = 0.0
+    status: str = "pending"    # pending | running | done | failed
+    result: Any = None
+    error: Optional[BaseException] = None
+    elapsed: float = 0.0
+    dependents: List[str] = field(default_factory=list)
+
+
+class DatasetGraph:
+    """
+    Declarative dataset DAG run on the shared job pool.
+
+    Ready nodes are started in critical-path order (rank = own cost + the
+    most expensive chain of dependents), at most `max_parallel` at a time,
+    so long chains are never stuck behind cheap leaves. A node runs after its inputs
+    finish even if one failed: datasets read whatever is cached. Adding the
+    same name twice returns the existing node, so shared fetches run once.
+
+    Progress is published per node on "datasets.node" and once on
+    "datasets.graph.done".
+    """
+
+    def __init__(self, tenant_id: str, *, max_parallel: Optional[int] = None):
+        self.tenant_id = tenant_id
+        self.max_parallel = max(1, max_parallel or job_runner.MAX_WORKERS)
+        self.nodes: Dict[str, Node] = {}
+        self._lock = threading.Lock()
+        self._waiting: Dict[str, int] = {}
+        self._running = 0
+        self._finished = 0
+        self._started_at = 0.0
+        self._on_complete: Optional[Callable[[DatasetGraph], None]] = None
+
+    # ---------- declaration ----------
+    def add(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        inputs: Tuple[str, ...] | List[str] = (),
+        cost: float = 1.0,
+        priority: int = 0,
+        on_done: Optional[Callable[[Any, Optional[BaseException]], None]] = None,
+    ) -> Node:
+        if name in self.nodes:
+            return self.nodes[name]
+        node = Node(name=name, fn=(lambda: fn(*args)) if args else fn,
+                    inputs=tuple(inputs), cost=cost, priority=priority, on_done=on_done)
+        self.nodes[name] = node
+        return node
+
+    def select(self, names: Iterable[str]) -> List[str]:
+        """
+        Keep only `names` (plus everything they transitively need; "*" keeps
+        all) and drop the rest. Returns the dropped node names.
+        """
+        names = list(names)
+        if "*" in names:
+            return []
+        keep: set = set()
+        stack = [n for n in names if n in self.nodes]
+        while stack:
+            k = stack.pop()
+            if k not in keep:
+                keep.add(k)
+                stack.extend(self.nodes[k].inputs)
+        dropped = [k for k in self.nodes if k not in keep]
+        for k in dropped:
+            del self.nodes[k]
+        return dropped
+
+    def estimated_cost(self) -> float:
+        """Sum of node costs (≈ Graph requests) for the graph as declared."""
+        return sum(n.cost for n in self.nodes.values())
+
+    def _prepare(self) -> None:
+        for n in self.nodes.values():
+            n.dependents = []
+        for n in self.nodes.values():
+            for i in n.inputs:
+                if i not in self.nodes:
+                    raise KeyError(f"dataset '{n.name}' depends on unknown '{i}'")
+                self.nodes[i].dependents.append(n.name)
+
+        # upward rank in reverse topological order; also rejects cycles
+        order: List[str] = []
+        indeg = {k: len(n.inputs) for k, n in self.nodes.items()}
+        ready = [k for k, d in indeg.items() if d == 0]
+        while ready:
+            k = ready.pop()
+            order.append(k)
+            for d in self.nodes[k].dependents:
+                indeg[d] -= 1
+                if indeg[d] == 0:
+                    ready.append(d)
+        if len(order) != len(self.nodes):
+            raise ValueError("dataset graph has a cycle: " + ", ".join(k for k, d in indeg.items() if d))
+        for k in reversed(order):
+            n = self.nodes[k]
+            n.rank = n.cost + max((self.nodes[d].rank for d in n.dependents), default=0.0)
+
+        self._waiting = {k: len(n.inputs) for k, n in self.nodes.items()}
+
+    def critical_path(self) -> List[str]:
+        """Longest-cost chain through the graph (after run() or _prepare())."""
+        roots = [n for n in self.nodes.values() if not n.inputs]
+        path: List[str] = []
+        cur = max(roots, key=lambda n: n.rank, default=None)
+        while cur is not None:
+            path.append(cur.name)
+            cur = max((self.nodes[d] for d in cur.dependents), key=lambda n: n.rank, default=None)
+        return path
+
+    # ---------- execution ----------
+    def run(self, on_complete: Optional[Callable[[DatasetGraph], None]] = None) -> None:
+        """Start the graph in the background; on_complete(graph) runs after the last node."""
+        self._prepare()
+        self._on_complete = on_complete
+        self._started_at = time.monotonic()
+        if not self.nodes:
+            self._complete()
+            return
+        self._dispatch()
+
+    def _ready(self) -> List[Node]:
+        return [n for k, n in self.nodes.items() if n.status == "pending" and self._waiting[k] == 0]
+
+    def _dispatch(self) -> None:
+        to_start: List[Node] = []
+        with self._lock:
+            ready = sorted(self._ready(), key=lambda n: (-n.rank, -n.priority, n.name))
+            for n in ready:
+                if self._running >= self.max_parallel:
+                    break
+                n.status = "running"
+                self._running += 1
+                to_start.append(n)
+        for n in to_start:
+            self._publish(n)
+            job_runner.submit_job(self._run_node, n)
+
+    def _run_node(self, node: Node) -> None:
+        t0 = time.monotonic()
+        try:
+            node.result = node.fn()
+            node.status = "done"
+        except Exception as ex:
+            node.error = ex
+            node.status = "failed"
+            print(f"[dataset_graph] {node.name} failed: {ex!r}")
+        node.elapsed = time.monotonic() - t0
+
+        if node.on_done:
+            try:
+                node.on_done(node.result, node.error)
+            except Exception as ex:
+                print(f"[dataset_graph] {node.name} on_done failed: {ex!r}")
+
+        with self._lock:
+            self._running -= 1
+            self._finished += 1
+            for d in node.dependents:
+                self._waiting[d] -= 1
+            last = self._finished == len(self.nodes)
+        self._publish(node)
+        if last:
+            self._complete()
+        else:
+            self._dispatch()
+
+    def _publish(self, node: Node) -> None:
+        event_bus.publish("datasets.node", {
+            "tenant_id": self.tenant_id,
+            "node": node.name,
+            "status": node.status,
+            "elapsed": round(node.elapsed, 2),
+            "done": self._finished,
+            "total": len(self.nodes),
+        })
+
+    def _complete(self) -> None:
+        elapsed = time.monotonic() - self._started_at
+        failed = [n.name for n in self.nodes.values() if n.status == "failed"]
+        print(f"[dataset_graph] {len(self.nodes)} datasets in {elapsed:.1f}s"
+              + (f"; failed: {', '.join(failed)}" if failed else ""))
+        event_bus.publish("datasets.graph.done", {
+            "tenant_id": self.tenant_id,
+            "elapsed": round(elapsed, 2),
+            "failed": failed,
+        })
+        if self._on_complete:
+            self._on_complete(self)
@@ -1,6 +1,8 @@
 from concurrent.futures import ThreadPoolExecutor
 
-_executor = ThreadPoolExecutor(max_workers=4)
+MAX_WORKERS = 4
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
 
 def submit_job(fn, *args, **kwargs):
     """Run background work. Returns Future."""
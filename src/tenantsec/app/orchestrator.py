@@ -1,21 +1,27 @@
 # src/tenantsec/app/orchestrator.py
 from tenantsec.app import event_bus, job_runner
+from tenantsec.app.dataset_graph import DatasetGraph
 from tenantsec.core.graph_client import GraphClient
 from tenantsec.core.data_gateway import DataGateway
+from tenantsec.core.cache_manager import touch_tenant, enforce_budget
+from tenantsec.core.cache import cache_dir, read_json
+from tenantsec.config.loader import get_scan_profile
+from tenantsec.core import snapshot_diff, crawl_journal
 from tenantsec.core import (
-    user_service, org_service, policy_service, roles_service, audit_service,
-    intune_service, ca_service, exchange_service, oauth_service, org_config_service
+    user_service, org_service, policy_service, roles_service,
+    intune_service, ca_service, exchange_service, oauth_service, org_config_service,
+    group_service,
 )
 from tenantsec.review.user_scanner import run_user_checks
-from tenantsec.review.user_scanner.feed_signins import ensure_org_country_cache, build_signins_cache
+from tenantsec.review.user_scanner.feed_signins import ensure_org_country_cache, ingest_signins, refresh_signins
 #from tenantsec.review.user_scanner.feed_mail import build_mail_rules_cache
-from tenantsec.review.user_scanner.feed_signins import build_user_signins_by_user
+from tenantsec.review.user_scanner.quick_scan import run_quick_scan
 from tenantsec.http.client import (
     HttpError, UnauthorizedError, ForbiddenError, NotFoundError,
     ThrottleError, ServerError
 )
 
-import json, re
+import json, math, re
 def _users_from_findings(findings):
     users = {}
     for f in findings or []:
@@ -32,6 +38,11 @@ def _users_from_findings(findings):
                 row["issues"].append("MFA disabled")
     return {"items": list(users.values())}
 
+def _signin_opts(profile: dict) -> dict:
+    # connect and the user review must ingest with the same window and views
+    return {"days": profile["user_review_days"], "top_per_user": profile["signins_per_user"],
+            "archive_days": profile["archive_days"] or None}
+
 # orchestrator._do_user_review(): stop mailbox rules
 #build_mail_rules_cache(tenant_id, graph=graph)  # <- REMOVE this line
 '''
@@ -72,47 +83,90 @@ class Orchestrator:
             self._core_ready.add(tenant_id)
             event_bus.publish("data.core.ready", {"tenant_id": tenant_id})
 
-    def start_after_connect(self, tenant_id: str):
+    def _connect_graph(self, graph: GraphClient, tenant_id: str, profile: dict | None = None) -> DatasetGraph:
+        """
+        Datasets fetched after connect, trimmed to the scan profile. cost ~ Graph
+        requests (scaled by the cached user count where a dataset pages /users);
+        the scheduler runs the longest chain (users -> roles -> ...) first.
+        """
+        profile = profile or get_scan_profile(getattr(self.app_state, "scan_profile", None))
+        per_user = profile["per_user"]
+        g = DatasetGraph(tenant_id)
+
+        n_users = len((read_json(cache_dir(tenant_id, "Static") / "users_index.json") or {}).get("users") or [])
+        user_pages = max(1, math.ceil((n_users or 5000) / 999))
+
+        def _users_done(users, err):
+            if err is None:
+                event_bus.publish("jobs.callback.request",
+                                  lambda: event_bus.publish("users.list.ready", [u.__dict__ for u in users]))
+
+        # one /users pass feeds the index, profile, licenses/plans and sign-in activity
+        g.add("users", lambda: user_service.crawl_users(graph, tenant_id, per_user=per_user),
+              cost=user_pages + 1, priority=10, on_done=_users_done)
+        g.add("org", org_service.get_org_summary, graph, tenant_id, cost=1, priority=10)
+        g.add("core_ready", lambda: event_bus.publish(
+            "jobs.callback.request", lambda: self._maybe_publish_core_ready(tenant_id)),
+            inputs=("users", "org"), cost=0, priority=10)
+
+        # role memberships are crawled once and shared by the roles sheet and the users index
+        g.add("role_index", roles_service.role_index, graph, tenant_id, cost=3, priority=5)
+        g.add("roles", roles_service.list_directory_roles, graph, tenant_id, inputs=("role_index",), cost=0.5)
+        g.add("user_roles", user_service.enrich_roles, graph, tenant_id, inputs=("users", "role_index"), cost=0.5)
+        # roles -> admin members -> live MFA methods; the sheet join needs roles.json
+        g.add("user_mfa", lambda: user_service.enrich_auth_methods(graph, tenant_id, per_user=per_user),
+              inputs=("users", "role_index", "roles"), cost=user_pages + (2 if per_user else 0))
+
+        g.add("policies", policy_service.snapshot_policies, graph, tenant_id, cost=2)
+        g.add("ca", ca_service.snapshot_conditional_access, graph, tenant_id, cost=2)
+        g.add("groups", group_service.sync_groups, graph, tenant_id, cost=6)
+        g.add("skus", org_service.list_subscribed_skus, graph, tenant_id, cost=1)
+        g.add("oauth", oauth_service.snapshot_oauth_inventory, graph, tenant_id, cost=4)
+        g.add("exchange", exchange_service.snapshot_exchange_inventory, graph, tenant_id, cost=3)
+        g.add("intune", intune_service.snapshot_intune_inventory, graph, tenant_id, cost=3)
+        g.add("org_config", org_config_service.snapshot_org_config, graph, tenant_id, cost=2)
+        # catches the user review's sign-in store up past its watermark; with no
+        # watermark yet it fetches nothing and the first review does the full pass
+        g.add("recent_signins", lambda: refresh_signins(tenant_id, graph=graph, **_signin_opts(profile)),
+              cost=2, priority=-5)
+        g.add("cache_budget", lambda: enforce_budget(keep=[tenant_id]), cost=0.5, priority=-10)
+
+        g.select(profile["datasets"])
+        if "*" in profile["datasets"] or "snapshot" in profile["datasets"]:
+            static = [n for n in g.nodes if n not in ("core_ready", "recent_signins", "cache_budget")]
+            g.add("snapshot", snapshot_diff.snapshot_and_diff, tenant_id, inputs=static, cost=2, priority=-5)
+        return g
+
+    def _planned_graph(self, tenant_id: str, profile: str | None) -> tuple[DatasetGraph, dict]:
+        prof = get_scan_profile(profile or getattr(self.app_state, "scan_profile", None))
+        g = self._connect_graph(self._graph(), tenant_id, prof)
+        plan = {
+            "tenant_id": tenant_id,
+            "profile": prof["name"],
+            "datasets": sorted(g.nodes),
+            "estimated_requests": int(round(g.estimated_cost())),
+            "signin_days": prof["user_review_days"],
+        }
+        return g, plan
+
+    def plan_connect(self, tenant_id: str, profile: str | None = None) -> dict:
+        """What a connect under `profile` would fetch, and roughly how many Graph requests."""
+        return self._planned_graph(tenant_id, profile)[1]
+
+    def start_after_connect(self, tenant_id: str, profile: str | None = None):
         if tenant_id in self._started:
             return
         self._started.add(tenant_id)
+        touch_tenant(tenant_id)
+        resumable = crawl_journal.pending(tenant_id)
+        if resumable:
+            print(f"[orchestrator] resuming interrupted crawls: {', '.join(resumable)}")
 
-        graph = self._graph()
-        fut_idx = job_runner.submit_job(user_service.list_users, graph, tenant_id)
-
-        def on_users_index_done():
-            try:
-                users = fut_idx.result()
-                event_bus.publish("users.list.ready", [u.__dict__ for u in users])
-            finally:
-                for func in (
-                    user_service.enrich_profile,
-                    user_service.enrich_licenses,
-                    user_service.enrich_roles,
-                    user_service.enrich_signin_activity,
-                    user_service.enrich_mfa_state,
-                    user_service.enrich_license_details,
-                ):
-                    job_runner.submit_job(func, graph, tenant_id)
-
-                fut_org = job_runner.submit_job(org_service.get_org_summary, graph, tenant_id)
-                job_runner.submit_job(policy_service.snapshot_policies, graph, tenant_id)
-                job_runner.submit_job(roles_service.list_directory_roles, graph, tenant_id)
-                job_runner.submit_job(audit_service.list_recent_signins, graph, tenant_id)
-                job_runner.submit_job(org_service.list_subscribed_skus, graph, tenant_id)
-                job_runner.submit_job(ca_service.snapshot_conditional_access, graph, tenant_id)
-                job_runner.submit_job(oauth_service.snapshot_oauth_inventory, graph, tenant_id)
-                job_runner.submit_job(exchange_service.snapshot_exchange_inventory, graph, tenant_id)
-                job_runner.submit_job(intune_service.snapshot_intune_inventory, graph, tenant_id)
-                job_runner.submit_job(org_config_service.snapshot_org_config, graph, tenant_id)
-
-                self._maybe_publish_core_ready(tenant_id)
-                fut_org.add_done_callback(
-                    lambda _f: event_bus.publish("jobs.callback.request",
-                                                 lambda: self._maybe_publish_core_ready(tenant_id))
-                )
-
-        fut_idx.add_done_callback(lambda _f: event_bus.publish("jobs.callback.request", on_users_index_done))
+        g, plan = self._planned_graph(tenant_id, profile)
+        print(f"[orchestrator] '{plan['profile']}' scan: {len(plan['datasets'])} datasets, "
+              f"~{plan['estimated_requests']} Graph requests")
+        event_bus.publish("scan.plan", plan)
+        g.run()
 
     # === USER REVIEW PATH ===
     def start_user_review(self, tenant_id: str):
@@ -121,8 +175,10 @@ class Orchestrator:
                 "error": "App token missing (need admin-consented AuditLog.Read.All + client_secret)."})
             return
 
+        touch_tenant(tenant_id)
         graph = self._graph_app()
-        fut = job_runner.submit_job(self._do_user_review, graph, tenant_id)
+        profile = get_scan_profile(getattr(self.app_state, "scan_profile", None))
+        fut = job_runner.submit_job(self._do_user_review, graph, tenant_id, **_signin_opts(profile))
 
         def _done():
             try:
@@ -133,7 +189,8 @@ class Orchestrator:
                     "org_config": {},
                     "users": _users_from_findings(findings),
                 }
-                event_bus.publish("ai.exec.run", {"tenant_id": tenant_id, "sheets": sheets, "findings": findings})
+                if profile["ai"]:
+                    event_bus.publish("ai.exec.run", {"tenant_id": tenant_id, "sheets": sheets, "findings": findings})
                 event_bus.publish("user.review.ready", {"tenant_id": tenant_id, "findings": findings})
             except Exception as e:
                 print("[user_review] Exception:", repr(e))
@@ -142,11 +199,36 @@ class Orchestrator:
         fut.add_done_callback(lambda _f: event_bus.publish("jobs.callback.request", _done))
 
 
-    def _do_user_review(self, graph: GraphClient, tenant_id: str):
+    # === QUICK SCAN PATH (sampled estimate) ===
+    def start_quick_scan(self, tenant_id: str, *, sample_size: int | None = None):
+        if not getattr(self.app_state, "app_token", None):
+            event_bus.publish("user.quickscan.failed", {"tenant_id": tenant_id,
+                "error": "App token missing (need admin-consented AuditLog.Read.All + client_secret)."})
+            return
+
+        touch_tenant(tenant_id)
+        graph = self._graph_app()
+
+        def _run():
+            ensure_org_country_cache(tenant_id, graph=graph)
+            return run_quick_scan(graph, tenant_id, sample_size=sample_size)
+
+        fut = job_runner.submit_job(_run)
+
+        def _done():
+            try:
+                fut.result()  # run_quick_scan publishes user.quickscan.ready
+            except Exception as e:
+                print("[quick_scan] Exception:", repr(e))
+                event_bus.publish("user.quickscan.failed", {"tenant_id": tenant_id, "error": str(e)})
+
+        fut.add_done_callback(lambda _f: event_bus.publish("jobs.callback.request", _done))
+
+    def _do_user_review(self, graph: GraphClient, tenant_id: str, days: int = 30, **signin_opts):
         try:
             ensure_org_country_cache(tenant_id, graph=graph)
-            build_signins_cache(tenant_id, graph=graph, days=30)
-            build_user_signins_by_user(tenant_id, graph=graph, days=30)
+            # one sign-in pass feeds the store, the per-user view and the summary
+            ingest_signins(tenant_id, graph=graph, days=days, **signin_opts)
             #build_mail_rules_cache(tenant_id, graph=graph)
             return run_user_checks(tenant_id)
 
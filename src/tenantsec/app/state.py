@@ -5,3 +5,4 @@ class AppState:
         }
         self.tenant_name = ""
         self.token = None  # NEW: store MSAL access token for Graph
+        self.scan_profile = None  # connect-time scan profile name; None = config default
@@ -20,3 +20,100 @@ def get_http_config():
         "max_retries": int(cfg.get("max_retries", 4)),
         "max_concurrency": int(cfg.get("max_concurrency", 6)),
     }
+
+def get_cache_config():
+    cfg = load_appsettings().get("cache", {})
+    return {
+        "max_bytes": int(cfg.get("max_bytes", 2 * 1024 ** 3)),  # 0 disables eviction
+        "pinned_tenants": [str(t) for t in cfg.get("pinned_tenants", [])],
+    }
+
+def get_history_config():
+    cfg = load_appsettings().get("history", {})
+    return {
+        "keep_snapshots": int(cfg.get("keep_snapshots", 90)),  # 0 keeps everything
+    }
+
+def get_signins_config():
+    cfg = load_appsettings().get("signins", {})
+    return {
+        "slices": int(cfg.get("slices", 4)),  # concurrent createdDateTime slices per crawl
+        "min_slice_hours": float(cfg.get("min_slice_hours", 6)),  # shorter windows use fewer slices
+        "archive_days": int(cfg.get("archive_days", 90)),  # history kept in USER/signins_archive
+    }
+
+def get_burst_config():
+    cfg = load_appsettings().get("bursts", {})
+    return {
+        "bucket_minutes": float(cfg.get("bucket_minutes", 5)),
+        "window_minutes": float(cfg.get("window_minutes", 60)),
+        "spray_min_users": int(cfg.get("spray_min_users", 10)),  # one IP failing for this many users ...
+        "spray_min_failures": int(cfg.get("spray_min_failures", 15)),
+        "brute_min_ips": int(cfg.get("brute_min_ips", 5)),  # one user failing from this many IPs ...
+        "brute_min_failures": int(cfg.get("brute_min_failures", 20)),
+        "max_cells": int(cfg.get("max_cells", 500000)),  # memory bound for the bucket counters
+    }
+
+def get_geoip_config():
+    cfg = load_appsettings().get("geoip", {})
+    return {
+        "path": str(cfg.get("path", "config/geoip.csv")),  # IP range CSV with latitude/longitude
+        "max_speed_kmh": float(cfg.get("max_speed_kmh", 1000)),  # faster than an airliner
+        "min_distance_km": float(cfg.get("min_distance_km", 300)),  # below this geo-IP noise dominates
+    }
+
+def get_quick_scan_config():
+    cfg = load_appsettings().get("quick_scan", {})
+    return {
+        "sample_size": int(cfg.get("sample_size", 400)),  # ~±5% at 95% for any prevalence
+        "signin_days": int(cfg.get("signin_days", 30)),
+    }
+
+# Connect-time scan profiles. "datasets" names DatasetGraph nodes ("*" = all);
+# required inputs are pulled in automatically. "deep" keeps a year of sign-in
+# archive and more per-user history than "standard".
+_SCAN_PROFILES = {
+    "fast": {
+        "datasets": ["users", "org", "core_ready", "user_roles", "roles", "policies", "ca", "skus", "cache_budget"],
+        "user_review_days": 7, "per_user": False, "ai": False,
+    },
+    "standard": {
+        "datasets": ["*"],
+        "user_review_days": 30, "per_user": True, "ai": True,
+    },
+    "deep": {
+        "datasets": ["*"],
+        "user_review_days": 30, "per_user": True, "ai": True,
+        "archive_days": 365, "signins_per_user": 1000,
+    },
+    "user-only": {
+        "datasets": ["users", "org", "core_ready", "user_roles", "user_mfa", "recent_signins", "cache_budget"],
+        "user_review_days": 30, "per_user": True, "ai": True,
+    },
+}
+
+def get_scan_config():
+    cfg = load_appsettings().get("scan", {})
+    profiles = {k: dict(v) for k, v in _SCAN_PROFILES.items()}
+    for name, over in (cfg.get("profiles") or {}).items():
+        profiles.setdefault(name, dict(_SCAN_PROFILES["standard"])).update(over or {})
+    default = str(cfg.get("default_profile", "standard"))
+    return {
+        "default_profile": default if default in profiles else "standard",
+        "profiles": profiles,
+    }
+
+def get_scan_profile(name=None):
+    """Resolved profile dict (with its "name"); unknown names fall back to the default."""
+    cfg = get_scan_config()
+    name = name if name in cfg["profiles"] else cfg["default_profile"]
+    p = cfg["profiles"][name]
+    return {
+        "name": name,
+        "datasets": list(p.get("datasets") or ["*"]),
+        "user_review_days": int(p.get("user_review_days", 30)),
+        "archive_days": int(p.get("archive_days", 0)),          # 0 = signins.archive_days
+        "signins_per_user": int(p.get("signins_per_user", 200)),
+        "per_user": bool(p.get("per_user", True)),
+        "ai": bool(p.get("ai", True)),
+    }
@@ -1,6 +1,4 @@
 from __future__ import annotations
-from datetime import datetime, timedelta, timezone
-from tenantsec.core.graph_client import GraphClient
 from tenantsec.core.cache import cache_dir, write_json_atomic
 from tenantsec.app import event_bus
 import pathlib, time
@@ -8,39 +6,101 @@ import pathlib, time
 def _path(tenant_id: str) -> pathlib.Path:
     return cache_dir(tenant_id, "Polled") / "signins_summary.json"
 
-def list_recent_signins(graph: GraphClient, tenant_id: str, days: int = 7, page_cap: int = 5) -> dict:
-    """
-    Permissions: AuditLog.Read.All
-    Pulls a limited window/page-cap to avoid huge files; stores counts by result.
-    """
-    since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
-    # Note: filter on createdDateTime ge <since> (Graph filter format)
-    url = f"/v1.0/auditLogs/signIns?$filter=createdDateTime ge {since}&$top=100"
-
-    total = 0
-    by_status = {}
-    pages = 0
-    items = []
-
-    for page in graph.get_paged_values(url, page_limit=page_cap):
-        vals = page.get("value", [])
-        for v in vals:
-            total += 1
-            key = (v.get("status") or {}).get("errorCode", 0)
-            by_status[str(key)] = by_status.get(str(key), 0) + 1
-        items.extend(vals)
-        pages += 1
-
-    out = {
-        "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-        "window_days": days,
-        "pages": pages,
-        "total": total,
-        "by_status_code": by_status,
-        "sample": items[:250]  # keep a small slice for UI drill-in
-    }
+# Sign-in statistics are kept as a count cube over these dimensions, so the
+# summary covers the whole window in memory bounded by the distinct values
+# (capped per dimension; the overflow lands in "other"), not by record count.
+CUBE_DIMS = ("day", "status", "clientApp", "country", "ca")
+CUBE_MAX_VALUES = {"status": 200, "clientApp": 64, "country": 250, "ca": 16}
+
+def _cube_key(error_code, r: dict) -> tuple:
+    # r is a feed_signins normalized record
+    return (
+        (r.get("createdDateTime") or "")[:10],
+        str(error_code or 0),
+        r.get("clientApp") or "",
+        (r.get("country") or "").upper(),
+        r.get("ca") or "",
+    )
+
+class SigninCube:
+    """Counts by day x status x clientApp x country x CA result."""
+    def __init__(self):
+        self.cells: dict = {}
+        self.values = {d: set() for d in CUBE_DIMS}
+
+    def _cap(self, key: tuple) -> tuple:
+        out = []
+        for dim, v in zip(CUBE_DIMS, key):
+            seen = self.values[dim]
+            if v not in seen:
+                if len(seen) >= CUBE_MAX_VALUES.get(dim, 1 << 30):
+                    v = "other"
+                seen.add(v)
+            out.append(v)
+        return tuple(out)
+
+    def add(self, key: tuple, n: int = 1) -> None:
+        key = self._cap(key)
+        self.cells[key] = self.cells.get(key, 0) + n
+
+    def drop_days_before(self, day: str) -> None:
+        self.cells = {k: n for k, n in self.cells.items() if k[0] >= day}
+        self.values = {d: {k[i] for k in self.cells} for i, d in enumerate(CUBE_DIMS)}
+
+    def total(self) -> int:
+        return sum(self.cells.values())
+
+    def rollup(self, dim: str) -> dict:
+        i = CUBE_DIMS.index(dim)
+        out: dict = {}
+        for k, n in self.cells.items():
+            out[k[i]] = out.get(k[i], 0) + n
+        return dict(sorted(out.items(), key=lambda kv: -kv[1]))
+
+    def to_dict(self) -> dict:
+        return {"dims": list(CUBE_DIMS), "rows": [[*k, n] for k, n in sorted(self.cells.items())]}
+
+    @classmethod
+    def from_dict(cls, doc: dict | None) -> "SigninCube":
+        cube = cls()
+        if (doc or {}).get("dims") == list(CUBE_DIMS):
+            for row in doc.get("rows") or []:
+                cube.add(tuple(row[:-1]), int(row[-1]))
+        return cube
+
+class SigninSummary:
+    """Streaming sign-in statistics over the full window (a SigninCube plus page count)."""
+    def __init__(self, days: int, *, cube: SigninCube | None = None):
+        self.days = days
+        self.pages = 0
+        self.cube = cube or SigninCube()
+
+    @property
+    def total(self) -> int:
+        return self.cube.total()
+
+    def add(self, error_code, record: dict) -> None:
+        self.cube.add(_cube_key(error_code, record))
+
+    def to_dict(self) -> dict:
+        c = self.cube
+        return {
+            "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "window_days": self.days,
+            "pages": self.pages,
+            "total": c.total(),
+            "by_status_code": c.rollup("status"),
+            "by_day": dict(sorted(c.rollup("day").items())),
+            "by_client_app": c.rollup("clientApp"),
+            "by_country": c.rollup("country"),
+            "by_ca_status": c.rollup("ca"),
+            "cube": c.to_dict(),
+        }
+
+def write_summary(tenant_id: str, summary: SigninSummary) -> dict:
+    out = summary.to_dict()
     cp = _path(tenant_id)
     write_json_atomic(cp, out)
     print(f"[{__name__}] wrote {cp}")
-    event_bus.publish("audit.signins.ready", {"tenant_id": tenant_id, "total": total})
+    event_bus.publish("audit.signins.ready", {"tenant_id": tenant_id, "total": summary.total})
     return out
@@ -0,0 +1,142 @@
+# src/tenantsec/core/auth_methods_service.py
+from __future__ import annotations
+import pathlib, time
+from typing import Any, Dict, Iterable, List
+
+from tenantsec.core.graph_client import GraphClient
+from tenantsec.core.cache import cache_dir, read_json, write_json_atomic, update_json
+from tenantsec.http.errors import HttpError, ForbiddenError
+
+# Method names used in the index (and by RuleAdminsWithoutMfa): sms/voice are weak.
+_REPORT_METHODS = {
+    "mobilePhone": "sms",
+    "alternateMobilePhone": "voice",
+    "officePhone": "voice",
+    "microsoftAuthenticatorPush": "authenticator",
+    "microsoftAuthenticatorPasswordless": "authenticator",
+    "softwareOneTimePasscode": "totp",
+    "hardwareOneTimePasscode": "totp",
+    "fido2SecurityKey": "fido2",
+    "passKeyDeviceBound": "fido2",
+    "passKeyDeviceBoundAuthenticator": "fido2",
+    "windowsHelloForBusiness": "whfb",
+    "temporaryAccessPass": "tap",
+    "email": "email",
+}
+
+_METHOD_TYPES = {
+    "microsoftAuthenticatorAuthenticationMethod": "authenticator",
+    "softwareOathAuthenticationMethod": "totp",
+    "fido2AuthenticationMethod": "fido2",
+    "windowsHelloForBusinessAuthenticationMethod": "whfb",
+    "temporaryAccessPassAuthenticationMethod": "tap",
+    "emailAuthenticationMethod": "email",
+    "platformCredentialAuthenticationMethod": "whfb",
+}
+
+# Methods that count as a second factor (password/email/TAP do not).
+MFA_METHODS = {"sms", "voice", "authenticator", "totp", "fido2", "whfb"}
+
+def _path(tenant_id: str) -> pathlib.Path:
+    return cache_dir(tenant_id, "Static") / "auth_methods.json"
+
+def load_index(tenant_id: str) -> Dict[str, Dict[str, Any]]:
+    """{user_id: {mfa_state, mfa_methods, source}} from the last crawl (empty if none)."""
+    return (read_json(_path(tenant_id)) or {}).get("users", {})
+
+def _entry(methods: Iterable[str], source: str) -> Dict[str, Any]:
+    methods = sorted(set(methods))
+    return {
+        "mfa_state": "Registered" if MFA_METHODS.intersection(methods) else "NotRegistered",
+        "mfa_methods": methods,
+        "source": source,
+    }
+
+def crawl_registration_details(graph: GraphClient) -> Dict[str, Dict[str, Any]]:
+    """
+    Permissions: AuditLog.Read.All (+ Entra ID P1/P2).
+    One paged report covering every user's registered methods.
+    """
+    sel = "id,isMfaRegistered,methodsRegistered"
+    out: Dict[str, Dict[str, Any]] = {}
+    for r in graph.get_paged_values(f"/v1.0/reports/authenticationMethods/userRegistrationDetails?$select={sel}&$top=999"):
+        uid = r.get("id")
+        if not uid:
+            continue
+        methods = [_REPORT_METHODS.get(m, m) for m in (r.get("methodsRegistered") or [])]
+        e = _entry(methods, "report")
+        if r.get("isMfaRegistered") is not None:
+            e["mfa_state"] = "Registered" if r["isMfaRegistered"] else "NotRegistered"
+        out[uid] = e
+    return out
+
+def _method_name(m: Dict[str, Any]) -> str | None:
+    kind = (m.get("@odata.type") or "").rsplit(".", 1)[-1]
+    if kind == "phoneAuthenticationMethod":
+        return "sms" if (m.get("phoneType") or "mobile") == "mobile" else "voice"
+    return _METHOD_TYPES.get(kind)
+
+def fetch_user_methods(graph: GraphClient, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Permissions: UserAuthenticationMethod.Read.All.
+    Live methods per user via /$batch (20 users per request); meant for the
+    privileged subset where the report's daily refresh is too coarse.
+    """
+    ids = list(user_ids)
+    by_path = {f"/users/{uid}/authentication/methods": uid for uid in ids}
+    out: Dict[str, Dict[str, Any]] = {}
+    for path, status, body in graph.batch_get(by_path):
+        if status != 200:
+            continue
+        names = [_method_name(m) for m in body.get("value", [])]
+        out[by_path[path]] = _entry([n for n in names if n], "methods")
+    return out
+
+def build_index(graph: GraphClient, tenant_id: str, *, privileged_ids: Iterable[str] = ()) -> Dict[str, Dict[str, Any]]:
+    """
+    Registration report for everyone, refined by live methods for privileged
+    users. Written to Static/auth_methods.json as {user_id: entry}.
+    """
+    index: Dict[str, Dict[str, Any]] = {}
+    report_ok = False
+    try:
+        index.update(crawl_registration_details(graph))
+    except ForbiddenError:
+        print("[auth_methods] registration report skipped (403) – needs AuditLog.Read.All and Entra ID P1")
+    except HttpError as ex:
+        print(f"[auth_methods] registration report failed: {ex}")
+    else:
+        report_ok = True
+
+    if not report_ok:
+        # keep the last good entries rather than overwriting them with nothing
+        index.update(load_index(tenant_id))
+
+    privileged = sorted(set(privileged_ids))
+    if privileged:
+        try:
+            index.update(fetch_user_methods(graph, privileged))
+        except HttpError as ex:
+            print(f"[auth_methods] per-user methods for {len(privileged)} admins failed: {ex}")
+
+    write_json_atomic(_path(tenant_id), {
+        "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "users": index,
+    })
+    print(f"[auth_methods] indexed {len(index)} users ({len(privileged)} privileged via methods)")
+    return index
+
+def annotate_members(members: List[Dict[str, Any]], index: Dict[str, Dict[str, Any]]) -> None:
+    """Copy mfa_state / mfa_methods onto role member dicts in place."""
+    for m in members:
+        e = index.get(m.get("id")) if isinstance(m, dict) else None
+        if e:
+            m["mfa_state"] = e["mfa_state"]
+            m["mfa_methods"] = e["mfa_methods"]
+
+def join_roles_sheet(tenant_id: str, index: Dict[str, Dict[str, Any]]) -> None:
+    """Annotate members in Static/roles.json (no-op if the sheet doesn't exist yet)."""
+    p = cache_dir(tenant_id, "Static") / "roles.json"
+    if not p.exists():
+        return
+    update_json(p, lambda data: [annotate_members(r.get("members") or [], index) for r in data.get("roles", [])])
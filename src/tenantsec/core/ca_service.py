@@ -1,7 +1,7 @@
 # src/tenantsec/core/ca_service.py
 from __future__ import annotations
 from tenantsec.core.data_gateway import DataGateway
-from tenantsec.core.cache import write_json_atomic
+from tenantsec.core.cache import update_json
 from tenantsec.app import event_bus
 
 def snapshot_conditional_access(graph, tenant_id: str) -> dict:
@@ -13,9 +13,7 @@ def snapshot_conditional_access(graph, tenant_id: str) -> dict:
     }
 
     gw = DataGateway(tenant_id)
-    policies = gw.get_policies() or {}
-    policies["conditional_access"] = ca
-    write_json_atomic(gw._path("policies.json", "Static"), policies)
+    update_json(gw._path("policies.json", "Static"), lambda policies: policies.update(conditional_access=ca))
 
     event_bus.publish("policies.ca.ready", {
         "tenant_id": tenant_id,
@@ -1,10 +1,25 @@
 # src/tenantsec/core/cache.py
 from __future__ import annotations
-import json, os, sys, pathlib, tempfile
-from typing import Any, Optional
+import json, os, sys, pathlib, tempfile, time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
 
 APP_NAME = "PySecCheck"
 
+if sys.platform.startswith("win"):
+    import ctypes, msvcrt
+    from ctypes import wintypes
+
+    class _OVERLAPPED(ctypes.Structure):
+        _fields_ = [("Internal", ctypes.c_void_p), ("InternalHigh", ctypes.c_void_p),
+                    ("Offset", wintypes.DWORD), ("OffsetHigh", wintypes.DWORD), ("hEvent", wintypes.HANDLE)]
+
+    _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    _LOCKFILE_FAIL_IMMEDIATELY = 0x1
+    _LOCKFILE_EXCLUSIVE_LOCK = 0x2
+else:
+    import fcntl
+
 def _base_dir() -> pathlib.Path:
     if sys.platform.startswith("win"):
         root = os.environ.get("APPDATA") or os.path.expanduser("~\\AppData\\Roaming")
@@ -29,3 +44,138 @@ def write_json_atomic(path: pathlib.Path, data: dict) -> None:
     os.close(fd)
     pathlib.Path(tmp).write_text(json.dumps(data, indent=2), encoding="utf-8")
     os.replace(tmp, path)
+
+# ---------- cross-process locking ----------
+# Readers never need a lock: every write goes through write_json_atomic, so a
+# file is always either the old or the new version. Locks serialize writers
+# that read-modify-write the same file (enrichments merging into
+# users_index.json, CA + policy snapshots sharing policies.json, ...).
+# Writers hold the tenant lock shared only while they write, never across
+# Graph calls, so clearing a tenant (exclusive) waits seconds, not a crawl.
+
+class CacheLockTimeout(TimeoutError):
+    pass
+
+class CacheCleared(RuntimeError):
+    """The tenant cache was cleared under a pass that writes in several steps."""
+
+def _lock_path(path: pathlib.Path) -> pathlib.Path:
+    return path if path.suffix == ".lock" else path.with_name(path.name + ".lock")
+
+def _try_lock(fh, shared: bool) -> bool:
+    try:
+        if sys.platform.startswith("win"):
+            flags = _LOCKFILE_FAIL_IMMEDIATELY | (0 if shared else _LOCKFILE_EXCLUSIVE_LOCK)
+            handle = wintypes.HANDLE(msvcrt.get_osfhandle(fh.fileno()))
+            return bool(_kernel32.LockFileEx(handle, flags, 0, 1, 0, ctypes.byref(_OVERLAPPED())))
+        else:
+            fcntl.flock(fh.fileno(), (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+def _unlock(fh) -> None:
+    try:
+        if sys.platform.startswith("win"):
+            handle = wintypes.HANDLE(msvcrt.get_osfhandle(fh.fileno()))
+            _kernel32.UnlockFileEx(handle, 0, 1, 0, ctypes.byref(_OVERLAPPED()))
+        else:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+    except OSError:
+        pass
+
+@contextmanager
+def file_lock(path: pathlib.Path, *, shared: bool = False, timeout: Optional[float] = None) -> Iterator[None]:
+    """
+    Advisory lock on <path>.lock, shared between threads and processes.
+    timeout=None waits forever, 0 tries once; raises CacheLockTimeout.
+    """
+    lp = _lock_path(path)
+    lp.parent.mkdir(parents=True, exist_ok=True)
+    fh = open(lp, "a+b")
+    try:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = 0.01
+        while not _try_lock(fh, shared):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise CacheLockTimeout(f"cache lock busy: {lp}")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.25)
+        try:
+            yield
+        finally:
+            _unlock(fh)
+    finally:
+        fh.close()
+
+def tenant_lock(tenant_id: str, *, shared: bool = True, timeout: Optional[float] = None):
+    """Tenant-wide lock: writers hold it shared; clearing/evicting a tenant takes it exclusive."""
+    return file_lock(_base_dir() / "data" / "cache" / tenant_id / ".tenant.lock", shared=shared, timeout=timeout)
+
+def _tenant_of(path: pathlib.Path) -> Optional[str]:
+    try:
+        return path.resolve().relative_to((_base_dir() / "data" / "cache").resolve()).parts[0]
+    except (ValueError, IndexError):
+        return None
+
+@contextmanager
+def tenant_write(path: pathlib.Path) -> Iterator[None]:
+    """Shared tenant lock for a short write under the cache (no-op outside it)."""
+    tenant_id = _tenant_of(path)
+    if tenant_id is None:
+        yield
+        return
+    with tenant_lock(tenant_id, shared=True):
+        yield
+
+@contextmanager
+def _writer_locks(path: pathlib.Path) -> Iterator[None]:
+    # shared tenant lock first (when path lives in the cache), then the file lock
+    with tenant_write(path), file_lock(path):
+        yield
+
+def update_json(
+    path: pathlib.Path,
+    mutate: Callable[[dict], Any],
+    *,
+    default: Optional[dict] = None,
+) -> Any:
+    """
+    Read-modify-write under an exclusive lock so concurrent writers merge
+    instead of clobbering each other. mutate edits the dict in place; its
+    return value is passed back to the caller.
+    """
+    with _writer_locks(path):
+        data = read_json(path)
+        if not isinstance(data, dict):
+            data = json.loads(json.dumps(default)) if default is not None else {}
+        result = mutate(data)
+        write_json_atomic(path, data)
+        return result
+
+def build_once(
+    path: pathlib.Path,
+    builder: Callable[[], dict],
+    *,
+    max_age_sec: Optional[float] = None,
+) -> dict:
+    """
+    Produce `path` at most once across processes: if another writer finished it
+    while we waited for the lock (or it is younger than max_age_sec), reuse it.
+    Only the file lock is held while `builder` runs; builders that write other
+    cache files take tenant_write() around those writes themselves.
+    """
+    started = time.time()
+    with file_lock(path):
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            mtime = None
+        if mtime is not None and (mtime >= started or (max_age_sec is not None and started - mtime <= max_age_sec)):
+            data = read_json(path)
+            if isinstance(data, dict):
+                return data
+        data = builder()
+        with tenant_write(path):
+            write_json_atomic(path, data)
+        return data
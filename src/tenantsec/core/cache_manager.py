@@ -1,22 +1,173 @@
 # src/tenantsec/core/cache_manager.py
 from __future__ import annotations
-import shutil
+import os, shutil, time
 from pathlib import Path
-from tenantsec.core.cache import cache_dir
+from typing import Dict, Iterable, List, Optional
+from tenantsec.core.cache import _base_dir, cache_dir, read_json, write_json_atomic, tenant_lock, CacheLockTimeout
+from tenantsec.config.loader import get_cache_config
+
+# Buckets in eviction order: cheapest to rebuild first; History can't be re-fetched.
+# Jobs only holds crawl checkpoints (losing one just restarts that crawl).
+BUCKETS = ("Jobs", "AI", "Polled", "USER", "Static", "History")
+
+ACCESS_MARKER = ".last_access"
+
+def cache_root() -> Path:
+    return _base_dir() / "data" / "cache"
 
 def tenant_root(tenant_id: str) -> Path:
     # cache_dir returns .../<tenant>/<bucket>; go up one to tenant root
     return cache_dir(tenant_id, "Static").parent
 
-def clear_bucket(tenant_id: str, bucket: str) -> None:
+def clear_bucket(tenant_id: str, bucket: str, *, timeout: Optional[float] = None) -> None:
+    """Empty one bucket; raises CacheLockTimeout if writers still hold the tenant after `timeout`."""
     root = tenant_root(tenant_id)
     target = root / bucket
     if target.exists():
-        shutil.rmtree(target, ignore_errors=True)
-        target.mkdir(parents=True, exist_ok=True)
+        with tenant_lock(tenant_id, shared=False, timeout=timeout):
+            shutil.rmtree(target, ignore_errors=True)
+            target.mkdir(parents=True, exist_ok=True)
 
-def clear_all(tenant_id: str) -> None:
+def clear_all(tenant_id: str, *, timeout: Optional[float] = None) -> None:
+    """Delete a tenant's cached data; raises CacheLockTimeout as clear_bucket does."""
     root = tenant_root(tenant_id)
     if root.exists():
-        shutil.rmtree(root, ignore_errors=True)
-        root.mkdir(parents=True, exist_ok=True)
+        with tenant_lock(tenant_id, shared=False, timeout=timeout):
+            for p in root.iterdir():
+                if p.is_dir():
+                    shutil.rmtree(p, ignore_errors=True)
+                elif p.suffix != ".lock":
+                    p.unlink(missing_ok=True)
+
+# ---------- usage ----------
+def _dir_size(path: Path) -> int:
+    total = 0
+    for dirpath, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.stat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                pass
+    return total
+
+def list_tenants() -> List[str]:
+    root = cache_root()
+    if not root.exists():
+        return []
+    return sorted(p.name for p in root.iterdir() if p.is_dir())
+
+def bucket_usage(tenant_id: str) -> Dict[str, int]:
+    """Bytes on disk per bucket for one tenant (no directories are created)."""
+    root = cache_root() / tenant_id
+    out: Dict[str, int] = {}
+    if not root.exists():
+        return out
+    for p in root.iterdir():
+        if p.is_dir():
+            out[p.name] = _dir_size(p)
+    return out
+
+def cache_usage() -> Dict[str, Dict[str, int]]:
+    """{tenant_id: {bucket: bytes}} for every tenant under the cache root."""
+    return {tid: bucket_usage(tid) for tid in list_tenants()}
+
+# ---------- last access ----------
+def touch_tenant(tenant_id: str) -> None:
+    """Mark a tenant as used now; call when a tenant is opened or scanned."""
+    marker = tenant_root(tenant_id) / ACCESS_MARKER
+    try:
+        marker.touch(exist_ok=True)
+        now = time.time()
+        os.utime(marker, (now, now))
+    except OSError:
+        pass
+
+def last_access(tenant_id: str) -> float:
+    """Marker mtime; falls back to the newest bucket mtime for tenants never touched."""
+    root = cache_root() / tenant_id
+    try:
+        return (root / ACCESS_MARKER).stat().st_mtime
+    except OSError:
+        pass
+    newest = 0.0
+    if root.exists():
+        for p in root.iterdir():
+            try:
+                newest = max(newest, p.stat().st_mtime)
+            except OSError:
+                pass
+    return newest
+
+# ---------- pinning ----------
+def _pins_path() -> Path:
+    cfg_dir = _base_dir() / "config"
+    cfg_dir.mkdir(parents=True, exist_ok=True)
+    return cfg_dir / "cache_pins.json"
+
+def pinned_tenants() -> List[str]:
+    pins = set(get_cache_config().get("pinned_tenants", []))
+    pins.update((read_json(_pins_path()) or {}).get("pinned", []))
+    return sorted(pins)
+
+def pin_tenant(tenant_id: str) -> None:
+    data = read_json(_pins_path()) or {}
+    pins = set(data.get("pinned", []))
+    pins.add(tenant_id)
+    write_json_atomic(_pins_path(), {"pinned": sorted(pins)})
+
+def unpin_tenant(tenant_id: str) -> None:
+    data = read_json(_pins_path()) or {}
+    pins = set(data.get("pinned", []))
+    pins.discard(tenant_id)
+    write_json_atomic(_pins_path(), {"pinned": sorted(pins)})
+
+# ---------- eviction ----------
+def enforce_budget(
+    max_bytes: Optional[int] = None,
+    *,
+    keep: Iterable[str] = (),
+) -> List[Dict[str, object]]:
+    """
+    Evict least-recently-accessed tenant buckets until the whole cache fits in
+    max_bytes (defaults to appsettings cache.max_bytes; 0 disables).
+    Pinned tenants and tenants in `keep` are never touched. Within a tenant,
+    buckets go in BUCKETS order so Static snapshots are the last to leave.
+    Returns the evicted {tenant_id, bucket, bytes} entries.
+    """
+    if max_bytes is None:
+        max_bytes = get_cache_config().get("max_bytes", 0)
+    if not max_bytes or max_bytes <= 0:
+        return []
+
+    usage = cache_usage()
+    total = sum(sum(b.values()) for b in usage.values())
+    if total <= max_bytes:
+        return []
+
+    protected = set(pinned_tenants()) | set(keep)
+    candidates = sorted((t for t in usage if t not in protected), key=last_access)
+
+    evicted: List[Dict[str, object]] = []
+    for tid in candidates:
+        buckets = usage[tid]
+        order = [b for b in BUCKETS if b in buckets] + sorted(b for b in buckets if b not in BUCKETS)
+        try:
+            # another process is writing this tenant: leave it alone this round
+            with tenant_lock(tid, shared=False, timeout=0):
+                for bucket in order:
+                    if total <= max_bytes:
+                        break
+                    size = buckets[bucket]
+                    if size <= 0:
+                        continue
+                    shutil.rmtree(cache_root() / tid / bucket, ignore_errors=True)
+                    total -= size
+                    evicted.append({"tenant_id": tid, "bucket": bucket, "bytes": size})
+        except CacheLockTimeout:
+            continue
+        if total <= max_bytes:
+            break
+
+    if evicted:
+        print(f"[cache_manager] evicted {len(evicted)} bucket(s); cache now ~{total} bytes")
+    return evicted
@@ -0,0 +1,209 @@
+# src/tenantsec/core/crawl_journal.py
+from __future__ import annotations
+import json, pathlib, time
+from typing import Any, Dict, Iterable, List, Optional
+
+from tenantsec.core.cache import cache_dir, read_json, write_json_atomic
+from tenantsec.core.graph_client import GraphClient
+from tenantsec.http.errors import HttpError, UnauthorizedError
+
+# Jobs/<name>.json holds the progress of one long crawl:
+#   next_link  last @odata.nextLink whose page is fully processed
+#   finished   the paged scan reached its last page (output is complete)
+#   counts     committed length of each output log
+# Output goes to append-only logs, Jobs/<name>.<key>.jsonl, one item per
+# line; lines past the committed count (written before a crash) are ignored
+# on resume, so a page's output and its nextLink always agree. Items already
+# handled by a per-user loop are the "done" log. All files are removed when
+# the crawl completes; a crash, app exit or expired token leaves them behind
+# and the next run of the same crawl resumes from them.
+
+MAX_AGE_SEC = 12 * 3600         # Graph skip tokens don't live much longer
+CHECKPOINT_EVERY_SEC = 5.0      # state file rewrites are throttled; logs are appended each time
+
+
+def _path(tenant_id: str, name: str) -> pathlib.Path:
+    return cache_dir(tenant_id, "Jobs") / f"{name}.json"
+
+
+class CrawlJournal:
+    """
+    On-disk checkpoint for one resumable crawl. `params` identifies the crawl
+    (query, limits); a journal recorded with different params, or older than
+    MAX_AGE_SEC, is discarded rather than resumed.
+    """
+    def __init__(self, tenant_id: str, name: str, *, params: Optional[Dict[str, Any]] = None):
+        self.tenant_id = tenant_id
+        self.name = name
+        self.path = _path(tenant_id, name)
+        self.params = params or {}
+        self._last_write = 0.0
+        self._logs: Dict[str, List[Any]] = {}
+        self._flushed: Dict[str, int] = {}
+
+        prev = read_json(self.path) or {}
+        fresh = (
+            prev.get("params") == self.params
+            and time.time() - float(prev.get("updated_at") or 0) <= MAX_AGE_SEC
+            and bool(prev.get("next_link") or prev.get("finished") or (prev.get("counts") or {}).get("done"))
+        )
+        self.data: Dict[str, Any] = prev if fresh else {}
+        self.resumed = fresh
+        self.data.setdefault("params", self.params)
+        self.data.setdefault("started_at", time.time())
+        self.data.setdefault("next_link", None)
+        self.data.setdefault("finished", False)
+        self.data.setdefault("counts", {})
+        if not fresh:
+            self._drop_logs()
+        self._done = set(self.log("done"))
+        if self.resumed:
+            state = "scan finished" if self.finished else ("mid-pagination" if self.next_link else "")
+            print(f"[crawl_journal] resuming {name}: {len(self._done)} done" + (f", {state}" if state else ""))
+
+    # ---------- state ----------
+    @property
+    def next_link(self) -> Optional[str]:
+        return self.data.get("next_link")
+
+    @property
+    def finished(self) -> bool:
+        return bool(self.data.get("finished"))
+
+    def _log_path(self, key: str) -> pathlib.Path:
+        return self.path.with_name(f"{self.name}.{key}.jsonl")
+
+    def log(self, key: str) -> List[Any]:
+        """
+        Append-only output list `key`, restored up to its committed length.
+        Append to the returned list; new items are written at each checkpoint.
+        """
+        if key not in self._logs:
+            n = int(self.data["counts"].get(key, 0))
+            items: List[Any] = []
+            if n:
+                try:
+                    with open(self._log_path(key), encoding="utf-8") as fh:
+                        for line in fh:
+                            if len(items) >= n:
+                                break
+                            items.append(json.loads(line))
+                except (OSError, ValueError):
+                    items = []
+                if len(items) < n:  # log lost or damaged: nothing of this crawl can be trusted
+                    print(f"[crawl_journal] {self.name}: {key} log incomplete; starting over")
+                    self.reset()
+                    return self.log(key)
+            self._logs[key] = items
+            self._flushed[key] = len(items)
+            # drop uncommitted tail lines so appends continue from the committed length
+            self._truncate(key, len(items))
+        return self._logs[key]
+
+    def is_done(self, key: str) -> bool:
+        return key in self._done
+
+    def mark_done(self, key: str) -> None:
+        if key not in self._done:
+            self._done.add(key)
+            self.log("done").append(key)
+        self.checkpoint()
+
+    # ---------- persistence ----------
+    def _truncate(self, key: str, n: int) -> None:
+        p = self._log_path(key)
+        if not p.exists():
+            return
+        if n == 0:
+            p.unlink(missing_ok=True)
+            return
+        with open(p, "rb+") as fh:
+            pos = 0
+            for _ in range(n):
+                line = fh.readline()
+                if not line:
+                    break
+                pos += len(line)
+            fh.truncate(pos)
+
+    def _drop_logs(self) -> None:
+        for p in self.path.parent.glob(f"{self.name}.*.jsonl"):
+            p.unlink(missing_ok=True)
+
+    def _flush_logs(self) -> None:
+        for key, items in self._logs.items():
+            n = self._flushed.get(key, 0)
+            if len(items) > n:
+                with open(self._log_path(key), "a", encoding="utf-8") as fh:
+                    for it in items[n:]:
+                        fh.write(json.dumps(it, ensure_ascii=False, separators=(",", ":")) + "\n")
+                self._flushed[key] = len(items)
+
+    def checkpoint(self, *, next_link: Any = ..., force: bool = False) -> None:
+        if next_link is not ...:
+            self.data["next_link"] = next_link
+        now = time.monotonic()
+        if not force and now - self._last_write < CHECKPOINT_EVERY_SEC:
+            return
+        self._flush_logs()
+        self.data["counts"] = dict(self._flushed)
+        self.data["updated_at"] = time.time()
+        write_json_atomic(self.path, self.data)
+        self._last_write = now
+
+    def reset(self) -> None:
+        self._drop_logs()
+        self.data.update(next_link=None, finished=False, counts={}, started_at=time.time())
+        for items in self._logs.values():
+            items.clear()
+        self._flushed = {k: 0 for k in self._logs}
+        self._done = set()
+        self.resumed = False
+
+    def complete(self) -> None:
+        self._drop_logs()
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+    # ---------- paging ----------
+    def pages(self, graph: GraphClient, url: str, *, page_limit: Optional[int] = None) -> Iterable[dict]:
+        """
+        graph.get_pages(url), resuming from the stored nextLink. A page counts
+        as done once the caller asks for the next one, so output appended
+        while handling a page is checkpointed together with its nextLink.
+        A stored link the service no longer accepts restarts from `url`.
+        After the last page the journal is marked finished, and a resumed
+        finished journal yields nothing: its logs already hold the output.
+        """
+        if self.finished:
+            return
+        start = self.next_link or url
+        n = 0
+        try:
+            it = iter(graph.get_pages(start))
+            page = next(it, None)
+        except HttpError as ex:
+            if start == url or isinstance(ex, UnauthorizedError):
+                raise
+            print(f"[crawl_journal] {self.name}: stored nextLink rejected ({ex.status}); restarting")
+            self.reset()
+            it = iter(graph.get_pages(url))
+            page = next(it, None)
+        while page is not None:
+            yield page
+            n += 1
+            link = page.get("@odata.nextLink")
+            if not link or (page_limit and n >= page_limit):
+                self.data["finished"] = True
+                self.checkpoint(next_link=None, force=True)
+                break
+            self.checkpoint(next_link=link)
+            page = next(it, None)
+
+
+def pending(tenant_id: str) -> List[str]:
+    """Names of crawls with a checkpoint left behind (interrupted, resumable)."""
+    d = cache_dir(tenant_id, "Jobs")
+    return sorted(p.stem for p in d.glob("*.json") if not p.name.startswith("._"))
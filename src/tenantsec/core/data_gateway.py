@@ -135,6 +135,9 @@ class DataGateway:
     def get_exchange_policies(self) -> Dict[str, Any]:
         return read_json(self._path("exchange_policies.json", "Static")) or {}
 
+    def get_group_closure(self) -> Dict[str, Any]:
+        return read_json(self._path("group_closure.json", "Static")) or {}
+
     def get_oauth_inventory(self) -> dict:
         return read_json(self._path("oauth_apps.json", "Static")) or {}
  
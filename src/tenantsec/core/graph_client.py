@@ -1,11 +1,12 @@
 # src/tenantsec/core/graph_client.py
 from __future__ import annotations
-from typing import Callable, Dict, Iterable, Any
+from typing import Callable, Dict, Iterable, Any, List, Tuple
 from tenantsec.http.client import HttpClient
 from tenantsec.config.loader import get_http_config
-from tenantsec.http.throttle import set_max_concurrency
+from tenantsec.http.throttle import set_max_concurrency, RETRY_STATUSES, compute_sleep_seconds, sleep_backoff
 
 GRAPH_BASE = "https://graph.microsoft.com"
+BATCH_MAX = 20  # Graph JSON batching limit per request
 
 class GraphClient:
     """
@@ -48,9 +49,52 @@ class GraphClient:
             for item in page.get("value", []):
                 yield item
 
+    def get_pages(
+        self,
+        path_or_url: str,
+        *,
+        params: Dict[str, Any] | None = None,
+    ) -> Iterable[dict]:
+        """Whole pages (for delta queries, where the last page carries @odata.deltaLink)."""
+        yield from self._http.get_paged(path_or_url, headers=self._auth_headers(), params=params)
+
     def post_json(self, path_or_url: str, *, json: Any = None) -> dict:
         return self._http.post_json(path_or_url, headers=self._auth_headers(), json=json)
 
+    def batch_get(
+        self,
+        paths: Iterable[str],
+        *,
+        version: str = "v1.0",
+        max_rounds: int = 4,
+    ) -> Iterable[Tuple[str, int, dict]]:
+        """
+        GET many relative paths (e.g. "/users/{id}/authentication/methods")
+        through /$batch, 20 per request. Yields (path, status, body) per path;
+        throttled/5xx sub-requests are retried up to max_rounds times.
+        """
+        pending: List[str] = list(paths)
+        attempt = 0
+        while pending:
+            retry: List[str] = []
+            retry_after = None
+            for i in range(0, len(pending), BATCH_MAX):
+                chunk = pending[i:i + BATCH_MAX]
+                body = {"requests": [{"id": str(n), "method": "GET", "url": p} for n, p in enumerate(chunk)]}
+                res = self.post_json(f"/{version}/$batch", json=body)
+                for r in res.get("responses", []):
+                    path = chunk[int(r.get("id", 0))]
+                    status = int(r.get("status", 0))
+                    if status in RETRY_STATUSES and attempt < max_rounds - 1:
+                        retry.append(path)
+                        retry_after = str((r.get("headers") or {}).get("Retry-After") or retry_after or "")
+                        continue
+                    yield path, status, r.get("body") or {}
+            pending = retry
+            if pending:
+                sleep_backoff(compute_sleep_seconds(attempt, retry_after))
+                attempt += 1
+
     def patch_json(self, path_or_url: str, *, json: Any = None) -> dict:
         return self._http.patch_json(path_or_url, headers=self._auth_headers(), json=json)
 
@@ -0,0 +1,225 @@
+# src/tenantsec/core/group_service.py
+from __future__ import annotations
+import pathlib, time
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from tenantsec.core.graph_client import GraphClient
+from tenantsec.core.cache import cache_dir, read_json, write_json_atomic
+from tenantsec.http.errors import HttpError
+from tenantsec.app import event_bus
+
+# groups.json        direct membership + deltaLink (input to the next delta sync)
+# group_closure.json transitive user members per group as sorted ordinals into "users"
+
+def _path(tenant_id: str) -> pathlib.Path:
+    return cache_dir(tenant_id, "Static") / "groups.json"
+
+def _closure_path(tenant_id: str) -> pathlib.Path:
+    return cache_dir(tenant_id, "Static") / "group_closure.json"
+
+# ---------- delta sync ----------
+def _apply_page_items(groups: Dict[str, Dict[str, Any]], items: Iterable[Dict[str, Any]]) -> None:
+    for g in items:
+        gid = g.get("id")
+        if not gid:
+            continue
+        if "@removed" in g:
+            groups.pop(gid, None)
+            continue
+        row = groups.setdefault(gid, {"displayName": "", "users": [], "groups": []})
+        if "displayName" in g:
+            row["displayName"] = g.get("displayName") or ""
+        users, nested = set(row["users"]), set(row["groups"])
+        for m in g.get("members@delta") or []:
+            mid = m.get("id")
+            if not mid:
+                continue
+            kind = (m.get("@odata.type") or "").rsplit(".", 1)[-1]
+            bucket = nested if kind == "group" else users if kind in ("user", "") else None
+            if bucket is None:
+                continue  # devices, service principals, contacts
+            if "@removed" in m:
+                bucket.discard(mid)
+            else:
+                bucket.add(mid)
+        row["users"], row["groups"] = sorted(users), sorted(nested)
+
+def sync_groups(graph: GraphClient, tenant_id: str) -> Dict[str, Any]:
+    """
+    Permissions: GroupMember.Read.All (or Directory.Read.All).
+    First run pages the full groups/delta; later runs replay only changes from
+    the stored deltaLink. An expired link (410) falls back to a full sync.
+    """
+    prev = read_json(_path(tenant_id)) or {}
+    link = prev.get("deltaLink")
+    groups: Dict[str, Dict[str, Any]] = dict(prev.get("groups") or {}) if link else {}
+    start = link or "/v1.0/groups/delta?$select=id,displayName,members"
+
+    try:
+        pages = list(graph.get_pages(start))
+    except HttpError as ex:
+        if not link or ex.status not in (400, 404, 410):
+            raise
+        print(f"[group_service] deltaLink rejected ({ex.status}); full resync")
+        groups = {}
+        pages = list(graph.get_pages("/v1.0/groups/delta?$select=id,displayName,members"))
+
+    for page in pages:
+        _apply_page_items(groups, page.get("value", []))
+    new_link = next((p.get("@odata.deltaLink") for p in reversed(pages) if p.get("@odata.deltaLink")), None)
+
+    out = {
+        "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "deltaLink": new_link,
+        "groups": groups,
+    }
+    write_json_atomic(_path(tenant_id), out)
+    closure = build_closure(tenant_id, groups)
+    event_bus.publish("groups.ready", {"tenant_id": tenant_id, "group_count": len(groups),
+                                       "incremental": bool(link)})
+    print(f"[group_service] {len(groups)} groups ({'delta' if link else 'full'} sync), "
+          f"{len(closure['users'])} distinct members")
+    return out
+
+# ---------- transitive closure ----------
+def build_closure(tenant_id: str, groups: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Flatten nested groups into sorted ordinal arrays per group. Nesting
+    cycles are strongly connected components (iterative Tarjan): every group
+    in one gets the same union, and components complete sinks first, so each
+    child component's members are final before a parent reads them.
+    """
+    memo: Dict[str, Set[str]] = {}
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    stack: List[str] = []
+    on_stack: Set[str] = set()
+
+    def _children(gid: str) -> List[str]:
+        return [c for c in groups[gid].get("groups") or [] if c in groups]
+
+    def _visit(gid: str) -> None:
+        index[gid] = low[gid] = len(index)
+        stack.append(gid)
+        on_stack.add(gid)
+
+    for root in groups:
+        if root in index:
+            continue
+        _visit(root)
+        work = [(root, iter(_children(root)))]
+        while work:
+            gid, children = work[-1]
+            child = next(children, None)
+            if child is not None:
+                if child not in index:
+                    _visit(child)
+                    work.append((child, iter(_children(child))))
+                elif child in on_stack:
+                    low[gid] = min(low[gid], index[child])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[gid])
+            if low[gid] != index[gid]:
+                continue
+            component: List[str] = []
+            while True:
+                g = stack.pop()
+                on_stack.discard(g)
+                component.append(g)
+                if g == gid:
+                    break
+            out: Set[str] = set()
+            for g in component:
+                out.update(groups[g].get("users") or [])
+                for c in _children(g):
+                    out |= memo.get(c, set())
+            for g in component:
+                memo[g] = out
+
+    users = sorted(set().union(*memo.values())) if memo else []
+    ordinal = {u: i for i, u in enumerate(users)}
+    closure = {
+        "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "users": users,
+        "groups": {
+            gid: {
+                "displayName": groups[gid].get("displayName", ""),
+                "size": len(memo[gid]),
+                "members": sorted(ordinal[u] for u in memo[gid]),
+            }
+            for gid in groups
+        },
+    }
+    write_json_atomic(_closure_path(tenant_id), closure)
+    return closure
+
+
+class GroupIndex:
+    """
+    Read side of group_closure.json. Sizes and names are dict lookups;
+    membership tests use a per-group bitmap built on first use (O(1) after),
+    or bisect on the sorted ordinal array for one-off checks.
+    """
+    def __init__(self, closure: Optional[Dict[str, Any]] = None):
+        closure = closure or {}
+        self.users: List[str] = closure.get("users") or []
+        self.groups: Dict[str, Dict[str, Any]] = closure.get("groups") or {}
+        self._ordinal: Optional[Dict[str, int]] = None
+        self._bitmaps: Dict[str, bytearray] = {}
+
+    @classmethod
+    def load(cls, tenant_id: str) -> "GroupIndex":
+        return cls(read_json(_closure_path(tenant_id)))
+
+    def __bool__(self) -> bool:
+        return bool(self.groups)
+
+    def _ord(self, user_id: str) -> int:
+        if self._ordinal is None:
+            self._ordinal = {u: i for i, u in enumerate(self.users)}
+        return self._ordinal.get(user_id, -1)
+
+    def name(self, group_id: str) -> Optional[str]:
+        g = self.groups.get(group_id)
+        return g.get("displayName") if g else None
+
+    def size(self, group_id: str) -> Optional[int]:
+        g = self.groups.get(group_id)
+        return g.get("size") if g else None
+
+    def _bitmap(self, group_id: str) -> bytearray:
+        bm = self._bitmaps.get(group_id)
+        if bm is None:
+            bm = bytearray((len(self.users) >> 3) + 1)
+            for i in (self.groups.get(group_id) or {}).get("members") or []:
+                bm[i >> 3] |= 1 << (i & 7)
+            self._bitmaps[group_id] = bm
+        return bm
+
+    def is_member(self, user_id: str, group_id: str) -> bool:
+        i = self._ord(user_id)
+        if i < 0:
+            return False
+        bm = self._bitmap(group_id)
+        return bool(bm[i >> 3] & (1 << (i & 7)))
+
+    def contains_sorted(self, user_id: str, group_id: str) -> bool:
+        """Membership by bisect, without building a bitmap."""
+        i = self._ord(user_id)
+        arr = (self.groups.get(group_id) or {}).get("members") or []
+        j = bisect_left(arr, i)
+        return i >= 0 and j < len(arr) and arr[j] == i
+
+    def member_ids(self, group_id: str) -> List[str]:
+        return [self.users[i] for i in (self.groups.get(group_id) or {}).get("members") or []]
+
+    def effective_users(self, user_ids: Iterable[str] = (), group_ids: Iterable[str] = ()) -> Set[str]:
+        """Distinct users named directly or through (nested) groups."""
+        out = set(u for u in user_ids if u)
+        for gid in group_ids:
+            out.update(self.member_ids(gid))
+        return out
@@ -43,3 +43,55 @@ def snapshot_tenant_skus(graph: GraphClient, tenant_id: str) -> dict:
     event_bus.publish("licenses.inventory.ready", {"tenant_id": tenant_id, "sku_count": len(skus)})
     print(f"[license_service] wrote {cp}")
     return out
+
+# ---------- per-user license resolution ----------
+# users.assignedLicenses carries skuId + disabledPlans; subscribedSkus carries the
+# plans of every SKU. Together they give what /users/{id}/licenseDetails returns,
+# so the per-user endpoint is only needed for SKUs the catalog doesn't know.
+
+def sku_catalog(graph: GraphClient) -> dict:
+    """{skuId: {"skuPartNumber", "plans": {servicePlanId: servicePlanName}}} from one subscribedSkus call."""
+    data = graph.get_json("/v1.0/subscribedSkus?$select=skuId,skuPartNumber,servicePlans")
+    catalog = {}
+    for s in data.get("value", []):
+        if not s.get("skuId"):
+            continue
+        catalog[s["skuId"]] = {
+            "skuPartNumber": s.get("skuPartNumber") or s["skuId"],
+            "plans": {p.get("servicePlanId"): p.get("servicePlanName")
+                      for p in (s.get("servicePlans") or []) if p.get("servicePlanId")},
+        }
+    return catalog
+
+def resolve_assigned(assigned: list, catalog: dict) -> dict | None:
+    """
+    License fields for one user from assignedLicenses:
+      license_skus   - sorted skuPartNumbers
+      disabled_plans - sorted servicePlanNames switched off in those SKUs
+    Every other plan of an assigned SKU is enabled. Returns None when a SKU or
+    disabled plan is missing from the catalog (caller falls back to licenseDetails).
+    """
+    skus, disabled = set(), set()
+    for a in assigned or []:
+        sku = catalog.get(a.get("skuId"))
+        if sku is None:
+            return None
+        skus.add(sku["skuPartNumber"])
+        for pid in a.get("disabledPlans") or []:
+            name = sku["plans"].get(pid)
+            if name is None:
+                return None
+            disabled.add(name)
+    return {"license_skus": sorted(skus), "disabled_plans": sorted(disabled)}
+
+def fetch_license_details(graph: GraphClient, user_id: str) -> dict:
+    """Fallback: same fields as resolve_assigned, from /users/{id}/licenseDetails."""
+    data = graph.get_json(f"/v1.0/users/{user_id}/licenseDetails?$select=skuPartNumber,servicePlans")
+    skus, disabled = set(), set()
+    for item in data.get("value", []):
+        if item.get("skuPartNumber"):
+            skus.add(item["skuPartNumber"])
+        for p in item.get("servicePlans") or []:
+            if p.get("provisioningStatus") == "Disabled" and p.get("servicePlanName"):
+                disabled.add(p["servicePlanName"])
+    return {"license_skus": sorted(skus), "disabled_plans": sorted(disabled)}
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from tenantsec.core.graph_client import GraphClient
-from tenantsec.core.cache import cache_dir, write_json_atomic
+from tenantsec.core.cache import cache_dir, update_json
 from tenantsec.app import event_bus
 import pathlib, time
 
@@ -19,12 +19,15 @@ def snapshot_policies(graph: GraphClient, tenant_id: str) -> dict:
     # Auth methods policy (overall posture)
     amp = graph.get_json("/v1.0/policies/authenticationMethodsPolicy?$select=id,description,state")
 
-    out = {
-        "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-        "conditional_access": ca.get("value", []),
-        "auth_methods_policy": amp or {}
-    }
+    def _apply(out: dict) -> dict:
+        out["fetched_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        out["auth_methods_policy"] = amp or {}
+        # ca_service stores the full {"policies", "namedLocations"} block; never downgrade it
+        if not isinstance(out.get("conditional_access"), dict):
+            out["conditional_access"] = {"policies": ca.get("value", [])}
+        return out
+
     cp = _path(tenant_id)
-    write_json_atomic(cp, out)
+    out = update_json(cp, _apply)
     event_bus.publish("policies.ready", {"tenant_id": tenant_id})
     return out
@@ -1,38 +1,122 @@
 from __future__ import annotations
+from typing import Any, Dict, List
 from tenantsec.core.graph_client import GraphClient
-from tenantsec.core.cache import cache_dir, read_json, write_json_atomic
+from tenantsec.core.cache import cache_dir, read_json, write_json_atomic, build_once
+from tenantsec.core import auth_methods_service
+from tenantsec.http.errors import HttpError
 from tenantsec.app import event_bus
 import pathlib, time
 
+# roles.json (sheet) and users_index.json (roles/eligible_roles) are both
+# derived from one role index, so a connect crawls memberships only once.
+INDEX_MAX_AGE_SEC = 300
+
 def _path(tenant_id: str) -> pathlib.Path:
     return cache_dir(tenant_id, "Static") / "roles.json"
 
+def _index_path(tenant_id: str) -> pathlib.Path:
+    return cache_dir(tenant_id, "Static") / "role_index.json"
+
+def _principal(p: Dict[str, Any] | None, principal_id: str) -> Dict[str, Any]:
+    p = p or {}
+    return {
+        "id": p.get("id") or principal_id,
+        "type": (p.get("@odata.type") or "#microsoft.graph.unknown").rsplit(".", 1)[-1],
+        "upn": p.get("userPrincipalName"),
+        "displayName": p.get("displayName") or p.get("appDisplayName"),
+    }
+
+def _crawl_index(graph: GraphClient) -> dict:
+    """
+    Permissions: RoleManagement.Read.Directory (eligibility also needs
+    RoleEligibilitySchedule.Read.Directory and Entra ID P2).
+    Three paged calls replace one members call per role.
+    """
+    definitions: Dict[str, Dict[str, Any]] = {}
+    for d in graph.get_paged_values(
+        "/v1.0/roleManagement/directory/roleDefinitions?$select=id,displayName,templateId,isBuiltIn"
+    ):
+        if d.get("id"):
+            definitions[d["id"]] = {
+                "id": d["id"],
+                "templateId": d.get("templateId") or d["id"],
+                "displayName": d.get("displayName", ""),
+                "isBuiltIn": d.get("isBuiltIn"),
+            }
+
+    role_members: Dict[str, List[Dict[str, Any]]] = {}
+    member_roles: Dict[str, List[Dict[str, Any]]] = {}
+    seen = set()
+
+    def _add(a: Dict[str, Any], assignment: str) -> None:
+        rid, pid = a.get("roleDefinitionId"), a.get("principalId")
+        if not rid or not pid or (rid, pid, assignment) in seen:
+            return
+        seen.add((rid, pid, assignment))
+        m = _principal(a.get("principal"), pid)
+        m["assignment"] = assignment
+        m["scope"] = a.get("directoryScopeId") or "/"
+        role_members.setdefault(rid, []).append(m)
+        name = (definitions.get(rid) or {}).get("displayName") or rid
+        member_roles.setdefault(pid, []).append({"roleId": rid, "name": name, "assignment": assignment})
+
+    # active assignments (permanent + activated PIM)
+    for a in graph.get_paged_values("/v1.0/roleManagement/directory/roleAssignments?$expand=principal"):
+        _add(a, "active")
+
+    eligibility = True
+    try:
+        for a in graph.get_paged_values(
+            "/v1.0/roleManagement/directory/roleEligibilityScheduleInstances?$expand=principal"
+        ):
+            _add(a, "eligible")
+    except HttpError as ex:
+        eligibility = False
+        print(f"[roles_service] PIM eligibility skipped: {ex}")
+
+    return {
+        "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "eligibility": eligibility,
+        "definitions": definitions,
+        "role_members": role_members,
+        "member_roles": member_roles,
+    }
+
+def role_index(graph: GraphClient, tenant_id: str, *, max_age_sec: float | None = INDEX_MAX_AGE_SEC) -> dict:
+    """
+    role -> members and member -> roles, shared through Static/role_index.json.
+    Callers within max_age_sec (or waiting on a concurrent crawl) reuse the file.
+    """
+    return build_once(_index_path(tenant_id), lambda: _crawl_index(graph), max_age_sec=max_age_sec)
+
 def list_directory_roles(graph: GraphClient, tenant_id: str) -> dict:
     """
-    Permissions: RoleManagement.Read.Directory (or Directory.Read.All)
-    Stores roles with member counts and member ids (light).
+    Stores roles that have members, keyed by role definition (templateId for
+    built-ins), with member dicts {id, type, upn, displayName, assignment, scope}.
     """
+    idx = role_index(graph, tenant_id)
+    mfa = auth_methods_service.load_index(tenant_id)
     roles = []
-    # Active roles
-    for page in graph.get_paged_values("/v1.0/directoryRoles?$select=id,displayName,roleTemplateId"):
-        for r in page.get("value", []):
-            rid = r.get("id"); name = r.get("displayName","")
-            members = []
-            # Members per role (id only to keep file small)
-            for mpage in graph.get_paged_values(f"/v1.0/directoryRoles/{rid}/members?$select=id"):
-                for m in mpage.get("value", []):
-                    mid = m.get("id")
-                    if mid: members.append(mid)
-            roles.append({
-                "id": rid,
-                "name": name,
-                "member_count": len(members),
-                "members": members
-            })
+    for rid, members in idx.get("role_members", {}).items():
+        d = idx.get("definitions", {}).get(rid) or {"id": rid, "templateId": rid, "displayName": rid}
+        auth_methods_service.annotate_members(members, mfa)
+        active = [m for m in members if m.get("assignment") == "active"]
+        roles.append({
+            "id": rid,
+            "templateId": d.get("templateId"),
+            "name": d.get("displayName", ""),
+            "displayName": d.get("displayName", ""),
+            "isBuiltIn": d.get("isBuiltIn"),
+            "member_count": len(active),
+            "eligible_count": len(members) - len(active),
+            "members": members,
+        })
+    roles.sort(key=lambda r: r["name"])
 
     cp = _path(tenant_id)
     out = {
-        "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "fetched_at": idx.get("fetched_at"),
+        "eligibility": idx.get("eligibility"),
         "roles": roles
     }
     write_json_atomic(cp, out)
@@ -0,0 +1,131 @@
+# src/tenantsec/core/snapshot_diff.py
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional
+
+from tenantsec.core import snapshot_store
+from tenantsec.core.cache import write_json_atomic
+from tenantsec.app import event_bus
+
+# Kinds reported by default (CA policies, role members, grants, app credentials, users).
+DRIFT_KINDS = (
+    "ca_policies", "named_locations", "roles", "oauth_grants",
+    "applications", "service_principals", "users", "organization", "org_config",
+)
+
+# Keys that identify elements of object lists (credentials, assignments, ...).
+_LIST_KEYS = ("keyId", "id", "resourceAppId", "appId")
+
+def _label(obj: Any, key: str) -> str:
+    if not isinstance(obj, dict):
+        return key
+    return str(obj.get("displayName") or obj.get("name") or obj.get("upn")
+               or obj.get("userPrincipalName") or obj.get("scope") or key)
+
+def _list_key(items: List[Any]) -> Optional[str]:
+    if not items or not all(isinstance(x, dict) for x in items):
+        return None
+    for k in _LIST_KEYS:
+        if all(x.get(k) for x in items):
+            return k
+    return None
+
+def _scalar(v: Any) -> Any:
+    # unhashable leftovers are compared via their canonical form
+    return v if isinstance(v, (str, int, float, bool, type(None))) else snapshot_store.canonical_bytes(v).decode("utf-8")
+
+def diff_values(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """Field-level changes between two JSON values; lists are diffed as sets or keyed rows."""
+    if old == new:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        out: List[Dict[str, Any]] = []
+        for k in sorted(set(old) | set(new)):
+            if old.get(k) != new.get(k):
+                out.extend(diff_values(old.get(k), new.get(k), f"{path}.{k}" if path else k))
+        return out
+    if isinstance(old, list) and isinstance(new, list):
+        key = _list_key(old + new)
+        if key:
+            a = {x[key]: x for x in old}
+            b = {x[key]: x for x in new}
+            out = []
+            added = [b[k] for k in b if k not in a]
+            removed = [a[k] for k in a if k not in b]
+            if added or removed:
+                out.append({"path": path, "added": added, "removed": removed})
+            for k in sorted(a.keys() & b.keys(), key=str):
+                out.extend(diff_values(a[k], b[k], f"{path}[{key}={k}]"))
+            return out
+        a = {_scalar(x) for x in old}
+        b = {_scalar(x) for x in new}
+        if a == b:
+            return []  # order-only change
+        return [{"path": path, "added": sorted(b - a, key=str), "removed": sorted(a - b, key=str)}]
+    return [{"path": path, "old": old, "new": new}]
+
+def diff_manifests(
+    tenant_id: str,
+    old: Dict[str, Any],
+    new: Dict[str, Any],
+    *,
+    kinds: Iterable[str] = DRIFT_KINDS,
+) -> Dict[str, Any]:
+    """
+    Compare two snapshot manifests. Objects whose hashes match are skipped
+    without being loaded; only changed objects are read back for field diffs.
+    """
+    old_objs = old.get("objects") or {}
+    new_objs = new.get("objects") or {}
+    report: Dict[str, Any] = {}
+    summary: Dict[str, Dict[str, int]] = {}
+
+    for kind in kinds:
+        a: Dict[str, str] = old_objs.get(kind) or {}
+        b: Dict[str, str] = new_objs.get(kind) or {}
+        if a == b:
+            continue
+
+        added, removed, modified = [], [], []
+        for key, h in b.items():
+            prev = a.get(key)
+            if prev is None:
+                added.append({"id": key, "name": _label(snapshot_store.load_object(tenant_id, h), key)})
+            elif prev != h:
+                before = snapshot_store.load_object(tenant_id, prev)
+                after = snapshot_store.load_object(tenant_id, h)
+                modified.append({"id": key, "name": _label(after, key),
+                                 "changes": diff_values(before, after)})
+        for key, h in a.items():
+            if key not in b:
+                removed.append({"id": key, "name": _label(snapshot_store.load_object(tenant_id, h), key)})
+
+        if added or removed or modified:
+            report[kind] = {"added": added, "removed": removed, "modified": modified}
+            summary[kind] = {"added": len(added), "removed": len(removed), "modified": len(modified)}
+
+    return {
+        "tenant_id": tenant_id,
+        "from": old.get("id"),
+        "to": new.get("id"),
+        "summary": summary,
+        "kinds": report,
+    }
+
+def diff_snapshots(tenant_id: str, old_id: str, new_id: str, **kw) -> Dict[str, Any]:
+    old = snapshot_store.load_manifest(tenant_id, old_id) or {}
+    new = snapshot_store.load_manifest(tenant_id, new_id) or {}
+    return diff_manifests(tenant_id, old, new, **kw)
+
+def latest_drift(tenant_id: str) -> Optional[Dict[str, Any]]:
+    """Diff the two newest snapshots and store the report as History/drift_latest.json."""
+    pair = snapshot_store.latest_manifests(tenant_id, 2)
+    if len(pair) < 2:
+        return None
+    report = diff_manifests(tenant_id, pair[0], pair[1])
+    write_json_atomic(snapshot_store._root(tenant_id) / "drift_latest.json", report)
+    event_bus.publish("history.drift.ready", {"tenant_id": tenant_id, "summary": report["summary"]})
+    return report
+
+def snapshot_and_diff(tenant_id: str) -> Optional[Dict[str, Any]]:
+    snapshot_store.take_snapshot(tenant_id)
+    return latest_drift(tenant_id)
@@ -0,0 +1,178 @@
+# src/tenantsec/core/snapshot_store.py
+from __future__ import annotations
+import hashlib, json, pathlib, time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from tenantsec.core.cache import cache_dir, read_json, write_json_atomic
+from tenantsec.config.loader import get_history_config
+from tenantsec.app import event_bus
+
+BUCKET = "History"
+
+# Fields that change on every crawl without being configuration drift.
+VOLATILE_FIELDS: Dict[str, set] = {
+    "users": {"last_sign_in"},
+}
+
+def _root(tenant_id: str) -> pathlib.Path:
+    return cache_dir(tenant_id, BUCKET)
+
+def _objects_dir(tenant_id: str) -> pathlib.Path:
+    return _root(tenant_id) / "objects"
+
+def _snapshots_dir(tenant_id: str) -> pathlib.Path:
+    p = _root(tenant_id) / "snapshots"
+    p.mkdir(parents=True, exist_ok=True)
+    return p
+
+def canonical_bytes(obj: Any) -> bytes:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def object_hash(obj: Any) -> str:
+    return hashlib.sha256(canonical_bytes(obj)).hexdigest()
+
+def _object_path(tenant_id: str, h: str) -> pathlib.Path:
+    return _objects_dir(tenant_id) / h[:2] / f"{h}.json"
+
+def _store(tenant_id: str, obj: Any) -> Tuple[str, bool]:
+    raw = canonical_bytes(obj)
+    h = hashlib.sha256(raw).hexdigest()
+    p = _object_path(tenant_id, h)
+    if p.exists():
+        return h, False
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(".tmp")
+    tmp.write_bytes(raw)
+    tmp.replace(p)
+    return h, True
+
+def put_object(tenant_id: str, obj: Any) -> str:
+    """Store obj once under its content hash; returns the hash."""
+    return _store(tenant_id, obj)[0]
+
+def load_object(tenant_id: str, h: str) -> Optional[Any]:
+    return read_json(_object_path(tenant_id, h))
+
+# ---------- extraction from Static sheets ----------
+def _static(tenant_id: str, name: str) -> Dict[str, Any]:
+    return read_json(cache_dir(tenant_id, "Static") / name) or {}
+
+def _keyed(items: Iterable[Dict[str, Any]], key: str = "id") -> Iterable[Tuple[str, Dict[str, Any]]]:
+    for it in items or []:
+        if isinstance(it, dict) and it.get(key):
+            yield str(it[key]), it
+
+def _ca_block(policies: Dict[str, Any]) -> Dict[str, Any]:
+    # policy_service writes a list, ca_service a {"policies", "namedLocations"} dict
+    ca = policies.get("conditional_access") or {}
+    return ca if isinstance(ca, dict) else {"policies": ca}
+
+def _collect(tenant_id: str) -> Dict[str, Iterable[Tuple[str, Any]]]:
+    users = _static(tenant_id, "users_index.json")
+    policies = _static(tenant_id, "policies.json")
+    ca = _ca_block(policies)
+    roles = _static(tenant_id, "roles.json")
+    oauth = _static(tenant_id, "oauth_apps.json")
+    org = _static(tenant_id, "org_summary.json").get("organization")
+    org_config = _static(tenant_id, "org_config.json")
+
+    kinds: Dict[str, Iterable[Tuple[str, Any]]] = {
+        "users": _keyed(users.get("users")),
+        "ca_policies": _keyed(ca.get("policies")),
+        "named_locations": _keyed(ca.get("namedLocations")),
+        "roles": _keyed(roles.get("roles")),
+        "service_principals": _keyed(oauth.get("servicePrincipals")),
+        "applications": _keyed(oauth.get("applications")),
+        "oauth_grants": _keyed(oauth.get("oauth2PermissionGrants")),
+    }
+    if org:
+        kinds["organization"] = [("organization", org)]
+    if org_config:
+        kinds["org_config"] = [("org_config", org_config)]
+    return kinds
+
+# ---------- snapshots ----------
+def take_snapshot(tenant_id: str, *, keep: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Hash every object in the current Static sheets into the content store and
+    write a manifest {kind: {object_key: hash}}. Unchanged objects cost nothing.
+    """
+    snap_id = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    objects: Dict[str, Dict[str, str]] = {}
+    new_objects = 0
+    for kind, items in _collect(tenant_id).items():
+        drop = VOLATILE_FIELDS.get(kind, set())
+        refs: Dict[str, str] = {}
+        for key, obj in items:
+            if drop:
+                obj = {k: v for k, v in obj.items() if k not in drop}
+            refs[key], created = _store(tenant_id, obj)
+            new_objects += created
+        objects[kind] = refs
+
+    manifest = {
+        "id": snap_id,
+        "taken_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "objects": objects,
+    }
+    write_json_atomic(_snapshots_dir(tenant_id) / f"{snap_id}.json", manifest)
+
+    keep = keep if keep is not None else get_history_config().get("keep_snapshots", 0)
+    if keep:
+        prune_snapshots(tenant_id, keep=keep)
+
+    total = sum(len(v) for v in objects.values())
+    print(f"[snapshot_store] snapshot {snap_id}: {total} objects, {new_objects} new")
+    event_bus.publish("history.snapshot.ready", {"tenant_id": tenant_id, "snapshot_id": snap_id,
+                                                 "objects": total, "new_objects": new_objects})
+    return manifest
+
+def list_snapshots(tenant_id: str) -> List[str]:
+    """Snapshot ids, oldest first (ids sort chronologically)."""
+    return sorted(p.stem for p in _snapshots_dir(tenant_id).glob("*.json"))
+
+def load_manifest(tenant_id: str, snap_id: str) -> Optional[Dict[str, Any]]:
+    return read_json(_snapshots_dir(tenant_id) / f"{snap_id}.json")
+
+def latest_manifests(tenant_id: str, n: int = 2) -> List[Dict[str, Any]]:
+    out = []
+    for sid in list_snapshots(tenant_id)[-n:]:
+        m = load_manifest(tenant_id, sid)
+        if m:
+            out.append(m)
+    return out
+
+def materialize(tenant_id: str, manifest: Dict[str, Any], kind: str,
+                select: Optional[Callable[[str], bool]] = None) -> Dict[str, Any]:
+    """Load the objects of one kind back from the store ({key: object})."""
+    out: Dict[str, Any] = {}
+    for key, h in (manifest.get("objects") or {}).get(kind, {}).items():
+        if select and not select(key):
+            continue
+        obj = load_object(tenant_id, h)
+        if obj is not None:
+            out[key] = obj
+    return out
+
+def prune_snapshots(tenant_id: str, *, keep: int) -> int:
+    """Drop all but the newest `keep` manifests, then GC unreferenced objects."""
+    ids = list_snapshots(tenant_id)
+    if keep <= 0 or len(ids) <= keep:
+        return 0
+    for sid in ids[:-keep]:
+        (_snapshots_dir(tenant_id) / f"{sid}.json").unlink(missing_ok=True)
+
+    live = set()
+    for sid in ids[-keep:]:
+        m = load_manifest(tenant_id, sid) or {}
+        for refs in (m.get("objects") or {}).values():
+            live.update(refs.values())
+
+    removed = 0
+    objects = _objects_dir(tenant_id)
+    if objects.exists():
+        for p in objects.glob("*/*.json"):
+            if p.stem not in live:
+                p.unlink(missing_ok=True)
+                removed += 1
+    return removed
@@ -1,18 +1,77 @@
 from __future__ import annotations
-from typing import List
+from typing import Any, Dict, Iterable, List, Tuple
 import pathlib, time
 
 from tenantsec.app import event_bus
 from tenantsec.core.graph_client import GraphClient
 from tenantsec.core.models import UserLite
-from tenantsec.core.cache import cache_dir, read_json, write_json_atomic
-from tenantsec.http.errors import HttpError
+from tenantsec.core.cache import cache_dir, read_json, write_json_atomic, update_json, build_once
+from tenantsec.core import license_service, roles_service, auth_methods_service
+from tenantsec.core.crawl_journal import CrawlJournal
+from tenantsec.http.errors import HttpError, NotFoundError
 
 
 def _cache_path(tenant_id: str, bucket: str) -> pathlib.Path:
     return cache_dir(tenant_id, bucket) / "users_index.json"
 
 
+def _merge_users(
+    tenant_id: str,
+    updates: Dict[str, Dict[str, Any]],
+    fields: Iterable[str],
+    *,
+    drop_fields: Iterable[str] = (),
+    bucket: str = "Static",
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Merge per-user field updates into users_index.json under the cache lock,
+    re-reading the file so enrichments running in other threads/processes
+    are kept. Returns only what actually changed: {user_id: {column: new value}}
+    (dropped columns map to None).
+    """
+    def _apply(data: dict) -> Dict[str, Dict[str, Any]]:
+        changes: Dict[str, Dict[str, Any]] = {}
+        for u in data.setdefault("users", []):
+            uid = u.get("id")
+            upd = updates.get(uid)
+            diff = {k: v for k, v in upd.items() if u.get(k) != v} if upd else {}
+            if diff:
+                u.update(diff)
+            for k in drop_fields:
+                if k in u:
+                    u.pop(k)
+                    diff[k] = None
+            if diff:
+                changes[uid] = diff
+        fl = data.setdefault("fields", [])
+        for f in fields:
+            if f not in fl:
+                fl.append(f)
+        for f in drop_fields:
+            if f in fl:
+                fl.remove(f)
+        return changes
+
+    return update_json(_cache_path(tenant_id, bucket), _apply, default={"users": [], "fields": []})
+
+
+def _publish_updated(
+    tenant_id: str,
+    fields: Iterable[str],
+    changes: Dict[str, Dict[str, Any]],
+    *,
+    removed: Iterable[str] = (),
+) -> None:
+    """users.list.updated with row-level changes so views patch rows instead of reloading."""
+    event_bus.publish("users.list.updated", {
+        "tenant_id": tenant_id,
+        "added_fields": list(fields),
+        "changes": changes,
+        "changed_columns": sorted({c for row in changes.values() for c in row}),
+        "removed": list(removed),
+    })
+
+
 
 
 def list_users(
@@ -43,23 +102,33 @@ def list_users(
                 ))
             return out
 
-    users: List[UserLite] = []
-    select = "id,displayName,userPrincipalName,jobTitle"
-    for it in graph.get_paged_values(f"/v1.0/users?$select={select}&$top=999", page_limit=page_limit):
-        users.append(UserLite(
-            id=it.get("id", ""),
-            upn=it.get("userPrincipalName", ""),
-            display_name=it.get("displayName") or it.get("userPrincipalName", ""),
-            job_title=it.get("jobTitle"),
-        ))
-
-    data = {
-        "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-        "fields": ["id", "upn", "display_name", "job_title"], 
-        "users": [u.__dict__ for u in users],
-    }
-    write_json_atomic(cp, data)
-    return users
+    def _crawl() -> dict:
+        users: List[UserLite] = []
+        select = "id,displayName,userPrincipalName,jobTitle"
+        for it in graph.get_paged_values(f"/v1.0/users?$select={select}&$top=999", page_limit=page_limit):
+            users.append(UserLite(
+                id=it.get("id", ""),
+                upn=it.get("userPrincipalName", ""),
+                display_name=it.get("displayName") or it.get("userPrincipalName", ""),
+                job_title=it.get("jobTitle"),
+            ))
+        return {
+            "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "fields": ["id", "upn", "display_name", "job_title"],
+            "users": [u.__dict__ for u in users],
+        }
+
+    # another process connecting to the same tenant may finish the crawl first
+    data = build_once(cp, _crawl)
+    return [
+        UserLite(
+            id=u.get("id", ""),
+            upn=u.get("upn", ""),
+            display_name=u.get("display_name") or u.get("upn", ""),
+            job_title=u.get("job_title"),
+        )
+        for u in data.get("users", [])
+    ]
 
 
 def enrich_licenses(graph: GraphClient, tenant_id: str):
@@ -67,41 +136,24 @@ def enrich_licenses(graph: GraphClient, tenant_id: str):
     Attach human-readable license names per user.
     Adds/updates 'license_names' and appends field name to 'fields'.
     """
-    cp = _cache_path(tenant_id, "Static")
     try:
-        data = read_json(cp) or {"users": [], "fields": []}
-        users = data.get("users", [])
-
         # 1) SKU map
         sku_map = {}
-        for page in graph.get_paged_values("/v1.0/subscribedSkus?$select=skuId,skuPartNumber,prepaidUnits"):
-            for s in page.get("value", []):
-                sku_map[s.get("skuId")] = s.get("skuPartNumber")
+        for s in graph.get_paged_values("/v1.0/subscribedSkus?$select=skuId,skuPartNumber,prepaidUnits"):
+            sku_map[s.get("skuId")] = s.get("skuPartNumber")
 
         # 2) Per-user assigned licenses
         user_licenses = {}
-        for page in graph.get_paged_values("/v1.0/users?$select=id,assignedLicenses&$top=999"):
-            for u in page.get("value", []):
-                uid = u.get("id")
-                if not uid:
-                    continue
-                names = [sku_map.get(a.get("skuId"), a.get("skuId")) for a in (u.get("assignedLicenses") or []) if a.get("skuId")]
-                user_licenses[uid] = names
-
-        # 3) Merge
-        for u in users:
+        for u in graph.get_paged_values("/v1.0/users?$select=id,assignedLicenses&$top=999"):
             uid = u.get("id")
-            if uid in user_licenses:
-                u["license_names"] = user_licenses[uid]
-
-        if "license_names" not in data.get("fields", []):
-            data["fields"].append("license_names")
+            if not uid:
+                continue
+            names = [sku_map.get(a.get("skuId"), a.get("skuId")) for a in (u.get("assignedLicenses") or []) if a.get("skuId")]
+            user_licenses[uid] = names
 
-        write_json_atomic(cp, data)
-        event_bus.publish("users.list.updated", {
-            "tenant_id": tenant_id,
-            "added_fields": ["license_names"],
-        })
+        # 3) Merge
+        changes = _merge_users(tenant_id, {uid: {"license_names": n} for uid, n in user_licenses.items()}, ["license_names"])
+        _publish_updated(tenant_id, ["license_names"], changes)
         print(f"[user_service] enriched licenses for {len(user_licenses)} users")
 
     except HttpError as ex:
@@ -110,45 +162,25 @@ def enrich_licenses(graph: GraphClient, tenant_id: str):
 
 def enrich_roles(graph: GraphClient, tenant_id: str):
     """
-    Add 'roles': [...] for users who are members of directory roles.
+    Add 'roles' (active) and 'eligible_roles' (PIM) name lists for role members,
+    from the role index shared with roles_service.list_directory_roles.
     """
-    cp = _cache_path(tenant_id, "Static")
     try:
-        data = read_json(cp) or {"users": [], "fields": []}
-        users = data.get("users", [])
-
-        # Roles
-        role_map = {}
-        for page in graph.get_paged_values("/v1.0/directoryRoles?$select=id,displayName"):
-            for r in page.get("value", []):
-                rid = r.get("id")
-                if rid:
-                    role_map[rid] = r.get("displayName", "Unknown")
-
-        # Members per role
-        role_members = {}
-        for role_id, name in role_map.items():
-            for page in graph.get_paged_values(f"/v1.0/directoryRoles/{role_id}/members?$select=id"):
-                for m in page.get("value", []):
-                    mid = m.get("id")
-                    if mid:
-                        role_members.setdefault(mid, []).append(name)
-
-        # Merge
-        for u in users:
-            uid = u.get("id")
-            if uid in role_members:
-                u["roles"] = sorted(role_members[uid])
-
-        if "roles" not in data.get("fields", []):
-            data["fields"].append("roles")
-
-        write_json_atomic(cp, data)
-        event_bus.publish("users.list.updated", {
-            "tenant_id": tenant_id,
-            "added_fields": ["roles"],
-        })
-        print(f"[user_service] enriched roles for {len(role_members)} users")
+        idx = roles_service.role_index(graph, tenant_id)
+        updates: Dict[str, Dict[str, Any]] = {}
+        for uid, assigned in idx.get("member_roles", {}).items():
+            updates[uid] = {
+                "roles": sorted({r["name"] for r in assigned if r.get("assignment") == "active"}),
+                "eligible_roles": sorted({r["name"] for r in assigned if r.get("assignment") == "eligible"}),
+            }
+        # clear memberships that were removed since the last run
+        for u in (read_json(_cache_path(tenant_id, "Static")) or {}).get("users", []):
+            if u.get("id") and (u.get("roles") or u.get("eligible_roles")):
+                updates.setdefault(u["id"], {"roles": [], "eligible_roles": []})
+
+        changes = _merge_users(tenant_id, updates, ["roles", "eligible_roles"])
+        _publish_updated(tenant_id, ["roles", "eligible_roles"], changes)
+        print(f"[user_service] enriched roles for {len(updates)} principals")
 
     except HttpError as ex:
         print(f"[user_service] Role enrichment failed: {ex}")
@@ -161,31 +193,15 @@ def enrich_mfa_state(graph: GraphClient, tenant_id: str):
     Add 'mfa_state': 'Registered' | 'NotRegistered'
     Requires Microsoft Graph Application permission: Reports.Read.All (with admin consent).
     """
-    cp = _cache_path(tenant_id, "Static")
     try:
-        data = read_json(cp) or {"users": [], "fields": []}
-        users = data.get("users", [])
-
         mfa_map = {}
-        for page in graph.get_paged_values("/v1.0/reports/credentialUserRegistrationDetails?$top=999"):
-            for u in page.get("value", []):
-                uid = u.get("id")
-                if uid:
-                    mfa_map[uid] = "Registered" if u.get("isMfaRegistered") else "NotRegistered"
-
-        for u in users:
+        for u in graph.get_paged_values("/v1.0/reports/credentialUserRegistrationDetails?$top=999"):
             uid = u.get("id")
-            if uid in mfa_map:
-                u["mfa_state"] = mfa_map[uid]
-
-        if "mfa_state" not in data.get("fields", []):
-            data["fields"].append("mfa_state")
+            if uid:
+                mfa_map[uid] = "Registered" if u.get("isMfaRegistered") else "NotRegistered"
 
-        write_json_atomic(cp, data)
-        event_bus.publish("users.list.updated", {
-            "tenant_id": tenant_id,
-            "added_fields": ["mfa_state"],
-        })
+        changes = _merge_users(tenant_id, {uid: {"mfa_state": st} for uid, st in mfa_map.items()}, ["mfa_state"])
+        _publish_updated(tenant_id, ["mfa_state"], changes)
         print(f"[user_service] enriched MFA for {len(mfa_map)} users")
 
     except ForbiddenError:
@@ -202,88 +218,121 @@ def enrich_signin_activity(graph: GraphClient, tenant_id: str):
     Add 'last_sign_in' from users.signInActivity (if present for your tenant).
     Fallback to audit logs can be added later.
     """
-    cp = _cache_path(tenant_id, "Static")
     try:
-        data = read_json(cp) or {"users": [], "fields": []}
-        users = data.get("users", [])
-
         user_signins = {}
-        for page in graph.get_paged_values("/v1.0/users?$select=id,signInActivity&$top=999"):
-            for u in page.get("value", []):
-                sid = u.get("id")
-                activity = u.get("signInActivity")
-                if sid and activity:
-                    user_signins[sid] = activity.get("lastSignInDateTime")
-
-        for u in users:
-            uid = u.get("id")
-            if uid in user_signins:
-                u["last_sign_in"] = user_signins[uid]
-
-        if "last_sign_in" not in data.get("fields", []):
-            data["fields"].append("last_sign_in")
-
-        write_json_atomic(cp, data)
-        event_bus.publish("users.list.updated", {
-            "tenant_id": tenant_id,
-            "added_fields": ["last_sign_in"],
-        })
+        for u in graph.get_paged_values("/v1.0/users?$select=id,signInActivity&$top=999"):
+            sid = u.get("id")
+            activity = u.get("signInActivity")
+            if sid and activity:
+                user_signins[sid] = activity.get("lastSignInDateTime")
+
+        changes = _merge_users(tenant_id, {uid: {"last_sign_in": ts} for uid, ts in user_signins.items()}, ["last_sign_in"])
+        _publish_updated(tenant_id, ["last_sign_in"], changes)
         print(f"[user_service] enriched sign-in activity for {len(user_signins)} users")
 
     except HttpError as ex:
         print(f"[user_service] Sign-in enrichment failed: {ex}")
 
 
-def enrich_license_details(graph: GraphClient, tenant_id: str, *, max_users: int | None = None):
+def enrich_auth_methods(graph: GraphClient, tenant_id: str, *, per_user: bool = True):
     """
-    Per user: add only 'license_skus' (list of skuPartNumber). No servicePlans.
+    Add 'mfa_state' and 'mfa_methods' from the authentication-methods index:
+    the registration report for all users, live methods (batched) for role
+    members unless per_user is False. Also annotates role members in roles.json.
     """
-    cp = _cache_path(tenant_id, "Static")
-    try:
-        data = read_json(cp) or {"users": [], "fields": []}
-        users = data.get("users", [])
-
-        count = 0
-        for u in users:
-            uid = u.get("id")
-            if not uid:
-                continue
-            if max_users is not None and count >= max_users:
-                break
-
-            ld = graph.get_json(f"/v1.0/users/{uid}/licenseDetails?$select=skuPartNumber")
-            items = ld.get("value", [])
-
-            skus = []
-            for item in items:
-                sku_num = item.get("skuPartNumber")
-                if sku_num:
-                    skus.append(sku_num)
+    privileged: List[str] = []
+    if per_user:
+        idx = roles_service.role_index(graph, tenant_id)
+        privileged = [m["id"] for members in idx.get("role_members", {}).values()
+                      for m in members if m.get("type") == "user"]
+    index = auth_methods_service.build_index(graph, tenant_id, privileged_ids=privileged)
+    if not index:
+        return
 
-            if skus:
-                u["license_skus"] = sorted(set(skus))
+    updates = {uid: {"mfa_state": e["mfa_state"], "mfa_methods": e["mfa_methods"]} for uid, e in index.items()}
+    changes = _merge_users(tenant_id, updates, ["mfa_state", "mfa_methods"])
+    _publish_updated(tenant_id, ["mfa_state", "mfa_methods"], changes)
+    auth_methods_service.join_roles_sheet(tenant_id, index)
 
-            u.pop("license_details", None)
 
-            count += 1
+def _resolve_fallbacks(
+    graph: GraphClient,
+    tenant_id: str,
+    user_ids: Iterable[str],
+    *,
+    max_users: int | None = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-user licenseDetails for the few users the SKU catalog can't resolve.
+    Checkpointed in the "license_fallbacks" journal, so an interrupted run
+    skips users already fetched.
+    """
+    ids = list(user_ids)
+    journal = CrawlJournal(tenant_id, "license_fallbacks", params={"max_users": max_users})
+    fetched: List[Any] = journal.log("fetched")  # [uid, row] pairs
+    out: Dict[str, Dict[str, Any]] = dict(fetched)
+    for uid in ids:
+        if max_users is not None and len(out) >= max_users:
+            break
+        if journal.is_done(uid):
+            continue
+        try:
+            out[uid] = license_service.fetch_license_details(graph, uid)
+            fetched.append([uid, out[uid]])
+        except NotFoundError:
+            pass
+        except HttpError as ex:
+            # one user's licenseDetails (403, throttled after retries, 5xx) must not sink the scan
+            print(f"[user_service] licenseDetails for {uid} failed ({getattr(ex, 'status', '?')}); left unset")
+        journal.mark_done(uid)
+    journal.complete()
+    wanted = set(ids)
+    return {uid: row for uid, row in out.items() if uid in wanted}
 
-        fields = data.setdefault("fields", [])
-        if "license_skus" not in fields:
-            fields.append("license_skus")
 
-        if "license_details" in fields:
-            fields.remove("license_details")
+def enrich_license_details(graph: GraphClient, tenant_id: str, *, max_users: int | None = None):
+    """
+    Per user: 'license_skus' (skuPartNumbers) and 'disabled_plans' (servicePlanNames),
+    resolved from assignedLicenses + the subscribedSkus catalog in one /users scan.
+    /users/{id}/licenseDetails is only called for SKUs missing from the catalog
+    (at most max_users of them).
+    """
+    try:
+        catalog = license_service.sku_catalog(graph)
 
-        write_json_atomic(cp, data)
-        event_bus.publish("users.list.updated", {
-            "tenant_id": tenant_id,
-            "added_fields": ["license_skus"],
-        })
-        print(f"[user_service] enriched license_skus for ~{count} users")
+        url = "/v1.0/users?$select=id,assignedLicenses&$top=999"
+        journal = CrawlJournal(tenant_id, "license_details", params={"url": url})
+        resolved: List[Any] = journal.log("resolved")  # [uid, row] pairs
+        unresolved: List[str] = journal.log("unresolved")
+        for page in journal.pages(graph, url):
+            for u in page.get("value", []):
+                uid = u.get("id")
+                if not uid:
+                    continue
+                row = license_service.resolve_assigned(u.get("assignedLicenses"), catalog)
+                if row is None:
+                    unresolved.append(uid)
+                else:
+                    resolved.append([uid, row])
+        journal.checkpoint(force=True)
+
+        updates: Dict[str, Dict[str, Any]] = dict(resolved)
+        updates.update(_resolve_fallbacks(graph, tenant_id, unresolved, max_users=max_users))
+        changes = _merge_users(tenant_id, updates, LICENSE_DETAIL_FIELDS, drop_fields=["license_details"])
+        _publish_updated(tenant_id, LICENSE_DETAIL_FIELDS, changes)
+        journal.complete()
+        print(f"[user_service] resolved licenses for {len(updates)} users ({len(unresolved)} via licenseDetails)")
 
     except HttpError as ex:
         print(f"[user_service] License SKU enrichment failed: {ex}")
 
+LICENSE_DETAIL_FIELDS = ("license_skus", "disabled_plans")
+
+PROFILE_FIELDS = (
+    "mail","mobilePhone","officeLocation","givenName","surname","userType",
+    "accountEnabled","createdDateTime","department","companyName","usageLocation",
+)
+
 def enrich_profile(graph: GraphClient, tenant_id: str):
     """
     Pull a richer set of user properties to expand what's available to display.
@@ -291,38 +340,169 @@ def enrich_profile(graph: GraphClient, tenant_id: str):
     """
     cp = _cache_path(tenant_id, "Static")
     data = read_json(cp) or {"users": [], "fields": []}
-    users = data.get("users", [])
-    if not users:
+    if not data.get("users"):
         return
 
-    sel = ",".join([
-        "id","userPrincipalName","displayName","jobTitle","mail","mobilePhone",
-        "officeLocation","givenName","surname","userType","accountEnabled",
-        "createdDateTime","department","companyName","usageLocation"
-    ])
+    sel = ",".join(["id","userPrincipalName","displayName","jobTitle", *PROFILE_FIELDS])
+
+    updates: Dict[str, Dict[str, Any]] = {}
+    for it in graph.get_paged_values(f"/v1.0/users?$select={sel}&$top=999"):
+        uid = it.get("id")
+        if not uid:
+            continue
+        row = updates[uid] = {}
+        for src, dst in (("userPrincipalName", "upn"), ("displayName", "display_name"), ("jobTitle", "job_title")):
+            if src in it:
+                row[dst] = it.get(src)
+        for k in PROFILE_FIELDS:
+            v = it.get(k)
+            if v is not None:
+                row[k] = v
+
+    changes = _merge_users(tenant_id, updates, PROFILE_FIELDS)
+    _publish_updated(tenant_id, PROFILE_FIELDS, changes)
+
+
+# ---------- single-pass crawl ----------
+# Each consumer maps one raw /users row onto index fields:
+# (name, $select fields it needs, index fields it adds, fn(raw, ctx) -> dict)
+BASE_FIELDS = ("id", "upn", "display_name", "job_title")
+
+def _row_base(it: Dict[str, Any], ctx: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": it.get("id", ""),
+        "upn": it.get("userPrincipalName", ""),
+        "display_name": it.get("displayName") or it.get("userPrincipalName", ""),
+        "job_title": it.get("jobTitle"),
+    }
 
-    idx = {u.get("id"): u for u in users}
+def _row_profile(it: Dict[str, Any], ctx: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: it[k] for k in PROFILE_FIELDS if it.get(k) is not None}
 
-    for page in graph.get_paged_values(f"/v1.0/users?$select={sel}&$top=999"):
-        for it in page.get("value", []):
-            uid = it.get("id")
-            row = idx.get(uid)
-            if not uid or not row:
-                continue
+def _row_licenses(it: Dict[str, Any], ctx: Dict[str, Any]) -> Dict[str, Any]:
+    sku_map = ctx.get("sku_map") or {}
+    return {"license_names": [sku_map.get(a.get("skuId"), a.get("skuId"))
+                              for a in (it.get("assignedLicenses") or []) if a.get("skuId")]}
+
+def _row_license_details(it: Dict[str, Any], ctx: Dict[str, Any]) -> Dict[str, Any]:
+    row = license_service.resolve_assigned(it.get("assignedLicenses"), ctx["catalog"])
+    if row is None:
+        ctx["unresolved"].append(it["id"])
+        return {}
+    return row
+
+def _row_signin_activity(it: Dict[str, Any], ctx: Dict[str, Any]) -> Dict[str, Any]:
+    activity = it.get("signInActivity")
+    return {"last_sign_in": activity.get("lastSignInDateTime")} if activity else {}
+
+USER_ROW_CONSUMERS = [
+    ("base", ("id", "displayName", "userPrincipalName", "jobTitle"), BASE_FIELDS, _row_base),
+    ("profile", PROFILE_FIELDS, PROFILE_FIELDS, _row_profile),
+    ("licenses", ("assignedLicenses",), ("license_names",), _row_licenses),
+    ("license_details", ("assignedLicenses",), LICENSE_DETAIL_FIELDS, _row_license_details),
+    ("signin_activity", ("signInActivity",), ("last_sign_in",), _row_signin_activity),
+]
 
-            row["upn"] = it.get("userPrincipalName", row.get("upn"))
-            row["display_name"] = it.get("displayName", row.get("display_name"))
-            row["job_title"] = it.get("jobTitle", row.get("job_title"))
-            for k in ("mail","mobilePhone","officeLocation","givenName","surname","userType",
-                      "accountEnabled","createdDateTime","department","companyName","usageLocation"):
-                v = it.get(k)
-                if v is not None:
-                    row[k] = v
-
-    f = set(data.get("fields", []))
-    f.update(["mail","mobilePhone","officeLocation","givenName","surname","userType",
-              "accountEnabled","createdDateTime","department","companyName","usageLocation"])
-    data["fields"] = sorted(f)
-
-    write_json_atomic(cp, data)
-    event_bus.publish("users.list.updated", {"tenant_id": tenant_id, "added_fields": list(f)})
+# signInActivity needs AuditLog.Read.All and a premium tenant; without them
+# Graph rejects the whole request, so the crawl retries without these consumers.
+OPTIONAL_CONSUMERS = ("signin_activity",)
+
+
+def crawl_users(
+    graph: GraphClient,
+    tenant_id: str,
+    *,
+    bucket: str = "Static",
+    page_limit: int | None = None,
+    per_user: bool = True,
+) -> List[UserLite]:
+    """
+    One paged /users scan with the union of every consumer's $select, fanned
+    out to the base index, profile, license and sign-in activity consumers.
+    Replaces list_users + enrich_profile + enrich_licenses + enrich_signin_activity
+    (four directory scans) with one. Fields from other enrichments are kept.
+    per_user=False skips the licenseDetails calls for SKUs missing from the catalog.
+    """
+    ctx: Dict[str, Any] = {"catalog": {}, "sku_map": {}, "unresolved": []}
+    try:
+        ctx["catalog"] = license_service.sku_catalog(graph)
+        ctx["sku_map"] = {k: v["skuPartNumber"] for k, v in ctx["catalog"].items()}
+    except HttpError as ex:
+        print(f"[user_service] SKU catalog unavailable, license names fall back to skuId: {ex}")
+
+    journal: CrawlJournal | None = None
+
+    def _scan(consumers) -> List[Dict[str, Any]]:
+        # rows and unresolved ids are checkpointed with each page's nextLink,
+        # so an interrupted crawl of a large tenant resumes mid-directory
+        nonlocal journal
+        sel = ",".join(dict.fromkeys(f for _n, src, _d, _fn in consumers for f in src))
+        url = f"/v1.0/users?$select={sel}&$top=999"
+        journal = CrawlJournal(tenant_id, f"users_{bucket}", params={"url": url, "page_limit": page_limit})
+        rows: List[Dict[str, Any]] = journal.log("rows")
+        ctx["unresolved"] = journal.log("unresolved")
+        for page in journal.pages(graph, url, page_limit=page_limit):
+            for it in page.get("value", []):
+                if not it.get("id"):
+                    continue
+                row: Dict[str, Any] = {}
+                for _name, _src, _dst, fn in consumers:
+                    row.update(fn(it, ctx))
+                rows.append(row)
+        journal.checkpoint(force=True)
+        return rows
+
+    consumers = list(USER_ROW_CONSUMERS)
+    if not ctx["catalog"]:
+        # without the catalog every licensed user would need a licenseDetails call
+        consumers = [c for c in consumers if c[0] != "license_details"]
+    try:
+        rows = _scan(consumers)
+    except HttpError as ex:
+        if ex.status not in (400, 403):
+            raise
+        consumers = [c for c in consumers if c[0] not in OPTIONAL_CONSUMERS]
+        print(f"[user_service] /users crawl rejected ({ex.status}); retrying without {', '.join(OPTIONAL_CONSUMERS)}")
+        if journal is not None:
+            journal.complete()
+        rows = _scan(consumers)
+
+    if ctx["unresolved"] and per_user:
+        fallback = _resolve_fallbacks(graph, tenant_id, ctx["unresolved"])
+        for row in rows:
+            row.update(fallback.get(row["id"]) or {})
+
+    fields = [f for _n, _s, dst, _fn in consumers for f in dst]
+
+    def _apply(data: dict) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        # rebuild the row list from the crawl (drops deleted users) but keep
+        # fields owned by other enrichments (roles, mfa_state, license_skus, ...)
+        prev = {u.get("id"): u for u in data.get("users", []) if u.get("id")}
+        users = []
+        changes: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            old = prev.get(row["id"]) or {}
+            diff = {k: v for k, v in row.items() if k not in old or old[k] != v}
+            if diff:
+                changes[row["id"]] = diff
+            u = dict(old)
+            u.update(row)
+            users.append(u)
+        seen = {r["id"] for r in rows}
+        removed = [uid for uid in prev if uid not in seen]
+        data["users"] = users
+        data["fetched_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        fl = data.setdefault("fields", [])
+        for f in fields:
+            if f not in fl:
+                fl.append(f)
+        return changes, removed
+
+    changes, removed = update_json(_cache_path(tenant_id, bucket), _apply, default={"users": [], "fields": []})
+    journal.complete()
+    _publish_updated(tenant_id, [f for f in fields if f not in BASE_FIELDS], changes, removed=removed)
+    print(f"[user_service] crawled {len(rows)} users in one pass ({', '.join(c[0] for c in consumers)})")
+    return [
+        UserLite(id=r["id"], upn=r.get("upn", ""), display_name=r.get("display_name", ""), job_title=r.get("job_title"))
+        for r in rows
+    ]
@@ -26,7 +26,9 @@ class RuleGlobalAdminCount(Rule):
         ga_count = 0
         for r in roles:
             if r.get("templateId") == "62e90394-69f5-4237-9190-012177145e10":
-                ga_count = len(r.get("members", []) or [])
+                # standing admins only; PIM-eligible members must activate first
+                ga_count = len([m for m in r.get("members", []) or []
+                                if not isinstance(m, dict) or m.get("assignment") != "eligible"])
                 break
         if ga_count <= 2:
             return []  # PASS baseline
@@ -38,10 +40,12 @@ class RuleAdminsWithoutMfa(Rule):
         members = _role_members(sheets, ADMIN_ROLE_TEMPLATE_IDS)
         offenders: List[Dict[str, Any]] = []
         for m in members:
+            if (m.get("type") or "user") != "user":
+                continue  # service principals / role-assignable groups have no MFA of their own
             state = (m.get("mfa_state") or m.get("mfaState") or "").lower()
             methods = [str(x).lower() for x in (m.get("mfa_methods") or m.get("mfaMethods") or [])]
             upn = m.get("upn") or m.get("userPrincipalName") or m.get("displayName") or m.get("id")
-            if state in ("", "disabled", "notenabled", "unknown"):
+            if state in ("", "disabled", "notenabled", "notregistered", "unknown"):
                 offenders.append({"id": m.get("id"), "upn": upn, "reason": "MFA not enabled"})
             elif methods and set(methods).issubset({"sms", "voice"}):
                 offenders.append({"id": m.get("id"), "upn": upn, "reason": "Weak MFA (SMS/voice only)"})
@@ -1,6 +1,7 @@
 # src/tenantsec/features/conditional_access/resolve.py
 from __future__ import annotations
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List, Set
+from tenantsec.core.group_service import GroupIndex
 
 def _id_to_upn_map(sheets: Dict[str, Any]) -> Dict[str, str]:
     items = ((sheets.get("users") or {}).get("items")) or []
@@ -12,6 +13,28 @@ def _role_id_to_name_map(sheets: Dict[str, Any]) -> Dict[str, str]:
     roles = roles_obj.get("roles") or roles_obj.get("value") or []
     return {r.get("id"): (r.get("displayName") or r.get("templateId") or r.get("id")) for r in roles}
 
+def group_index(sheets: Dict[str, Any]) -> GroupIndex:
+    g = sheets.get("groups")
+    return g if isinstance(g, GroupIndex) else GroupIndex(g if isinstance(g, dict) else None)
+
+def _role_user_ids(sheets: Dict[str, Any], role_ids: Iterable[str]) -> Set[str]:
+    wanted = set(role_ids)
+    roles = (sheets.get("roles") or {}).get("roles") or []
+    out: Set[str] = set()
+    for r in roles:
+        if r.get("id") in wanted or r.get("templateId") in wanted:
+            for m in r.get("members") or []:
+                if isinstance(m, dict) and m.get("type", "user") == "user" and m.get("assignment") != "eligible":
+                    out.add(m.get("id"))
+    return out
+
+def effective_excluded_users(sheets: Dict[str, Any], users: Iterable[str] = (),
+                             groups: Iterable[str] = (), roles: Iterable[str] = ()) -> Set[str]:
+    """Distinct user ids excluded directly, via (nested) groups, or via active role membership."""
+    out = group_index(sheets).effective_users(users, groups)
+    out |= _role_user_ids(sheets, roles)
+    return out
+
 def enrich_exclusion_names(sheets: Dict[str, Any], ev: Dict[str, Any]) -> Dict[str, Any]:
     """Add *_names arrays alongside excludeUsers/Groups/Roles."""
     users = ev.get("excludeUsers") or []
@@ -20,13 +43,17 @@ def enrich_exclusion_names(sheets: Dict[str, Any], ev: Dict[str, Any]) -> Dict[s
 
     upn_map = _id_to_upn_map(sheets)
     role_map = _role_id_to_name_map(sheets)
+    gi = group_index(sheets)
 
     ev = dict(ev)  # copy
     if users:
         ev["excludeUsers_names"] = [upn_map.get(uid, uid) for uid in users]
     if groups:
-        # until we cache groups, show the IDs verbatim:
-        ev["excludeGroups_names"] = groups
+        # IDs stay verbatim for groups missing from the cache
+        ev["excludeGroups_names"] = [gi.name(gid) or gid for gid in groups]
+        ev["excludeGroups_sizes"] = [gi.size(gid) for gid in groups]
     if roles:
         ev["excludeRoles_names"] = [role_map.get(rid, rid) for rid in roles]
+    if groups or roles:
+        ev["excluded_users_effective"] = len(effective_excluded_users(sheets, users, groups, roles))
     return ev
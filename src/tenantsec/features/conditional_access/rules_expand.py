@@ -2,6 +2,7 @@ from __future__ import annotations
 from typing import List, Dict, Any
 from tenantsec.review.rules import Rule
 from tenantsec.features.conditional_access.util import ca_sheet
+from tenantsec.features.conditional_access.resolve import effective_excluded_users
 # Helper: enumerate Conditional Access policies
 def _policies(sheets):
     return ca_sheet(sheets.get("policies") or {}).get("policies", [])
@@ -173,16 +174,20 @@ class RuleExcessiveExclusions(Rule):
             exclude_groups = users.get("excludeGroups", [])
             exclude_roles = users.get("excludeRoles", [])
             total_exclusions = len(exclude_users) + len(exclude_groups) + len(exclude_roles)
+            # one excluded group can hide thousands of users: count people, not IDs
+            effective = effective_excluded_users(sheets, exclude_users, exclude_groups, exclude_roles)
 
-            if total_exclusions >= self.EXCLUSION_THRESHOLD:
+            if total_exclusions >= self.EXCLUSION_THRESHOLD or len(effective) >= self.EXCLUSION_THRESHOLD:
                 findings.append({
-                    "reason": f"Policy contains too many exclusions ({total_exclusions}).",
+                    "reason": f"Policy excludes too many users ({len(effective)} effective, "
+                              f"{total_exclusions} direct exclusions).",
                     "policyId": p.get("id"),
                     "displayName": p.get("displayName"),
                     "exclusions": {
                         "users": len(exclude_users),
                         "groups": len(exclude_groups),
                         "roles": len(exclude_roles),
+                        "effective_users": len(effective),
                     }
                 })
 
@@ -7,6 +7,7 @@ from tenantsec.review.evaluator import run_rules
 from tenantsec.features.registry import ca_rule_set, admin_roles_rule_set, org_config_rule_set, oauth_rule_set
 from tenantsec.features.oauth_apps.rules_org import RuleOverPrivilegedApps
 from tenantsec.features.registry import exchange_rule_set, intune_rule_set
+from tenantsec.core.group_service import GroupIndex
 
 def _load_sheets(gw: DataGateway) -> Dict[str, Any]:
     return {
@@ -20,6 +21,7 @@ def _load_sheets(gw: DataGateway) -> Dict[str, Any]:
         "oauth": gw.get_oauth_inventory(),
         "exchange": gw.get_exchange_policies() if hasattr(gw, "get_exchange_policies") else {},
         "intune": gw.get_intune_policies(), 
+        "groups": GroupIndex(gw.get_group_closure()),
     }
 
 
@@ -64,7 +66,8 @@ def load_sheets_for_ai(tenant_id: str) -> Dict[str, Any]:
         "roles": gw.get_roles(),
         "org": gw.get_org_summary(),
         "users": {"items": gw.get_users_index()},
-        "signins": gw.get_signins_summary(),
+        # rollups only; the raw count cube is too bulky for the prompt
+        "signins": {k: v for k, v in gw.get_signins_summary().items() if k != "cube"},
         "licenses": gw.get_license_inventory(),
         "org_config": getattr(gw, "get_org_config", lambda: {})(),
         "oauth": getattr(gw, "get_oauth_inventory", lambda: {})(),
@@ -0,0 +1,134 @@
+# src/tenantsec/review/user_scanner/baselines.py
+from __future__ import annotations
+import ipaddress, pathlib, time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from tenantsec.core.cache import cache_dir, read_json, write_json_atomic
+from .signin_store import to_epoch, to_iso
+
+# USER/baselines.json  {user_id: profile}, updated by every sign-in ingestion
+# USER/novelty.json    sign-ins that were new for an established profile
+#
+# Profiles are counters plus bounded frequency sketches, so size per user is
+# fixed whatever the history length, and a novelty test is a dict lookup.
+
+SKETCH_SIZES = {"countries": 16, "cities": 24, "apps": 12, "prefixes": 32}
+MIN_SIGNINS = 20                 # below this a profile is still learning
+MIN_SPAN_SEC = 3 * 86400         # ... or if it covers less than this
+MAX_EVENTS = 5000
+
+def _path(tenant_id: str) -> pathlib.Path:
+    return cache_dir(tenant_id, "USER") / "baselines.json"
+
+def _novelty_path(tenant_id: str) -> pathlib.Path:
+    return cache_dir(tenant_id, "USER") / "novelty.json"
+
+def ip_prefix(ip: Optional[str]) -> str:
+    """/24 for IPv4, /48 for IPv6 — stable per network, not per DHCP lease."""
+    try:
+        a = ipaddress.ip_address(ip or "")
+    except ValueError:
+        return ""
+    return str(ipaddress.ip_network(f"{a}/{24 if a.version == 4 else 48}", strict=False))
+
+def _sketch_add(sk: Dict[str, int], key: str, cap: int) -> None:
+    """Misra-Gries: keys above n/cap occurrences always survive."""
+    if key in sk:
+        sk[key] += 1
+    elif len(sk) < cap:
+        sk[key] = 1
+    else:
+        for k in list(sk):
+            sk[k] -= 1
+            if sk[k] <= 0:
+                del sk[k]
+
+def _new_profile() -> Dict[str, Any]:
+    return {"n": 0, "first": 0, "last": 0, "hours": [0] * 24, **{k: {} for k in SKETCH_SIZES}}
+
+def _features(rec: Dict[str, Any], ts: int) -> Dict[str, str]:
+    return {
+        "countries": (rec.get("country") or "").upper(),
+        "cities": rec.get("city") or "",
+        "apps": rec.get("clientApp") or "",
+        "prefixes": ip_prefix(rec.get("ip")),
+    }
+
+def established(p: Dict[str, Any]) -> bool:
+    return p.get("n", 0) >= MIN_SIGNINS and p.get("last", 0) - p.get("first", 0) >= MIN_SPAN_SEC
+
+def novelty(p: Dict[str, Any], rec: Dict[str, Any], ts: Optional[int] = None) -> List[str]:
+    """What about `rec` this profile has not seen (empty for a learning profile)."""
+    if not established(p):
+        return []
+    ts = to_epoch(rec.get("createdDateTime")) if ts is None else ts
+    kinds = [k for k, v in _features(rec, ts).items() if v and v not in p.get(k, {})]
+    if not p["hours"][datetime.fromtimestamp(ts, timezone.utc).hour]:
+        kinds.append("hour")
+    return kinds
+
+def update(p: Dict[str, Any], rec: Dict[str, Any], ts: Optional[int] = None) -> None:
+    ts = to_epoch(rec.get("createdDateTime")) if ts is None else ts
+    p["n"] += 1
+    p["first"] = min(p["first"] or ts, ts)
+    p["last"] = max(p["last"], ts)
+    p["hours"][datetime.fromtimestamp(ts, timezone.utc).hour] += 1
+    for k, v in _features(rec, ts).items():
+        if v:
+            _sketch_add(p[k], v, SKETCH_SIZES[k])
+
+
+class BaselineSink:
+    """
+    Sign-in ingestion sink. Sign-ins newer than the stored watermark are
+    replayed oldest first, each tested against its profile before being
+    folded in; older ones are already counted, so a full re-fetch of the
+    window does not double-count. With no stored profiles (first run) the
+    window is learned as-is and nothing is flagged.
+    """
+    def __init__(self, tenant_id: str):
+        self.tenant_id = tenant_id
+        doc = read_json(_path(tenant_id)) or {}
+        self.profiles: Dict[str, Dict[str, Any]] = doc.get("users") or {}
+        self.watermark = int(doc.get("watermark_epoch") or 0)
+        self.learning = not self.profiles
+        self.newest = self.watermark
+        self.pending: List[Tuple[int, Dict[str, Any]]] = []
+
+    def add(self, rec: Dict[str, Any]) -> None:
+        uid = rec.get("userId")
+        ts = to_epoch(rec.get("createdDateTime"))
+        if not uid or ts <= self.watermark:
+            return
+        if self.learning:
+            update(self.profiles.setdefault(uid, _new_profile()), rec, ts)
+            self.newest = max(self.newest, ts)
+        else:
+            self.pending.append((ts, rec))
+
+    def finish(self, since: str) -> int:
+        """Apply buffered sign-ins, persist profiles and novelty events; returns new events."""
+        events: List[Dict[str, Any]] = []
+        for ts, rec in sorted(self.pending, key=lambda t: t[0]):
+            p = self.profiles.setdefault(rec["userId"], _new_profile())
+            kinds = novelty(p, rec, ts)
+            if kinds:
+                events.append({
+                    "userId": rec["userId"], "upn": rec.get("userPrincipalName"), "time": to_iso(ts),
+                    "kinds": kinds, "status": rec.get("status"), "country": rec.get("country"),
+                    "city": rec.get("city"), "clientApp": rec.get("clientApp"), "ip": rec.get("ip"),
+                })
+            update(p, rec, ts)
+            self.newest = max(self.newest, ts)
+        self.pending = []
+
+        write_json_atomic(_path(self.tenant_id), {
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "watermark_epoch": self.newest,
+            "users": self.profiles,
+        })
+        prev = (read_json(_novelty_path(self.tenant_id)) or {}).get("items", [])
+        kept = [e for e in prev if (e.get("time") or "") >= since] + events
+        write_json_atomic(_novelty_path(self.tenant_id), {"since": since, "items": kept[-MAX_EVENTS:]})
+        return len(events)
@@ -0,0 +1,122 @@
+# src/tenantsec/review/user_scanner/bursts.py
+from __future__ import annotations
+import pathlib
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from tenantsec.core.cache import cache_dir, read_json, write_json_atomic
+from tenantsec.config.loader import get_burst_config
+from .signin_store import to_epoch, to_iso
+
+# Failed sign-ins are counted in fixed time buckets per source IP (password
+# spray: one IP, many users) and per user (brute force: one user, many IPs).
+# A cell keeps a failure count and a capped set of distinct counterparts, so
+# one pass over the stream in any order is enough; a sliding sum over each
+# key's buckets then finds the windows over threshold.
+#
+# USER/bursts.json  {"since", "items": [detections], "carry": [cells of the last window]}
+
+DISTINCT_CAP = 64       # counterparts remembered per cell / window (>= any threshold)
+SAMPLE = 10             # counterparts listed in a detection
+
+Cell = List[Any]        # [failures, set(counterparts)]
+
+def _path(tenant_id: str) -> pathlib.Path:
+    return cache_dir(tenant_id, "USER") / "bursts.json"
+
+
+class BurstDetector:
+    """Sign-in ingestion sink; see module comment. kinds: "spray" (key = IP), "brute" (key = user)."""
+    def __init__(self, tenant_id: str, *, carry: bool):
+        cfg = get_burst_config()
+        self.tenant_id = tenant_id
+        self.bucket = max(60, int(cfg["bucket_minutes"] * 60))
+        self.width = max(1, int(cfg["window_minutes"] * 60) // self.bucket)
+        self.rules = {
+            "spray": (cfg["spray_min_users"], cfg["spray_min_failures"]),
+            "brute": (cfg["brute_min_ips"], cfg["brute_min_failures"]),
+        }
+        self.max_cells = int(cfg["max_cells"])
+        self.floor = 0          # cells at or below this many failures were pruned
+        self.cells: Dict[Tuple[str, str, int], Cell] = {}
+        self.upn: Dict[str, str] = {}
+        self.doc = (read_json(_path(tenant_id)) or {}) if carry else {}
+        for kind, key, b, n, others in self.doc.get("carry") or []:
+            self.cells[(kind, key, b)] = [n, set(others)]
+
+    def add(self, rec: Dict[str, Any]) -> None:
+        if rec.get("status") == "success":
+            return
+        uid, ip = rec.get("userId") or "", rec.get("ip") or ""
+        if not uid or not ip:
+            return
+        if rec.get("userPrincipalName"):
+            self.upn[uid] = rec["userPrincipalName"]
+        b = to_epoch(rec.get("createdDateTime")) // self.bucket
+        self._bump(("spray", ip, b), uid)
+        self._bump(("brute", uid, b), ip)
+        if len(self.cells) > self.max_cells:
+            self._prune()
+
+    def _bump(self, k: Tuple[str, str, int], other: str) -> None:
+        c = self.cells.get(k)
+        if c is None:
+            c = self.cells[k] = [0, set()]
+        c[0] += 1
+        if len(c[1]) < DISTINCT_CAP:
+            c[1].add(other)
+
+    def _prune(self) -> None:
+        # lossy counting: drop the sparsest cells, raising the bar until back under budget
+        while len(self.cells) > self.max_cells // 2:
+            self.floor += 1
+            self.cells = {k: c for k, c in self.cells.items() if c[0] > self.floor}
+        print(f"[bursts] pruned to {len(self.cells)} cells (<= {self.floor} failures dropped)")
+
+    def _windows(self) -> List[Dict[str, Any]]:
+        by_key: Dict[Tuple[str, str], List[int]] = {}
+        for kind, key, b in self.cells:
+            by_key.setdefault((kind, key), []).append(b)
+        out: List[Dict[str, Any]] = []
+        for (kind, key), buckets in by_key.items():
+            min_distinct, min_fail = self.rules[kind]
+            buckets.sort()
+            best: Optional[Dict[str, Any]] = None
+            lo = 0
+            for hi, b in enumerate(buckets):
+                while buckets[lo] <= b - self.width:
+                    lo += 1
+                span = [self.cells[(kind, key, x)] for x in buckets[lo: hi + 1]]
+                fails = sum(c[0] for c in span)
+                if fails < min_fail:
+                    continue
+                others: Set[str] = set()
+                for c in span:
+                    others |= c[1]
+                    if len(others) >= DISTINCT_CAP:
+                        break
+                if len(others) >= min_distinct and (best is None or len(others) > best["distinct"]):
+                    best = {"kind": kind, "key": key, "start": to_iso(buckets[lo] * self.bucket),
+                            "end": to_iso((b + 1) * self.bucket), "failures": fails,
+                            "distinct": len(others),
+                            "sample": sorted(self.upn.get(o, o) if kind == "spray" else o for o in others)[:SAMPLE]}
+            if best:
+                if kind == "brute":
+                    best["upn"] = self.upn.get(key)
+                out.append(best)
+        return out
+
+    def finish(self, since: str) -> int:
+        """Write detections for the window (plus the cells a later run needs); returns how many."""
+        found = self._windows()
+        newest = max((b for _k, _key, b in self.cells), default=0)
+        carry = [[kind, key, b, c[0], sorted(c[1])] for (kind, key, b), c in self.cells.items()
+                 if b > newest - self.width]
+        # a burst seen again (window grown by new sign-ins) replaces the earlier report
+        merged = {(d["kind"], d["key"], d["start"][:13]): d for d in self.doc.get("items") or []
+                  if d.get("end", "") >= since}
+        for d in found:
+            merged[(d["kind"], d["key"], d["start"][:13])] = d
+        items = sorted(merged.values(), key=lambda d: d["end"], reverse=True)
+        write_json_atomic(_path(self.tenant_id), {"since": since, "items": items, "carry": carry,
+                                                  "pruned_below": self.floor})
+        return len(found)
@@ -4,11 +4,21 @@ from .auth import chk_user_mfa_disabled, chk_signin_foreign_country
 from .exchange import mailbox_rule_rss, mailbox_rule_delete_all, mailbox_rule_mark_read_all, mailbox_rule_forward_external
 
 from .hygiene import chk_user_inactive_90d
-from .auth import chk_user_mfa_disabled, chk_signin_foreign_country, chk_signin_impossible_travel
+from .auth import (
+    chk_user_mfa_disabled, chk_signin_foreign_country, chk_signin_impossible_travel,
+    chk_signin_failure_burst, chk_signin_legacy_client, chk_signin_novel_context,
+    chk_signin_password_spray, chk_signin_brute_force,
+)
 
 REGISTRY = [
     chk_user_mfa_disabled,
     chk_signin_foreign_country,
+    chk_signin_impossible_travel,
+    chk_signin_failure_burst,
+    chk_signin_legacy_client,
+    chk_signin_novel_context,
+    chk_signin_password_spray,
+    chk_signin_brute_force,
     mailbox_rule_rss,
     mailbox_rule_delete_all,
     mailbox_rule_mark_read_all,
@@ -1,13 +1,38 @@
-'''
 from __future__ import annotations
 from typing import Dict, Any, List
 from tenantsec.core.findings import Finding
+from tenantsec.config.loader import get_geoip_config
+from ..signin_frame import SigninFrame, mask, latest_matching, country_hops, failure_bursts, travel_speeds
+from ..geoip import default_index
+
+# Sign-in checks run on one SigninFrame per sheets dict: epoch/status columns
+# and int-coded strings, so group-by/window work is array ops (NumPy when
+# installed) instead of per-user dict walks with repeated ISO parsing.
+
+IMPOSSIBLE_TRAVEL_SEC = 6 * 3600       # different countries closer than this (no geoip file)
+BURST_FAILURES = 10                    # failed sign-ins ...
+BURST_WINDOW_SEC = 10 * 60             # ... within this span
+NOVEL_LABELS = {"countries": "country", "cities": "city", "apps": "client app",
+                "prefixes": "network", "hour": "hour of day"}
+LEGACY_CLIENTS = (
+    "Exchange ActiveSync", "IMAP4", "POP3", "SMTP", "Authenticated SMTP",
+    "Exchange Web Services", "MAPI Over HTTP", "Offline Address Book",
+    "Outlook Anywhere (RPC over HTTP)", "Autodiscover", "Exchange Online PowerShell",
+    "Other clients",
+)
 
 def _add(finds: List[Finding], **kw): finds.append(Finding(**kw))
 
 def _tenant_country(sheets: Dict[str, Any]) -> str:
     return (sheets.get("org") or {}).get("organization", {}).get("country") or ""
 
+def _frame(sheets: Dict[str, Any]) -> SigninFrame:
+    # built once per sheets dict and shared by every sign-in check
+    frame = sheets.get("_signin_frame")
+    if frame is None:
+        frame = sheets["_signin_frame"] = SigninFrame.from_sheets(sheets)
+    return frame
+
 def chk_user_mfa_disabled(sheets: Dict[str, Any], finds: List[Finding]) -> None:
     for u in (sheets.get("users") or {}).get("items", []):
         if not u.get("mfaEnabled", False):
@@ -21,121 +46,152 @@ def chk_user_mfa_disabled(sheets: Dict[str, Any], finds: List[Finding]) -> None:
                 evidence=[{"userId": u.get("id"), "upn": u.get("userPrincipalName")}])
 
 def chk_signin_foreign_country(sheets: Dict[str, Any], finds: List[Finding]) -> None:
-    tenant_ctry = _tenant_country(sheets)
+    """One finding per user with successful sign-ins outside the tenant country (latest as evidence)."""
+    tenant_ctry = _tenant_country(sheets).upper()
     if not tenant_ctry:
         return
-    for s in (sheets.get("signins") or {}).get("items", []):
-        if (s.get("status") or "").lower() != "success":
-            continue
-        c = (s.get("country") or "").upper()
-        if not c or c == tenant_ctry.upper():
-            continue
+    frame = _frame(sheets)
+    home = [0] + ([frame.code("country", tenant_ctry)] if frame.code("country", tenant_ctry) >= 0 else [])
+    hits = latest_matching(frame, mask(frame, status=1, where_not={"country": home}))
+    for _user, (i, n) in sorted(hits.items()):
+        r = frame.row(i)
         _add(finds,
             id="user.signin.foreign_country",
-            title="Successful sign-in from a foreign country",
+            title=f"Sign-in from foreign country: {r['upn'] or r['userId']}",
             severity="high",
-            summary=f"User {s.get('userPrincipalName') or s.get('userId')} signed in from {c} (tenant country {tenant_ctry}).",
+            summary=f"{n} successful sign-in(s) from outside {tenant_ctry}; latest from {r['country']} at {r['time']}.",
             remediation="Verify travel; consider CA by country or require MFA for non-trusted locations.",
             docs="https://learn.microsoft.com/entra/identity/conditional-access/location-condition",
-            evidence=[{"userId": s.get("userId"), "upn": s.get("userPrincipalName"),
-                       "country": c, "time": s.get("createdDateTime")}])
-'''
-
-from tenantsec.review.user_scanner.sheets import load_user_sheets
-from tenantsec.core.findings import Finding
-from datetime import datetime, timezone
-from math import radians, sin, cos, sqrt, atan2
-#from __future__ import annotations
-from typing import Dict, Any, List
-from tenantsec.core.findings import Finding
-
-
-
-def _add(finds: List[Finding], **kw): finds.append(Finding(**kw))
-
-def _tenant_country(sheets: Dict[str, Any]) -> str:
-    return (sheets.get("org") or {}).get("organization", {}).get("country") or ""
-
-def chk_user_mfa_disabled(sheets: Dict[str, Any], finds: List[Finding]) -> None:
-    for u in (sheets.get("users") or {}).get("items", []):
-        if not u.get("mfaEnabled", False):
-            _add(finds,
-                id="user.mfa.disabled",
-                title=f"User without MFA: {u.get('userPrincipalName')}",
-                severity="high",
-                summary="This user does not have MFA enabled.",
-                remediation="Enable MFA for the user or require via Conditional Access.",
-                docs="https://learn.microsoft.com/entra/identity/authentication/howto-mfa-userstates",
-                evidence=[{"userId": u.get("id"), "upn": u.get("userPrincipalName")}])
-
-
-def _distance_km(lat1, lon1, lat2, lon2):
-    if None in (lat1, lon1, lat2, lon2): return 0
-    R = 6371
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat/2)**2 + cos(radians(lat1))*cos(radians(lat2))*sin(dlon/2)**2
-    return R * 2 * atan2(sqrt(a), sqrt(1 - a))
-
-def chk_signin_foreign_country(tenant_id: str) -> list[Finding]:
-    sheets = load_user_sheets(tenant_id)
-    org_country = ((sheets.get("org") or {}).get("organization") or {}).get("country", "")
-    sby = (sheets.get("signins_by_user") or {}).get("items", {})
-    results = []
-
-    for uid, logs in sby.items():
-        for s in logs:
-            ctry = (s.get("country") or "").upper()
-            if not ctry or not org_country: 
-                continue
-            if ctry != org_country.upper() and s.get("status") == "success":
-                results.append(Finding(
-                    id="user.signin.foreign_country",
-                    severity="HIGH",
-                    title=f"Sign-in from foreign country: {s.get('upn')}",
-                    description=f"Successful sign-in from {ctry}, tenant region {org_country}.",
-                    remediation="Review sign-in and confirm user travel; enforce location-based CA policies.",
-                    evidence=[{
-                        "userId": uid,
-                        "upn": s.get("upn"),
-                        "country": ctry,
-                        "city": s.get("city"),
-                        "ip": s.get("ip"),
-                        "time": s.get("createdDateTime"),
-                    }]
-                ))
-                break  # one per user
-
-    return results
-
-
-def chk_signin_impossible_travel(tenant_id: str) -> list[Finding]:
-    sheets = load_user_sheets(tenant_id)
-    sby = (sheets.get("signins_by_user") or {}).get("items", {})
-    results = []
-
-    for uid, logs in sby.items():
-        logs = sorted(logs, key=lambda x: x.get("createdDateTime") or "")
-        prev = None
-        for s in logs:
-            if not prev:
-                prev = s; continue
-            # skip if same country
-            if (s.get("country") or "") == (prev.get("country") or ""):
-                prev = s; continue
-            t1 = datetime.fromisoformat(prev["createdDateTime"].replace("Z", "+00:00"))
-            t2 = datetime.fromisoformat(s["createdDateTime"].replace("Z", "+00:00"))
-            hours = abs((t2 - t1).total_seconds() / 3600)
-            if hours < 6:  # 6-hour impossible window
-                results.append(Finding(
-                    id="user.signin.impossible_travel",
-                    severity="HIGH",
-                    title=f"Impossible travel sign-in: {s.get('upn')}",
-                    description=f"Sign-ins from {prev.get('country')} and {s.get('country')} within {hours:.1f}h.",
-                    remediation="Investigate for credential compromise.",
-                    evidence=[prev, s]
-                ))
-                break
-            prev = s
-
-    return results
+            evidence=[{**r, "count": n}])
+
+def _geo_velocity(finds: List[Finding], frame: SigninFrame, geo) -> None:
+    cfg = get_geoip_config()
+    lat, lon, known = geo.locate_many(frame.vocab["ip"])  # each distinct IP looked up once
+    hits = travel_speeds(frame, lat, lon, known, max_kmh=cfg["max_speed_kmh"], min_km=cfg["min_distance_km"])
+    for _user, (a, b, km, kmh) in sorted(hits.items()):
+        prev, cur = frame.row(a), frame.row(b)
+        hours = (int(frame.cols["ts"][b]) - int(frame.cols["ts"][a])) / 3600
+        _add(finds,
+            id="user.signin.impossible_travel",
+            title=f"Impossible travel sign-in: {cur['upn'] or cur['userId']}",
+            severity="high",
+            summary=(f"Sign-ins from {prev['ip']} ({prev['country'] or '?'}) and {cur['ip']} "
+                     f"({cur['country'] or '?'}) {km:,.0f} km apart within {hours:.1f}h (~{kmh:,.0f} km/h)."),
+            remediation="Investigate for credential compromise.",
+            evidence=[{**prev, "km": round(km), "kmh": round(kmh)}, cur])
+
+def chk_signin_impossible_travel(sheets: Dict[str, Any], finds: List[Finding]) -> None:
+    """
+    Geo-velocity between consecutive sign-ins when an offline IP geolocation
+    file is configured; otherwise country changes within IMPOSSIBLE_TRAVEL_SEC.
+    """
+    frame = _frame(sheets)
+    geo = default_index()
+    if geo is not None:
+        _geo_velocity(finds, frame, geo)
+        return
+    for _user, (a, b) in sorted(country_hops(frame, IMPOSSIBLE_TRAVEL_SEC).items()):
+        prev, cur = frame.row(a), frame.row(b)
+        hours = (int(frame.cols["ts"][b]) - int(frame.cols["ts"][a])) / 3600
+        _add(finds,
+            id="user.signin.impossible_travel",
+            title=f"Impossible travel sign-in: {cur['upn'] or cur['userId']}",
+            severity="high",
+            summary=f"Sign-ins from {prev['country']} and {cur['country']} within {hours:.1f}h.",
+            remediation="Investigate for credential compromise.",
+            evidence=[prev, cur])
+
+def chk_signin_failure_burst(sheets: Dict[str, Any], finds: List[Finding]) -> None:
+    """BURST_FAILURES failed sign-ins for one user inside BURST_WINDOW_SEC."""
+    frame = _frame(sheets)
+    for _user, (i, total) in sorted(failure_bursts(frame, BURST_FAILURES, BURST_WINDOW_SEC).items()):
+        r = frame.row(i)
+        _add(finds,
+            id="user.signin.failure_burst",
+            title=f"Burst of failed sign-ins: {r['upn'] or r['userId']}",
+            severity="medium",
+            summary=(f"{BURST_FAILURES}+ failed sign-ins within {BURST_WINDOW_SEC // 60} min starting "
+                     f"{r['time']} ({total} failures overall)."),
+            remediation="Check for password guessing; confirm MFA and smart lockout; block the source IPs if hostile.",
+            docs="https://learn.microsoft.com/entra/identity/authentication/howto-password-smart-lockout",
+            evidence=[{**r, "failures": total}])
+
+def chk_signin_legacy_client(sheets: Dict[str, Any], finds: List[Finding]) -> None:
+    """Successful sign-ins over legacy (non-modern-auth) client protocols."""
+    frame = _frame(sheets)
+    codes = [c for c in (frame.code("app", name) for name in LEGACY_CLIENTS) if c >= 0]
+    if not codes:
+        return
+    hits = latest_matching(frame, mask(frame, status=1, where={"app": codes}))
+    for _user, (i, n) in sorted(hits.items()):
+        r = frame.row(i)
+        _add(finds,
+            id="user.signin.legacy_client",
+            title=f"Legacy authentication in use: {r['upn'] or r['userId']}",
+            severity="medium",
+            summary=f"{n} successful sign-in(s) via legacy clients; latest {r['clientApp']} at {r['time']}.",
+            remediation="Block legacy authentication with Conditional Access and move the client to modern auth.",
+            docs="https://learn.microsoft.com/entra/identity/conditional-access/policy-block-legacy-authentication",
+            evidence=[{**r, "count": n}])
+
+def chk_signin_novel_context(sheets: Dict[str, Any], finds: List[Finding]) -> None:
+    """
+    Successful sign-ins that the user's learned baseline has never seen: a new
+    country, or at least two other new traits (network, client, city, hour).
+    Novelty is decided at ingestion (baselines.py); this only groups it per user.
+    """
+    latest: Dict[str, Dict[str, Any]] = {}
+    counts: Dict[str, int] = {}
+    for e in (sheets.get("novelty") or {}).get("items", []):
+        kinds = e.get("kinds") or []
+        if e.get("status") != "success" or not ("countries" in kinds or len(kinds) >= 2):
+            continue
+        uid = e.get("userId") or ""
+        counts[uid] = counts.get(uid, 0) + 1
+        if (e.get("time") or "") >= (latest.get(uid, {}).get("time") or ""):
+            latest[uid] = e
+    for uid, e in sorted(latest.items()):
+        what = ", ".join(NOVEL_LABELS.get(k, k) for k in e["kinds"])
+        _add(finds,
+            id="user.signin.novel_context",
+            title=f"Sign-in unlike the user's history: {e.get('upn') or uid}",
+            severity="high" if "countries" in e["kinds"] else "medium",
+            summary=(f"{counts[uid]} successful sign-in(s) with traits never seen for this user; "
+                     f"latest at {e.get('time')} (new {what})."),
+            remediation="Confirm with the user; if unexpected, revoke sessions and reset credentials.",
+            evidence=[{"userId": uid, "upn": e.get("upn"), "time": e.get("time"), "country": e.get("country"),
+                       "city": e.get("city"), "clientApp": e.get("clientApp"), "ip": e.get("ip"),
+                       "novel": e["kinds"], "count": counts[uid]}])
+
+def _bursts(sheets: Dict[str, Any], kind: str) -> List[Dict[str, Any]]:
+    return [d for d in (sheets.get("bursts") or {}).get("items", []) if d.get("kind") == kind]
+
+def chk_signin_password_spray(sheets: Dict[str, Any], finds: List[Finding]) -> None:
+    """One source IP failing sign-ins for many different users inside the burst window."""
+    for d in _bursts(sheets, "spray"):
+        _add(finds,
+            id="user.signin.password_spray",
+            title=f"Password spray from {d['key']}",
+            severity="high",
+            summary=(f"{d['failures']} failed sign-ins for {d['distinct']}+ users from {d['key']} "
+                     f"between {d['start']} and {d['end']}."),
+            remediation="Block the source IP, confirm smart lockout and MFA for targeted users, and check "
+                        "for successful sign-ins from the same source.",
+            docs="https://learn.microsoft.com/security/operations/incident-response-playbook-password-spray",
+            evidence=[{"ip": d["key"], "start": d["start"], "end": d["end"], "failures": d["failures"],
+                       "users": d["distinct"], "sample": ", ".join(d.get("sample") or [])}])
+
+def chk_signin_brute_force(sheets: Dict[str, Any], finds: List[Finding]) -> None:
+    """One user failing sign-ins from many different IPs inside the burst window."""
+    for d in _bursts(sheets, "brute"):
+        _add(finds,
+            id="user.signin.brute_force",
+            title=f"Distributed brute force: {d.get('upn') or d['key']}",
+            severity="high",
+            summary=(f"{d['failures']} failed sign-ins from {d['distinct']}+ IPs between "
+                     f"{d['start']} and {d['end']}."),
+            remediation="Reset the password if any attempt succeeded, require MFA, and review smart lockout thresholds.",
+            docs="https://learn.microsoft.com/entra/identity/authentication/howto-password-smart-lockout",
+            evidence=[{"userId": d["key"], "upn": d.get("upn"), "start": d["start"], "end": d["end"],
+                       "failures": d["failures"], "ips": d["distinct"],
+                       "sample": ", ".join(d.get("sample") or [])}])
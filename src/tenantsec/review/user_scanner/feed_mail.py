@@ -4,6 +4,7 @@ from typing import Dict, Any, List
 from tenantsec.core.graph_client import GraphClient
 from tenantsec.core.cache_manager import tenant_root
 from tenantsec.core.cache import read_json, write_json_atomic
+from tenantsec.core.crawl_journal import CrawlJournal
 
 from tenantsec.http.errors import NotFoundError, ForbiddenError
 
@@ -11,12 +12,15 @@ def build_mail_rules_cache(tenant_id: str, *, graph: GraphClient, max_users: int
     root = tenant_root(tenant_id) / "USER"; root.mkdir(parents=True, exist_ok=True)
     idx = read_json(tenant_root(tenant_id) / "Static" / "users_index.json") or {}
     users = idx.get("users", [])
-    out = []; count = 0
+    # one mailbox per user: checkpoint so an interrupted run skips finished users
+    journal = CrawlJournal(tenant_id, "mail_rules", params={"max_users": max_users})
+    out = journal.log("items")
+    count = sum(1 for r in out if "note" not in r)
 
     for u in users:
         if max_users is not None and count >= max_users: break
         uid = u.get("id"); upn = u.get("upn") or u.get("display_name")
-        if not uid: continue
+        if not uid or journal.is_done(uid): continue
 
         try:
             # folder map (may 404 if no mailbox)
@@ -47,12 +51,12 @@ def build_mail_rules_cache(tenant_id: str, *, graph: GraphClient, max_users: int
         except NotFoundError:
 
             out.append({"userId": uid, "userPrincipalName": upn, "rules": [], "note": "no_mailbox"})
-            continue
         except ForbiddenError as e:
             # Missing permission or mailbox not accessible — record and continue
             out.append({"userId": uid, "userPrincipalName": upn, "rules": [], "note": "forbidden"})
-            continue
+        journal.mark_done(uid)
 
     write_json_atomic(root / "mail_rules.json", {"items": out})
+    journal.complete()
     return str(root / "mail_rules.json")
 
@@ -1,11 +1,18 @@
 # src/tenantsec/review/user_scanner/feed_signins.py
 from __future__ import annotations
-from typing import Dict, Any, List
+import heapq, queue, threading, uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from datetime import datetime, timedelta, timezone
 from tenantsec.core.graph_client import GraphClient
 from tenantsec.core.cache_manager import tenant_root
-from tenantsec.core.cache import read_json, write_json_atomic
+from tenantsec.core.cache import read_json, write_json_atomic, build_once, tenant_lock, CacheCleared
+from tenantsec.core import audit_service
+from tenantsec.config.loader import get_signins_config
 from collections import defaultdict
+from .signin_store import SigninStore, STORE_DIR, ARCHIVE_DIR, to_epoch, to_iso
+from .baselines import BaselineSink
+from .bursts import BurstDetector
 
 def _now_utc() -> datetime:
     return datetime.now(timezone.utc)
@@ -13,6 +20,23 @@ def _now_utc() -> datetime:
 def _iso(dt: datetime) -> str:
     return dt.astimezone(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
 
+def _normalize(s: Dict[str, Any]) -> Dict[str, Any]:
+    loc = s.get("location") or {}
+    return {
+        "id": s.get("id"),
+        "userId": s.get("userId"),
+        "userPrincipalName": s.get("userPrincipalName"),
+        "createdDateTime": s.get("createdDateTime"),
+        "status": (s.get("status") or {}).get("errorCode", 0) == 0 and "success" or "failed",
+        "ip": s.get("ipAddress"),
+        "country": (loc.get("countryOrRegion") or "").upper(),
+        "state": loc.get("state"),
+        "city": loc.get("city"),
+        "clientApp": s.get("clientAppUsed"),
+        "ca": s.get("conditionalAccessStatus"),
+        "errorCode": (s.get("status") or {}).get("errorCode", 0),
+    }
+
 def ensure_org_country_cache(tenant_id: str, *, graph: GraphClient) -> str:
     """Write USER/org.json with at least {'organization': {'country': 'XX', 'display_name': '...'}}."""
     user_root = tenant_root(tenant_id) / "USER"
@@ -38,74 +62,319 @@ def ensure_org_country_cache(tenant_id: str, *, graph: GraphClient) -> str:
     write_json_atomic(user_root / "org.json", org_doc)
     return str(user_root / "org.json")
 
-def build_signins_cache(tenant_id: str, *, graph: GraphClient, days: int = 7) -> str:
-    """Write USER/signins.json with normalized records for user checks."""
-    user_root = tenant_root(tenant_id) / "USER"
-    user_root.mkdir(parents=True, exist_ok=True)
+SIGNIN_SELECT = ",".join([
+    "id","createdDateTime","userId","userPrincipalName","status",
+    "ipAddress","location","clientAppUsed","conditionalAccessStatus"  # <- removed signInEventTypes
+])
 
-    since = _iso(_now_utc() - timedelta(days=days))
-    select = ",".join([
-        "id","createdDateTime","userId","userPrincipalName","status",
-        "ipAddress","location","clientAppUsed","conditionalAccessStatus"
-    ])
-    url = f"/v1.0/auditLogs/signIns?$filter=createdDateTime ge {since}&$select={select}&$top=999"
-
-    items: List[Dict[str, Any]] = []
-    for page in graph.get_paged_values(url):
-        for s in (page.get("value") or []):
-            loc = s.get("location") or {}
-            items.append({
-                "id": s.get("id"),
-                "userId": s.get("userId"),
-                "userPrincipalName": s.get("userPrincipalName"),
-                "createdDateTime": s.get("createdDateTime"),
-                "status": (s.get("status") or {}).get("errorCode", 0) == 0 and "success" or "failed",
-                "ip": s.get("ipAddress"),
-                "country": (loc.get("countryOrRegion") or "").upper(),
-                "state": loc.get("state"),
-                "city": loc.get("city"),
-                "clientApp": s.get("clientAppUsed"),
-                "ca": s.get("conditionalAccessStatus"),
-            })
+# ---------- derived views fed by one ingestion pass ----------
+class _StoreSink:
+    """
+    Batched appends to a SigninStore: the flat list behind USER/signins.json,
+    or the append-only archive (only_newer=True on a full pass: just what is
+    newer than its latest sign-in). Batches written mid-crawl take the tenant
+    lock for the append only; finish() runs inside the caller's commit lock.
+    """
+    def __init__(self, store: SigninStore, txn: str, batch: int = 5000, *, only_newer: bool = False):
+        self.store = store
+        self.txn = txn
+        self.after = self.store.newest() if only_newer else 0
+        self.batch: List[Dict[str, Any]] = []
+        self.size = batch
+        self.count = 0
+
+    def add(self, rec: Dict[str, Any]) -> None:
+        if self.after and to_epoch(rec.get("createdDateTime")) <= self.after:
+            return
+        self.batch.append(rec)
+        if len(self.batch) >= self.size:
+            with tenant_lock(self.store.tenant_id):
+                self._flush()
+
+    def _flush(self) -> None:
+        if not self.store.pending(self.txn):
+            raise CacheCleared(f"sign-in store cleared during pass {self.txn}")
+        self.count += self.store.append(self.batch); self.batch = []
+
+    def finish(self) -> int:
+        self._flush()
+        return self.count
+
+class _TopPerUserSink:
+    """Newest `top` sign-ins per user (bounded min-heap each), for signins_by_user.json."""
+    def __init__(self, top: int = 200):
+        self.top = top
+        self.heaps: Dict[str, List[Tuple[str, int, Dict[str, Any]]]] = defaultdict(list)
+        self.seq = 0
+
+    def add(self, rec: Dict[str, Any]) -> None:
+        uid = rec.get("userId") or ""
+        if not uid:
+            return
+        self.seq += 1
+        row = {
+            "createdDateTime": rec.get("createdDateTime"),
+            "status": rec.get("status"),
+            "ip": rec.get("ip"),
+            "country": rec.get("country"),
+            "state": rec.get("state"),
+            "city": rec.get("city"),
+            "clientApp": rec.get("clientApp"),
+            "eventTypes": [],  # placeholder; v1.0 doesn’t return signInEventTypes
+            "ca": rec.get("ca"),
+            "upn": rec.get("userPrincipalName"),
+        }
+        h = self.heaps[uid]
+        item = (row["createdDateTime"] or "", self.seq, row)
+        if len(h) < self.top:
+            heapq.heappush(h, item)
+        elif item[0] > h[0][0]:
+            heapq.heapreplace(h, item)
+
+    def finish(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {uid: [r for _ts, _n, r in sorted(h, key=lambda t: (t[0], t[1]), reverse=True)]
+                for uid, h in self.heaps.items()}
+
+# ---------- time-sliced crawl ----------
+_DONE = object()
+
+def _slice_bounds(lower: datetime, upper: datetime, slices: int, min_span: timedelta) -> List[Tuple[str, Optional[str]]]:
+    """[lower, upper) cut into at most `slices` equal spans, newest first; the newest is open-ended."""
+    span = upper - lower
+    k = max(1, min(slices, int(span / min_span) if min_span.total_seconds() > 0 else slices))
+    cuts = [lower + span * i / k for i in range(k)] + [None]
+    bounds = [(_iso(cuts[i]), _iso(cuts[i + 1]) if cuts[i + 1] else None) for i in range(k)]
+    return list(reversed(bounds))
+
+def sliced_pages(
+    graph: GraphClient,
+    lower: datetime,
+    *,
+    slices: int,
+    min_span: timedelta = timedelta(hours=6),
+    queue_pages: int = 20,
+) -> Iterator[dict]:
+    """
+    Pages of auditLogs/signIns from `lower` onwards, crawled as disjoint
+    createdDateTime ge/lt slices with one nextLink cursor each, all running
+    concurrently (requests still pass through the HTTP concurrency gate).
+    Pages are yielded slice by slice, newest slice first, so the merged
+    stream keeps the API's newest-first order; each slice buffers at most
+    `queue_pages` pages ahead of the reader.
+    """
+    bounds = _slice_bounds(lower, _now_utc(), slices, min_span)
+    queues = [queue.Queue(maxsize=queue_pages) for _ in bounds]
+    stop = threading.Event()
+
+    def _put(q: queue.Queue, item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _crawl(i: int) -> None:
+        ge, lt = bounds[i]
+        flt = f"createdDateTime ge {ge}" + (f" and createdDateTime lt {lt}" if lt else "")
+        url = f"/v1.0/auditLogs/signIns?$filter={flt}&$select={SIGNIN_SELECT}&$top=999"
+        try:
+            for page in graph.get_pages(url):
+                if not _put(queues[i], page):
+                    return
+            _put(queues[i], _DONE)
+        except BaseException as ex:
+            _put(queues[i], ex)
 
-    write_json_atomic(user_root / "signins.json", {"items": items, "since": since})
-    return str(user_root / "signins.json")
+    pool = ThreadPoolExecutor(max_workers=len(bounds), thread_name_prefix="signin-slice")
+    try:
+        for i in range(len(bounds)):
+            pool.submit(_crawl, i)
+        for q in queues:
+            while True:
+                item = q.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+    finally:
+        stop.set()
+        pool.shutdown(wait=False)
 
-def build_user_signins_by_user(tenant_id: str, *, graph: GraphClient, days: int = 30, top: int = 999) -> str:
+# Sign-ins can reach the audit log minutes after createdDateTime, so each
+# incremental pass re-reads this much before the watermark and skips ids it
+# has already stored.
+LATE_ARRIVAL_SEC = 15 * 60
+
+def _resumable(store: SigninStore, state: Dict[str, Any], since_dt: datetime) -> bool:
+    # a wider window than the stored one (or a gap past the window) needs a full pass
+    return (int(state.get("watermark_epoch") or 0) >= int(since_dt.timestamp())
+            and (state.get("since") or "9999") <= _iso(since_dt) and "cube" in state
+            and bool(store.days()))
+
+def ingest_signins(
+    tenant_id: str,
+    *,
+    graph: GraphClient,
+    days: int = 30,
+    top_per_user: int = 200,
+    archive_days: Optional[int] = None,
+    full: bool = False,
+) -> Dict[str, Any]:
+    """
+    One streaming pass over auditLogs/signIns. Each record is normalized once
+    and fed to every derived view:
+      USER/signins.json           pointer to the columnar store (flat list)
+      USER/signins_by_user.json   newest top_per_user sign-ins per user
+      Polled/signins_summary.json count cube by day/status/app/country/CA
+      USER/baselines.json         per-user behaviour profiles (+ novelty.json)
+      USER/bursts.json            password-spray / brute-force failure bursts
+      USER/signins_archive/       append-only day partitions kept archive_days
+                                  (default: appsettings signins.archive_days)
+
+    Incremental: the newest createdDateTime stored (the high watermark) is
+    kept in signins_col/sync.json, and later runs fetch only sign-ins after
+    it, append them to their day partitions and drop partitions that fell out
+    of the `days` window. A missing/stale watermark (or full=True) rebuilds
+    the whole window.
+
+    Store and archive appends run in one transaction committed with
+    sync.json, so a pass that fails midway is rolled back on the next run
+    instead of leaving rows its retry would append again.
+    """
     user_root = tenant_root(tenant_id) / "USER"
     user_root.mkdir(parents=True, exist_ok=True)
 
-    since = _iso(_now_utc() - timedelta(days=days))
-    select = ",".join([
-        "id","createdDateTime","userId","userPrincipalName","status",
-        "ipAddress","location","clientAppUsed","conditionalAccessStatus"  # <- removed signInEventTypes
-    ])
-    url = f"/v1.0/auditLogs/signIns?$filter=createdDateTime ge {since}&$select={select}&$top={top}"
-
-    grouped = defaultdict(list)
-    for page in graph.get_paged_values(url):
-        for s in (page.get("value") or []):
-            uid = s.get("userId") or ""
-            if not uid: continue
-            loc = s.get("location") or {}
-            status_ok = (s.get("status") or {}).get("errorCode", 0) == 0
-            grouped[uid].append({
-                "createdDateTime": s.get("createdDateTime"),
-                "status": "success" if status_ok else "failed",
-                "ip": s.get("ipAddress"),
-                "country": (loc.get("countryOrRegion") or "").upper(),
-                "state": loc.get("state"),
-                "city": loc.get("city"),
-                "clientApp": s.get("clientAppUsed"),
-                "eventTypes": [],  # placeholder; v1.0 doesn’t return signInEventTypes
-                "ca": s.get("conditionalAccessStatus"),
-                "upn": s.get("userPrincipalName"),
+    since_dt = _now_utc() - timedelta(days=days)
+    since = _iso(since_dt)
+    since_day = since[:10]
+
+    cfg = get_signins_config()
+
+    def _build() -> dict:
+        # the tenant lock is held around local writes only, never across Graph calls
+        with tenant_lock(tenant_id):
+            store = SigninStore(tenant_id)
+            archive_store = SigninStore(tenant_id, ARCHIVE_DIR)
+            store.recover()
+            archive_store.recover(committed=store.state().get("committed"))
+        state = store.state()
+        wm = int(state.get("watermark_epoch") or 0)
+        incremental = not full and _resumable(store, state, since_dt)
+        lower_dt = datetime.fromtimestamp(wm - LATE_ARRIVAL_SEC, timezone.utc) if incremental else since_dt
+        lower_dt = max(lower_dt, since_dt)
+        lower = _iso(lower_dt)
+
+        # {id: epoch} near the watermark, to skip re-read late-arrival overlap
+        recent: Dict[str, int] = dict(state.get("recent_ids") or {}) if incremental else {}
+
+        txn = uuid.uuid4().hex
+        with tenant_lock(tenant_id):
+            if not incremental:
+                # rebuilt beside the live store and swapped in at the end
+                store.sweep()
+                store = SigninStore.new_generation(tenant_id)
+            store.begin(txn)
+            archive_store.begin(txn)
+        flat = _StoreSink(store, txn)
+        archive = _StoreSink(archive_store, txn, only_newer=not incremental)
+        per_user = _TopPerUserSink(top_per_user)
+        if incremental:
+            prev = (read_json(user_root / "signins_by_user.json") or {}).get("items") or {}
+            for uid, rows in prev.items():
+                for r in rows:
+                    if (r.get("createdDateTime") or "") >= since:
+                        per_user.add({**r, "userId": uid, "userPrincipalName": r.get("upn")})
+        cube = audit_service.SigninCube.from_dict(state.get("cube")) if incremental else None
+        summary = audit_service.SigninSummary(days, cube=cube)
+        baseline = BaselineSink(tenant_id)
+        bursts = BurstDetector(tenant_id, carry=incremental)
+        new = 0
+        for page in sliced_pages(graph, lower_dt, slices=cfg["slices"],
+                                 min_span=timedelta(hours=cfg["min_slice_hours"])):
+            for s in page.get("value", []):
+                rec = _normalize(s)
+                rid = rec.get("id")
+                if rid and rid in recent:
+                    continue
+                ts = to_epoch(rec.get("createdDateTime"))
+                if rid:
+                    recent[rid] = ts
+                wm = max(wm, ts)
+                flat.add(rec)
+                archive.add(rec)
+                per_user.add(rec)
+                summary.add(rec["errorCode"], rec)
+                baseline.add(rec)
+                bursts.add(rec)
+                new += 1
+            summary.pages += 1
+
+        # commit section: a Clear cache waits for it, or has already wiped the
+        # pass's txn markers (then nothing is committed into the cleared cache)
+        with tenant_lock(tenant_id):
+            if not (store.pending(txn) and archive_store.pending(txn)):
+                raise CacheCleared(f"tenant cache cleared during sign-in pass {txn}")
+            flat.finish()
+            archive.finish()
+
+            # rolling retention: whole day partitions older than the window go
+            dropped = flat.store.drop_partitions_before(since_day)
+            # history is kept for the longest retention any pass asked for
+            keep_days = max(archive_days or cfg["archive_days"], days,
+                            int(archive_store.state().get("archive_days") or 0))
+            archive.store.drop_partitions_before(_iso(_now_utc() - timedelta(days=keep_days))[:10])
+            summary.cube.drop_days_before(since_day)
+
+            write_json_atomic(user_root / "signins_by_user.json", {"since": since, "items": per_user.finish()})
+            novel = baseline.finish(since)
+            burst_count = bursts.finish(since)
+            audit_service.write_summary(tenant_id, summary)
+            # the store's commit is the commit point; the archive follows it
+            # (recover() rolls an archive forward when only this step was lost)
+            store.commit(txn, {
+                # oldest sign-in the store still covers
+                "since": max(state.get("since") or since, since) if incremental else since,
+                "watermark": to_iso(wm) if wm else None,
+                "watermark_epoch": wm,
+                "recent_ids": {k: v for k, v in recent.items() if v >= wm - LATE_ARRIVAL_SEC},
+                "cube": summary.cube.to_dict(),
             })
+            if not incremental:
+                store.publish()
+            archive_store.commit(txn, {"watermark_epoch": archive_store.newest(), "archive_days": keep_days})
+        count = flat.store.count()
+        print(f"[feed_signins] {'incremental' if incremental else 'full'} sync: {new} new sign-ins since {lower}, "
+              f"{count} stored, {len(dropped)} partition(s) expired, {novel} novel, {burst_count} burst(s)")
+        return {"since": since, "store": STORE_DIR, "count": count,
+                "watermark": to_iso(wm) if wm else None, "incremental": incremental}
+
+    # the pointer lock also guards the derived views: a second process waits and reuses the result
+    return build_once(user_root / "signins.json", _build)
 
-    for uid in list(grouped.keys()):
-        grouped[uid].sort(key=lambda r: r.get("createdDateTime") or "", reverse=True)
-        grouped[uid] = grouped[uid][:200]
+def refresh_signins(tenant_id: str, *, graph: GraphClient, days: int = 30, **kw) -> Optional[Dict[str, Any]]:
+    """
+    ingest_signins, but only when it can run incrementally; returns None
+    without any Graph call otherwise (the user review does the full pass).
+    """
+    store = SigninStore(tenant_id)
+    if not _resumable(store, store.state(), _now_utc() - timedelta(days=days)):
+        print(f"[feed_signins] no sign-in watermark for the {days}d window; left to the user review")
+        return None
+    return ingest_signins(tenant_id, graph=graph, days=days, **kw)
 
-    out = user_root / "signins_by_user.json"
-    write_json_atomic(out, {"since": since, "items": grouped})
-    return str(out)
+def build_signins_cache(tenant_id: str, *, graph: GraphClient, days: int = 7) -> str:
+    """Flat sign-in store for the window (also refreshes the per-user view and summary)."""
+    ingest_signins(tenant_id, graph=graph, days=days)
+    return str(tenant_root(tenant_id) / "USER" / "signins.json")
+
+def build_user_signins_by_user(tenant_id: str, *, graph: GraphClient, days: int = 30, top: int = 200) -> str:
+    """Per-user view, taken from the last ingestion when it covers the window."""
+    user_root = tenant_root(tenant_id) / "USER"
+    doc = read_json(user_root / "signins_by_user.json") or {}
+    since = _iso(_now_utc() - timedelta(days=days))
+    if not doc.get("since") or doc["since"] > since or not (user_root / "signins.json").exists():
+        ingest_signins(tenant_id, graph=graph, days=days, top_per_user=top)
+    return str(user_root / "signins_by_user.json")
@@ -0,0 +1,183 @@
+# src/tenantsec/review/user_scanner/geoip.py
+from __future__ import annotations
+import csv, ipaddress, os, pathlib
+from array import array
+from bisect import bisect_right
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from tenantsec.core.cache import _base_dir, read_json, write_json_atomic
+from tenantsec.config.loader import get_geoip_config
+
+# Offline IP -> (lat, lon) from a local range file; no network lookups.
+# Accepted CSV layouts (first row may be a header):
+#   ip_from, ip_to, ..., latitude, longitude      IP2Location / DB-IP lite (ints or dotted)
+#   network, ..., latitude, longitude             MaxMind GeoLite2 *-Blocks (CIDR), header required
+# The parsed table is kept as sorted interval arrays and cached in binary
+# form next to the cache root, keyed by the file's size and mtime.
+
+_START = ("ip_from", "start_ip", "ip_start", "range_start", "first_ip")
+_END = ("ip_to", "end_ip", "ip_end", "range_end", "last_ip")
+_LAT = ("latitude", "lat")
+_LON = ("longitude", "lon", "lng")
+_MASK64 = (1 << 64) - 1
+
+def _to_int(s: str) -> Tuple[int, int]:
+    """(version, integer) for a dotted/colon address or a decimal integer (v4 if < 2**32)."""
+    s = s.strip()
+    if s.isdigit():
+        v = int(s)
+        return (4 if v < 1 << 32 else 6), v
+    a = ipaddress.ip_address(s)
+    return a.version, int(a)
+
+
+class _Table:
+    """Sorted, non-overlapping [start, end] ranges of one IP version with coordinates."""
+    def __init__(self):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.lat = array("f")
+        self.lon = array("f")
+
+    def add(self, start: int, end: int, lat: float, lon: float) -> None:
+        self.starts.append(start); self.ends.append(end)
+        self.lat.append(lat); self.lon.append(lon)
+
+    def finish(self) -> None:
+        if any(self.starts[i] > self.starts[i + 1] for i in range(len(self.starts) - 1)):
+            order = sorted(range(len(self.starts)), key=self.starts.__getitem__)
+            self.starts = [self.starts[i] for i in order]
+            self.ends = [self.ends[i] for i in order]
+            self.lat = array("f", (self.lat[i] for i in order))
+            self.lon = array("f", (self.lon[i] for i in order))
+
+    def find(self, ip: int) -> Optional[Tuple[float, float]]:
+        i = bisect_right(self.starts, ip) - 1
+        if i >= 0 and ip <= self.ends[i]:
+            return float(self.lat[i]), float(self.lon[i])
+        return None
+
+    # ---------- binary cache ----------
+    def save(self, d: pathlib.Path, tag: str) -> None:
+        cols = {"lat": self.lat, "lon": self.lon}
+        for name, vals in (("starts", self.starts), ("ends", self.ends)):
+            cols[f"{name}_hi"] = array("Q", (v >> 64 for v in vals))
+            cols[f"{name}_lo"] = array("Q", (v & _MASK64 for v in vals))
+        for name, arr in cols.items():
+            with open(d / f"{tag}.{name}", "wb") as fh:
+                arr.tofile(fh)
+
+    @classmethod
+    def load(cls, d: pathlib.Path, tag: str, rows: int) -> "_Table":
+        def _read(name: str, tc: str) -> array:
+            a = array(tc)
+            with open(d / f"{tag}.{name}", "rb") as fh:
+                a.fromfile(fh, rows)
+            return a
+        t = cls()
+        t.lat, t.lon = _read("lat", "f"), _read("lon", "f")
+        for name in ("starts", "ends"):
+            hi, lo = _read(f"{name}_hi", "Q"), _read(f"{name}_lo", "Q")
+            setattr(t, name, [(h << 64) | l if h else l for h, l in zip(hi, lo)])
+        return t
+
+
+class GeoIndex:
+    """IP -> (lat, lon) by binary search over sorted interval arrays (IPv4 and IPv6 kept apart)."""
+    def __init__(self, v4: _Table, v6: _Table, source: str = ""):
+        self.tables = {4: v4, 6: v6}
+        self.source = source
+
+    def __len__(self) -> int:
+        return sum(len(t.starts) for t in self.tables.values())
+
+    def locate(self, ip: str) -> Optional[Tuple[float, float]]:
+        if not ip:
+            return None
+        try:
+            a = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        if a.version == 6 and a.ipv4_mapped:
+            a = a.ipv4_mapped
+        return self.tables[a.version].find(int(a))
+
+    def locate_many(self, ips: Sequence[str]) -> Tuple[array, array, bytearray]:
+        """Parallel (lat, lon, known) arrays for a vocabulary of IP strings."""
+        lat, lon, known = array("f"), array("f"), bytearray()
+        for ip in ips:
+            hit = self.locate(ip)
+            lat.append(hit[0] if hit else 0.0)
+            lon.append(hit[1] if hit else 0.0)
+            known.append(1 if hit else 0)
+        return lat, lon, known
+
+    # ---------- loading ----------
+    @classmethod
+    def from_csv(cls, path: pathlib.Path) -> "GeoIndex":
+        v4, v6 = _Table(), _Table()
+        with open(path, newline="", encoding="utf-8", errors="replace") as fh:
+            rows = csv.reader(fh)
+            first = next(rows, None)
+            if first is None:
+                return cls(v4, v6, str(path))
+            head = [h.strip().lower() for h in first]
+            if any(h in _LAT for h in head):
+                pick = lambda names: next((head.index(n) for n in names if n in head), None)
+                i_start, i_end, i_net = pick(_START), pick(_END), pick(("network", "cidr"))
+                i_lat, i_lon = pick(_LAT), pick(_LON)
+                pending: List[List[str]] = []
+            else:
+                # headerless: range in the first two columns, coordinates in the last two
+                i_start, i_end, i_net, i_lat, i_lon = 0, 1, None, -2, -1
+                pending = [first]
+            for row in (r for chunk in (pending, rows) for r in chunk):
+                try:
+                    lat, lon = float(row[i_lat]), float(row[i_lon])
+                    if i_net is not None:
+                        net = ipaddress.ip_network(row[i_net].strip(), strict=False)
+                        ver, start, end = net.version, int(net.network_address), int(net.broadcast_address)
+                    else:
+                        ver, start = _to_int(row[i_start])
+                        _v, end = _to_int(row[i_end])
+                except (ValueError, IndexError, TypeError):
+                    continue
+                if lat == 0.0 and lon == 0.0:
+                    continue  # "unknown" placeholder rows in the lite databases
+                (v4 if ver == 4 else v6).add(start, end, lat, lon)
+        v4.finish(); v6.finish()
+        return cls(v4, v6, str(path))
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> "GeoIndex":
+        """CSV parsed once, then reloaded from the binary interval cache until the file changes."""
+        st = path.stat()
+        d = _base_dir() / "data" / "geoip" / f"{path.stem}-{st.st_size}-{int(st.st_mtime)}"
+        meta = read_json(d / "meta.json")
+        if meta:
+            try:
+                return cls(_Table.load(d, "v4", meta["v4"]), _Table.load(d, "v6", meta["v6"]), str(path))
+            except (OSError, EOFError, KeyError):
+                pass
+        idx = cls.from_csv(path)
+        d.mkdir(parents=True, exist_ok=True)
+        idx.tables[4].save(d, "v4"); idx.tables[6].save(d, "v6")
+        write_json_atomic(d / "meta.json", {"source": str(path), "v4": len(idx.tables[4].starts),
+                                             "v6": len(idx.tables[6].starts)})
+        print(f"[geoip] indexed {len(idx)} ranges from {path.name}")
+        return idx
+
+
+_DEFAULT: Dict[str, Optional[GeoIndex]] = {}
+
+def default_index() -> Optional[GeoIndex]:
+    """Index for the configured geoip file (loaded once per process); None when not configured."""
+    path = get_geoip_config()["path"]
+    if path not in _DEFAULT:
+        p = pathlib.Path(os.path.expanduser(path)) if path else None
+        try:
+            _DEFAULT[path] = GeoIndex.load(p) if p and p.is_file() else None
+        except OSError as ex:
+            print(f"[geoip] cannot load {p}: {ex}")
+            _DEFAULT[path] = None
+    return _DEFAULT[path]
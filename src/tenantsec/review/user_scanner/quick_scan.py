@@ -0,0 +1,259 @@
+# src/tenantsec/review/user_scanner/quick_scan.py
+from __future__ import annotations
+import math, random, time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+from tenantsec.app import event_bus
+from tenantsec.core.cache import cache_dir, read_json, write_json_atomic
+from tenantsec.core.findings import Finding
+from tenantsec.core.graph_client import GraphClient
+from tenantsec.config.loader import get_quick_scan_config
+from .checks import REGISTRY
+from .feed_signins import _normalize, _now_utc, _iso
+
+Stratum = Tuple[str, str, str]
+
+# ---------- sampling ----------
+def _stratum(u: Dict[str, Any]) -> Stratum:
+    lic = sorted(u.get("license_skus") or u.get("license_names") or [])
+    return (u.get("department") or "-", u.get("userType") or "Member", lic[0] if lic else "unlicensed")
+
+def stratified_sample(
+    users: Sequence[Dict[str, Any]],
+    size: int,
+    *,
+    seed: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[Stratum, Dict[str, int]]]:
+    """
+    Proportional stratified sample by (department, userType, first license).
+    Strata too small to earn one draw are pooled per (userType, license);
+    if that still leaves more strata than draws, the smallest fold into one
+    ("(other)", "*", "*") pool. The sample is exactly `size` users. Returns the sample and {stratum: {"N": population, "n": sampled}}.
+    """
+    rng = random.Random(seed)
+    total = len(users)
+    if total == 0 or size <= 0:
+        return [], {}
+    size = min(size, total)
+
+    groups: Dict[Stratum, List[Dict[str, Any]]] = {}
+    for u in users:
+        groups.setdefault(_stratum(u), []).append(u)
+    pooled: Dict[Stratum, List[Dict[str, Any]]] = {}
+    for key, members in groups.items():
+        if len(members) * size / total < 1:
+            key = ("(other)", key[1], key[2])
+        pooled.setdefault(key, []).extend(members)
+    if len(pooled) > size:
+        other: Stratum = ("(other)", "*", "*")
+        for key in sorted(pooled, key=lambda k: len(pooled[k])):
+            if len(pooled) <= size:
+                break
+            pooled.setdefault(other, []).extend(pooled.pop(key))
+
+    # largest-remainder allocation, at least one draw per stratum when possible
+    quotas = {k: len(v) * size / total for k, v in pooled.items()}
+    alloc = {k: min(len(pooled[k]), max(1, int(q))) for k, q in quotas.items()}
+    spare = size - sum(alloc.values())
+    # the one-draw floor can overshoot: take draws back, smallest remainders
+    # first (ends, as there are no more strata than draws)
+    order = sorted(quotas, key=lambda k: quotas[k] - int(quotas[k]))
+    while spare < 0:
+        for k in order:
+            if spare >= 0:
+                break
+            if alloc[k] > 1:
+                alloc[k] -= 1
+                spare += 1
+    for k in sorted(quotas, key=lambda k: quotas[k] - int(quotas[k]), reverse=True):
+        if spare <= 0:
+            break
+        if alloc[k] < len(pooled[k]):
+            alloc[k] += 1
+            spare -= 1
+
+    sample: List[Dict[str, Any]] = []
+    strata: Dict[Stratum, Dict[str, int]] = {}
+    for k in sorted(pooled):
+        n = alloc.get(k, 0)
+        if n <= 0:
+            continue
+        picked = rng.sample(pooled[k], n)
+        for u in picked:
+            u["_stratum"] = k
+        sample.extend(picked)
+        strata[k] = {"N": len(pooled[k]), "n": n}
+    return sample, strata
+
+def wilson_interval(p: float, n: int, z: float = 1.96) -> Tuple[float, float]:
+    """Wilson score interval for a proportion p observed over n draws."""
+    if n <= 0:
+        return 0.0, 1.0
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+# ---------- population frame + per-user fetch ----------
+def _population(graph: GraphClient, tenant_id: str) -> List[Dict[str, Any]]:
+    """Cached users index if present, else one lightweight /users pass (not cached)."""
+    cached = (read_json(cache_dir(tenant_id, "Static") / "users_index.json") or {}).get("users") or []
+    if cached:
+        return [u for u in cached if u.get("id")]
+    sel = "id,userPrincipalName,displayName,department,userType,assignedLicenses"
+    out = []
+    for it in graph.get_paged_values(f"/v1.0/users?$select={sel}&$top=999"):
+        if it.get("id"):
+            out.append({
+                "id": it["id"],
+                "upn": it.get("userPrincipalName", ""),
+                "display_name": it.get("displayName"),
+                "department": it.get("department"),
+                "userType": it.get("userType"),
+                "license_skus": sorted(a.get("skuId") for a in it.get("assignedLicenses") or [] if a.get("skuId")),
+            })
+    return out
+
+def _sample_sheets(graph: GraphClient, tenant_id: str, sample: List[Dict[str, Any]], days: int) -> Tuple[Dict[str, Any], bool]:
+    since = _iso(_now_utc() - timedelta(days=days))
+    ids = [u["id"] for u in sample]
+
+    mfa: Dict[str, bool] = {}
+    for path, status, body in graph.batch_get(f"/reports/authenticationMethods/userRegistrationDetails/{uid}" for uid in ids):
+        if status == 200:
+            mfa[path.rsplit("/", 1)[-1]] = bool(body.get("isMfaRegistered"))
+
+    by_user: Dict[str, List[Dict[str, Any]]] = {}
+    paths = {}
+    for uid in ids:
+        flt = quote(f"userId eq '{uid}' and createdDateTime ge {since}")
+        paths[f"/auditLogs/signIns?$filter={flt}&$top=50"] = uid
+    for path, status, body in graph.batch_get(paths):
+        if status == 200:
+            by_user[paths[path]] = [_normalize(s) for s in body.get("value", [])]
+
+    items = []
+    for u in sample:
+        mfa_enabled = mfa.get(u["id"])
+        if mfa_enabled is None and u.get("mfa_state"):
+            mfa_enabled = u.get("mfa_state") == "Registered"
+        items.append({
+            "id": u["id"],
+            "userPrincipalName": u.get("upn") or u.get("display_name"),
+            "displayName": u.get("display_name"),
+            "lastSignInDateTime": u.get("last_sign_in"),
+            "roles": u.get("roles"),
+            "mfaEnabled": bool(mfa_enabled),
+        })
+    signins = [s for logs in by_user.values() for s in logs]
+    sheets = {
+        "org": read_json(cache_dir(tenant_id, "USER") / "org.json") or {},
+        "users": {"items": items},
+        "signins": {"since": since, "items": signins},
+        "signins_by_user": {"since": since, "items": by_user},
+        "mail_rules": {"items": []},
+    }
+    mfa_known = bool(mfa) or any(u.get("mfa_state") for u in sample)
+    return sheets, mfa_known
+
+# ---------- estimate ----------
+def _flagged_users(f: Finding) -> List[str]:
+    out = []
+    for e in f.evidence or []:
+        if isinstance(e, dict):
+            uid = e.get("userId") or e.get("upn")
+            if uid:
+                out.append(uid)
+    return out
+
+def estimate(
+    sample: List[Dict[str, Any]],
+    strata: Dict[Stratum, Dict[str, int]],
+    findings: List[Finding],
+    *,
+    z: float = 1.96,
+) -> List[Dict[str, Any]]:
+    """Stratified prevalence per check id with a Wilson interval over the sample size."""
+    population = sum(s["N"] for s in strata.values())
+    by_id: Dict[str, Dict[str, Any]] = {}
+    upn_to_id = {(u.get("upn") or "").lower(): u["id"] for u in sample}
+    for f in findings:
+        row = by_id.setdefault(f.id, {"title": f.title, "severity": f.severity, "users": set()})
+        for uid in _flagged_users(f):
+            row["users"].add(upn_to_id.get(str(uid).lower(), uid))
+
+    stratum_of = {u["id"]: u["_stratum"] for u in sample}
+    out = []
+    for cid, row in sorted(by_id.items()):
+        hits: Dict[Stratum, int] = {}
+        for uid in row["users"]:
+            if uid in stratum_of:
+                hits[stratum_of[uid]] = hits.get(stratum_of[uid], 0) + 1
+        p = sum(s["N"] / population * hits.get(k, 0) / s["n"] for k, s in strata.items())
+        lo, hi = wilson_interval(p, len(sample), z)
+        out.append({
+            "id": cid,
+            "title": row["title"].split(":", 1)[0],
+            "severity": row["severity"],
+            "flagged_in_sample": sum(hits.values()),
+            "prevalence": round(p, 4),
+            "ci_low": round(lo, 4),
+            "ci_high": round(hi, 4),
+            "estimated_users": round(p * population),
+        })
+    return out
+
+def run_quick_scan(
+    graph: GraphClient,
+    tenant_id: str,
+    *,
+    sample_size: Optional[int] = None,
+    days: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Posture estimate from a stratified user sample: sign-ins and MFA state are
+    fetched (batched) for sampled users only, the user checks run on that
+    sample, and each finding type is reported as prevalence with a 95% interval.
+    Written to USER/quick_scan.json; published as "user.quickscan.ready".
+    """
+    cfg = get_quick_scan_config()
+    sample_size = sample_size or cfg["sample_size"]
+    days = days or cfg["signin_days"]
+    t0 = time.monotonic()
+
+    users = _population(graph, tenant_id)
+    sample, strata = stratified_sample(users, sample_size, seed=seed)
+    sheets, mfa_known = _sample_sheets(graph, tenant_id, sample, days)
+
+    findings: List[Finding] = []
+    errors = []
+    for chk in REGISTRY:
+        try:
+            chk(sheets, findings)
+        except Exception as e:
+            errors.append(f"{getattr(chk, '__name__', 'check')}: {e}")
+    if not mfa_known:
+        # no MFA data for the sample: every user would look unprotected
+        findings = [f for f in findings if f.id != "user.mfa.disabled"]
+        errors.append("MFA state unavailable (needs AuditLog.Read.All); MFA estimate skipped")
+
+    report = {
+        "tenant_id": tenant_id,
+        "taken_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "population": len(users),
+        "sample_size": len(sample),
+        "strata": len(strata),
+        "signin_days": days,
+        "confidence": 0.95,
+        "estimates": estimate(sample, strata, findings),
+        "errors": errors,
+        "elapsed_sec": round(time.monotonic() - t0, 1),
+    }
+    write_json_atomic(cache_dir(tenant_id, "USER") / "quick_scan.json", report)
+    event_bus.publish("user.quickscan.ready", report)
+    print(f"[quick_scan] {len(sample)}/{len(users)} users in {len(strata)} strata, "
+          f"{len(report['estimates'])} finding types, {report['elapsed_sec']}s")
+    return report
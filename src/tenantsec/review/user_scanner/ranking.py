@@ -0,0 +1,118 @@
+# src/tenantsec/review/user_scanner/ranking.py
+from __future__ import annotations
+import heapq, itertools, math, time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from tenantsec.core.cache import cache_dir, read_json, write_json_atomic
+from tenantsec.core.findings import Finding
+
+# Streaming risk ranking over sign-ins, novelty events and user findings.
+# Per user only a handful of counters is kept; events live in a min-heap of
+# size `top_events`, so memory does not grow with the number of sign-ins.
+
+SEVERITY_POINTS = {"critical": 15, "high": 10, "medium": 5, "low": 2, "info": 0}
+NOVELTY_POINTS = {"countries": 5, "prefixes": 2, "apps": 2, "cities": 1, "hour": 1}
+CA_RISKY = ("failure",)
+COUNT_CAP = 10   # foreign/CA counts stop adding after this many
+
+def _path(tenant_id: str):
+    return cache_dir(tenant_id, "USER") / "risk_ranking.json"
+
+class RiskRanker:
+    def __init__(self, tenant_country: str = "", *, top_users: int = 25, top_events: int = 50):
+        self.home = (tenant_country or "").upper()
+        self.top_users = top_users
+        self.top_events = top_events
+        # user key -> [failed, foreign successes, risky CA, novelty points, finding points]
+        self.counts: Dict[str, List[int]] = {}
+        self.labels: Dict[str, str] = {}
+        self.events: List[Tuple[int, int, Dict[str, Any]]] = []
+        self._seq = itertools.count()
+
+    def _user(self, uid: str, upn: Optional[str]) -> List[int]:
+        c = self.counts.get(uid)
+        if c is None:
+            c = self.counts[uid] = [0, 0, 0, 0, 0]
+        if upn and uid not in self.labels:
+            self.labels[uid] = upn
+        return c
+
+    def _keep(self, score: int, event: Dict[str, Any]) -> None:
+        item = (score, next(self._seq), event)
+        if len(self.events) < self.top_events:
+            heapq.heappush(self.events, item)
+        elif score > self.events[0][0]:
+            heapq.heapreplace(self.events, item)
+
+    def add_signin(self, r: Dict[str, Any]) -> None:
+        """One sign-in in the store/feed_signins row shape."""
+        uid = r.get("userId") or ""
+        if not uid:
+            return
+        c = self._user(uid, r.get("userPrincipalName") or r.get("upn"))
+        ok = r.get("status") == "success"
+        ctry = (r.get("country") or "").upper()
+        score = 0
+        if not ok:
+            c[0] += 1
+            score += 1
+        elif self.home and ctry and ctry != self.home:
+            c[1] += 1
+            score += 4
+        if (r.get("ca") or "") in CA_RISKY:
+            c[2] += 1
+            score += 3
+        if score > 1:  # single failures are noise on their own
+            self._keep(score, {"kind": "signin", **r})
+
+    def add_novelty(self, e: Dict[str, Any]) -> None:
+        uid = e.get("userId") or ""
+        if not uid:
+            return
+        pts = sum(NOVELTY_POINTS.get(k, 1) for k in e.get("kinds") or [])
+        if e.get("status") != "success":
+            pts //= 2
+        self._user(uid, e.get("upn"))[3] += pts
+        if pts:
+            self._keep(pts, {"kind": "novelty", **e})
+
+    def add_finding(self, f: Finding) -> None:
+        ev = next((e for e in (f.evidence or []) if isinstance(e, dict)), {})
+        uid = ev.get("userId") or (ev.get("upn") or "").lower()
+        if uid:
+            self._user(uid, ev.get("upn"))[4] += SEVERITY_POINTS.get((f.severity or "").lower(), 0)
+
+    @staticmethod
+    def score(c: List[int]) -> float:
+        failed, foreign, ca, novelty, findings = c
+        return (findings + 2 * math.log2(1 + failed) + 4 * min(foreign, COUNT_CAP)
+                + 3 * min(ca, COUNT_CAP) + min(novelty, 4 * COUNT_CAP))
+
+    def to_dict(self) -> Dict[str, Any]:
+        top = heapq.nlargest(self.top_users, self.counts.items(), key=lambda kv: self.score(kv[1]))
+        return {
+            "ranked_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "users": [{"userId": uid, "upn": self.labels.get(uid, uid), "score": round(self.score(c), 1),
+                       "failed": c[0], "foreign_success": c[1], "ca_failure": c[2],
+                       "novelty": c[3], "finding_points": c[4]}
+                      for uid, c in top if self.score(c) > 0],
+            "events": [{"score": s, **e} for s, _n, e in sorted(self.events, key=lambda t: (-t[0], t[1]))],
+        }
+
+def rank_users(sheets: Dict[str, Any], findings: Iterable[Finding], **kw) -> Dict[str, Any]:
+    """Single pass over the loaded sheets (the sign-in view is read row by row)."""
+    country = ((sheets.get("org") or {}).get("organization") or {}).get("country") or ""
+    ranker = RiskRanker(country, **kw)
+    for r in (sheets.get("signins") or {}).get("items", []):
+        ranker.add_signin(r)
+    for e in (sheets.get("novelty") or {}).get("items", []):
+        ranker.add_novelty(e)
+    for f in findings:
+        ranker.add_finding(f)
+    return ranker.to_dict()
+
+def write_ranking(tenant_id: str, ranking: Dict[str, Any]) -> None:
+    write_json_atomic(_path(tenant_id), ranking)
+
+def load_ranking(tenant_id: str) -> Dict[str, Any]:
+    return read_json(_path(tenant_id)) or {}
@@ -4,6 +4,7 @@ from typing import List
 from tenantsec.core.findings import Finding
 from .sheets import load_user_sheets
 from .checks import REGISTRY
+from .ranking import rank_users, write_ranking
 
 def run_user_checks(tenant_id: str) -> List[Finding]:
     sheets = load_user_sheets(tenant_id)
@@ -18,4 +19,9 @@ def run_user_checks(tenant_id: str) -> List[Finding]:
                 severity="low",
                 summary=str(e),
             ))
+    try:
+        # USER/risk_ranking.json: the review opens with the top users/events
+        write_ranking(tenant_id, rank_users(sheets, findings))
+    except Exception as e:
+        print(f"[user_review] ranking failed: {e!r}")
     return findings
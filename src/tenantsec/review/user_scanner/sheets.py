@@ -5,6 +5,7 @@ from pathlib import Path
 from tenantsec.core.cache import cache_dir, read_json
 from tenantsec.core.cache_manager import tenant_root
 from datetime import datetime, timezone
+from .signin_store import SigninStore
 '''
 def load_user_sheets(tenant_id: str) -> Dict[str, Any]:
     """
@@ -107,6 +108,12 @@ def _adapt_users_from_static(tenant_id: str, *, max_age_sec: int = 86400) -> Dic
             "mfaEnabled": (u.get("mfa_state") == "Registered"),
         })
     return {"items": items}
+def _load_signins(tenant_id: str, user_root: Path) -> Dict[str, Any]:
+    """signins.json either points at the columnar store (lazy, mmap-backed items) or is a legacy item list."""
+    doc = read_json(user_root / "signins.json") or {}
+    if doc.get("store"):
+        return {"since": doc.get("since"), "items": SigninStore(tenant_id).view()}
+    return doc or {"items": []}
 '''
 def load_user_sheets(tenant_id: str) -> Dict[str, Any]:
     user_root = tenant_root(tenant_id) / "USER"
@@ -133,99 +140,11 @@ def load_user_sheets(tenant_id: str) -> Dict[str, Any]:
     if not users or not users.get("items"):
         users   = _adapt_users_from_static(tenant_id, max_age_sec=86400)
 
-    signins     = read_json(user_root / "signins.json")          or {"items": []}
+    signins     = _load_signins(tenant_id, user_root)
     mail_rules  = read_json(user_root / "mail_rules.json")       or {"items": []}
     sby_user    = read_json(user_root / "signins_by_user.json")  or {"items": {}}
+    novelty     = read_json(user_root / "novelty.json")          or {"items": []}
+    bursts      = read_json(user_root / "bursts.json")           or {"items": []}
 
-    return {"org": org, "users": users, "signins": signins, "mail_rules": mail_rules, "signins_by_user": sby_user}
-
-
-from tenantsec.review.user_scanner.sheets import load_user_sheets
-from tenantsec.ui.presenters.review_render import format_finding_to_text
-
-def render_user_report(tenant_id: str, findings):
-    sheets = load_user_sheets(tenant_id)
-    sby = (sheets.get("signins_by_user") or {}).get("items", {})
-    org_country = ((sheets.get("org") or {}).get("organization") or {}).get("country", "")
-
-    header = [
-        "=== PySecCheck — User Security Review ===",
-        f"Tenant: {tenant_id}",
-        "",
-        "🧩 User Checks — Categorized",
-        ""
-    ]
-
-    def user_key(f):
-        ev = f.evidence or []
-        if isinstance(ev, list) and ev:
-            rec = ev[0] if isinstance(ev[0], dict) else {}
-            return rec.get("upn") or rec.get("userPrincipalName") or rec.get("userId") or "Unknown user"
-        t = (f.title or "")
-        return t.split(": ", 1)[1].strip() if ": " in t else "Unknown user"
-
-    by_user = {}
-    for f in findings:
-        by_user.setdefault(user_key(f), []).append(f)
-
-    if not by_user:
-        return "\n".join(header + ["No user findings. ✅"])
-
-    id_to_upn = {}
-    for u in (sheets.get("users") or {}).get("items", []):
-        if u.get("id"):
-            id_to_upn[u["id"]] = u.get("userPrincipalName") or u.get("upn") or u["id"]
-
-    def render_recent_signins(upn: str):
-        entries = []
-        for uid, logs in sby.items():
-            if id_to_upn.get(uid, "").lower() == upn.lower():
-                entries = logs; break
-        if not entries:
-            for logs in sby.values():
-                if logs and (logs[0].get("upn") or "").lower() == upn.lower():
-                    entries = logs; break
-
-        if not entries:
-            return ["    • No evidence of risky sign-ins in the evaluated window"]
-
-        out = ["    Recent sign-ins (30d):"]
-        for e in entries[:3]:
-            ctry = (e.get("country") or "").upper()
-            flag = " ⚠" if org_country and ctry and ctry != org_country.upper() and e.get("status") == "success" else ""
-            out.append(
-                f"      - {e.get('createdDateTime')} • {e.get('city')},{ctry} • {e.get('status')} • {e.get('clientApp')} • {e.get('ip')}{flag}"
-            )
-        return out
-
-    categories = [
-        ("🛡️ Authentication / Sign-in", ("user.signin.", "user.mfa.")),
-        ("🛡️ Exchange / Mailbox Rules", ("user.mail.",)),
-        ("🛡️ Account Hygiene",         ("user.account.",)),
-        ("🛡️ Risk Indicators",         ("user.risk.",)),
-        ("🛡️ Licensing / Usage",       ("user.license.",)),
-    ]
-
-    lines = header[:]
-    for user in sorted(by_user.keys(), key=str.lower):
-        lines.append(f"— {user}")
-        ufinds = by_user[user]
-
-        had_auth = False
-        for label, prefixes in categories:
-            items = [f for f in ufinds if any(f.id.startswith(p) for p in prefixes)]
-            lines.append(f"  {label}")
-            if items:
-                if label == "🛡️ Authentication / Sign-in":
-                    had_auth = True
-                for f in items:
-                    for ln in format_finding_to_text(f).splitlines():
-                        lines.append("    " + ln)
-            else:
-                lines.append("    • No findings detected ✅")
-
-            if label == "🛡️ Authentication / Sign-in":
-                lines += render_recent_signins(user)
-            lines.append("")
-
-    return "\n".join(lines)
+    return {"org": org, "users": users, "signins": signins, "mail_rules": mail_rules,
+            "signins_by_user": sby_user, "novelty": novelty, "bursts": bursts}
@@ -0,0 +1,292 @@
+# src/tenantsec/review/user_scanner/signin_frame.py
+from __future__ import annotations
+from array import array
+from math import radians, sin, cos, sqrt, atan2
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .signin_store import SigninView, to_epoch, to_iso
+
+# ---- Optional: NumPy kernels (pure-Python fallback gives identical results) ----
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except Exception:
+    HAS_NUMPY = False
+
+# coded frame column -> normalized record key; code 0 is always ""
+CODED = {"user": "userId", "upn": "userPrincipalName", "country": "country",
+         "city": "city", "app": "clientApp", "ip": "ip"}
+TYPECODES = {"ts": "q", "status": "B", **{c: "i" for c in CODED}}
+
+
+class SigninFrame:
+    """
+    Sign-ins as parallel columns: ts (int64 epoch seconds), status (1 = success)
+    and int codes for user/upn/country/city/app/ip with one vocabulary per
+    column. Built straight from the columnar store's memory-mapped partitions
+    (no per-row parsing) or, for small in-memory lists, by encoding once.
+    Columns are numpy arrays when HAS_NUMPY, else array.array.
+    """
+    def __init__(self, cols: Dict[str, Any], vocab: Dict[str, List[str]]):
+        self.cols = cols
+        self.vocab = vocab
+        self._codes: Dict[str, Dict[str, int]] = {}
+
+    # ---------- construction ----------
+    @classmethod
+    def from_view(cls, view: SigninView) -> "SigninFrame":
+        parts = list(view.parts)
+        vocab = parts[0]._dicts.values if parts else {c: [""] for c in CODED}
+        cols: Dict[str, Any] = {}
+        for col, tc in TYPECODES.items():
+            if HAS_NUMPY:
+                chunks = [np.asarray(p.cols[col]) for p in parts if len(p)]
+                cols[col] = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.dtype(tc))
+            else:
+                a = array(tc)
+                for p in parts:
+                    a.frombytes(bytes(p.cols[col]))
+                cols[col] = a
+        return cls(cols, vocab)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "SigninFrame":
+        vocab: Dict[str, List[str]] = {c: [""] for c in CODED}
+        codes: Dict[str, Dict[str, int]] = {c: {"": 0} for c in CODED}
+        cols = {c: array(tc) for c, tc in TYPECODES.items()}
+        for r in records:
+            cols["ts"].append(to_epoch(r.get("createdDateTime")))
+            cols["status"].append(1 if (r.get("status") or "").lower() == "success" else 0)
+            for col, key in CODED.items():
+                s = str(r.get(key) or "")
+                code = codes[col].get(s)
+                if code is None:
+                    code = codes[col][s] = len(vocab[col])
+                    vocab[col].append(s)
+                cols[col].append(code)
+        if HAS_NUMPY:
+            cols = {c: np.frombuffer(a, dtype=np.dtype(TYPECODES[c])) if len(a)
+                    else np.zeros(0, dtype=np.dtype(TYPECODES[c])) for c, a in cols.items()}
+        frame = cls(cols, vocab)
+        frame._codes = codes
+        return frame
+
+    @classmethod
+    def from_sheets(cls, sheets: Dict[str, Any]) -> "SigninFrame":
+        items = (sheets.get("signins") or {}).get("items") or []
+        if isinstance(items, SigninView):
+            return cls.from_view(items)
+        return cls.from_records(items)
+
+    # ---------- lookup ----------
+    def __len__(self) -> int:
+        return len(self.cols["ts"])
+
+    def code(self, col: str, value: str) -> int:
+        """Code of `value` in column `col`, -1 if it never occurs."""
+        if col not in self._codes:
+            self._codes[col] = {v: i for i, v in enumerate(self.vocab[col])}
+        return self._codes[col].get(value, -1)
+
+    def decode(self, col: str, code: int) -> str:
+        vals = self.vocab[col]
+        return vals[code] if 0 <= code < len(vals) else ""
+
+    def row(self, i: int) -> Dict[str, Any]:
+        c = self.cols
+        return {
+            "userId": self.decode("user", int(c["user"][i])),
+            "upn": self.decode("upn", int(c["upn"][i])),
+            "time": to_iso(int(c["ts"][i])),
+            "status": "success" if c["status"][i] else "failed",
+            "country": self.decode("country", int(c["country"][i])),
+            "city": self.decode("city", int(c["city"][i])),
+            "ip": self.decode("ip", int(c["ip"][i])),
+            "clientApp": self.decode("app", int(c["app"][i])),
+        }
+
+
+# ---------- kernels ----------
+# Each returns {user_code: ...} with at most one entry per user.
+
+def _by_user_ts(frame: SigninFrame, rows: Optional[List[int]] = None) -> List[int]:
+    """Row indices ordered by (user, ts) — python fallback only."""
+    c = frame.cols
+    idx = range(len(frame)) if rows is None else rows
+    return sorted(idx, key=lambda i: (c["user"][i], c["ts"][i]))
+
+def mask(
+    frame: SigninFrame,
+    *,
+    status: Optional[int] = None,
+    where: Optional[Dict[str, Iterable[int]]] = None,
+    where_not: Optional[Dict[str, Iterable[int]]] = None,
+):
+    """Row filter: status equals, column code in / not in the given codes (all ANDed)."""
+    c = frame.cols
+    where = {k: list(v) for k, v in (where or {}).items()}
+    where_not = {k: list(v) for k, v in (where_not or {}).items()}
+    if HAS_NUMPY:
+        m = np.ones(len(frame), dtype=bool)
+        if status is not None:
+            m &= c["status"] == status
+        for col, codes in where.items():
+            m &= np.isin(c[col], codes)
+        for col, codes in where_not.items():
+            m &= ~np.isin(c[col], codes)
+        return m
+    sets_in = {k: set(v) for k, v in where.items()}
+    sets_out = {k: set(v) for k, v in where_not.items()}
+    return bytearray(
+        (status is None or c["status"][i] == status)
+        and all(c[k][i] in v for k, v in sets_in.items())
+        and not any(c[k][i] in v for k, v in sets_out.items())
+        for i in range(len(frame))
+    )
+
+def latest_matching(frame: SigninFrame, m) -> Dict[int, Tuple[int, int]]:
+    """Rows selected by mask `m`, grouped by user: {user: (latest row, count)}."""
+    c = frame.cols
+    if HAS_NUMPY:
+        idx = np.nonzero(m)[0]
+        if not len(idx):
+            return {}
+        o = idx[np.lexsort((-c["ts"][idx], c["user"][idx]))]
+        users, first, counts = np.unique(c["user"][o], return_index=True, return_counts=True)
+        return {int(u): (int(o[f]), int(n)) for u, f, n in zip(users, first, counts)}
+    out: Dict[int, Tuple[int, int]] = {}
+    for i in range(len(frame)):
+        if not m[i]:
+            continue
+        u = c["user"][i]
+        prev = out.get(u)
+        if prev is None:
+            out[u] = (i, 1)
+        else:
+            best = i if c["ts"][i] > c["ts"][prev[0]] else prev[0]
+            out[u] = (best, prev[1] + 1)
+    return out
+
+def country_hops(frame: SigninFrame, max_gap_sec: int) -> Dict[int, Tuple[int, int]]:
+    """
+    First pair of consecutive sign-ins per user (in time order) from two
+    different known countries less than max_gap_sec apart: {user: (prev, next)}.
+    """
+    c = frame.cols
+    if HAS_NUMPY:
+        if len(frame) < 2:
+            return {}
+        o = np.lexsort((c["ts"], c["user"]))
+        u, k, t = c["user"][o], c["country"][o], c["ts"][o]
+        hit = ((u[1:] == u[:-1]) & (k[1:] != k[:-1]) & (k[1:] != 0) & (k[:-1] != 0)
+               & ((t[1:] - t[:-1]) < max_gap_sec))
+        j = np.nonzero(hit)[0]
+        if not len(j):
+            return {}
+        users, first = np.unique(u[j], return_index=True)
+        return {int(x): (int(o[j[f]]), int(o[j[f] + 1])) for x, f in zip(users, first)}
+    out: Dict[int, Tuple[int, int]] = {}
+    o = _by_user_ts(frame)
+    for a, b in zip(o, o[1:]):
+        u = c["user"][b]
+        if u in out or c["user"][a] != u:
+            continue
+        ka, kb = c["country"][a], c["country"][b]
+        if ka and kb and ka != kb and c["ts"][b] - c["ts"][a] < max_gap_sec:
+            out[u] = (a, b)
+    return out
+
+def failure_bursts(frame: SigninFrame, threshold: int, window_sec: int) -> Dict[int, Tuple[int, int]]:
+    """
+    Users with `threshold` failed sign-ins inside any window_sec span:
+    {user: (first row of the earliest such burst, total failures)}.
+    """
+    c = frame.cols
+    k = max(1, threshold) - 1
+    if HAS_NUMPY:
+        f = np.nonzero(c["status"] == 0)[0]
+        if len(f) <= k:
+            return {}
+        o = f[np.lexsort((c["ts"][f], c["user"][f]))]
+        u, t = c["user"][o], c["ts"][o]
+        totals = dict(zip(*(x.tolist() for x in np.unique(u, return_counts=True))))
+        if k:
+            hit = (u[k:] == u[:-k]) & ((t[k:] - t[:-k]) <= window_sec)
+        else:
+            hit = np.ones(len(o), dtype=bool)
+        j = np.nonzero(hit)[0]
+        if not len(j):
+            return {}
+        users, first = np.unique(u[j], return_index=True)
+        return {int(x): (int(o[j[i]]), int(totals[int(x)])) for x, i in zip(users, first)}
+    fails = [i for i in range(len(frame)) if c["status"][i] == 0]
+    o = _by_user_ts(frame, fails)
+    totals: Dict[int, int] = {}
+    for i in o:
+        totals[c["user"][i]] = totals.get(c["user"][i], 0) + 1
+    out: Dict[int, Tuple[int, int]] = {}
+    for n in range(len(o) - k):
+        a, b = o[n], o[n + k]
+        u = c["user"][a]
+        if u not in out and c["user"][b] == u and c["ts"][b] - c["ts"][a] <= window_sec:
+            out[u] = (a, totals[u])
+    return out
+
+def distance_km(lat1, lon1, lat2, lon2):
+    if None in (lat1, lon1, lat2, lon2): return 0
+    R = 6371
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat/2)**2 + cos(radians(lat1))*cos(radians(lat2))*sin(dlon/2)**2
+    return R * 2 * atan2(sqrt(a), sqrt(1 - a))
+
+def travel_speeds(
+    frame: SigninFrame,
+    ip_lat: Sequence[float],
+    ip_lon: Sequence[float],
+    ip_known: Sequence[int],
+    *,
+    max_kmh: float,
+    min_km: float,
+    min_gap_sec: int = 60,
+) -> Dict[int, Tuple[int, int, float, float]]:
+    """
+    One sweep over sign-ins ordered by (user, ts): for consecutive pairs whose
+    IPs are both geolocated (ip_* are indexed by ip code), the great-circle
+    distance and implied speed. Gaps under min_gap_sec count as min_gap_sec.
+    Returns the fastest pair per user that is at least min_km apart and
+    faster than max_kmh: {user: (prev row, next row, km, km/h)}.
+    """
+    c = frame.cols
+    if HAS_NUMPY:
+        known = np.asarray(ip_known, dtype=bool)
+        idx = np.nonzero(known[c["ip"]])[0] if len(frame) else np.zeros(0, dtype=np.int64)
+        if len(idx) < 2:
+            return {}
+        o = idx[np.lexsort((c["ts"][idx], c["user"][idx]))]
+        u, t = c["user"][o], c["ts"][o]
+        la = np.radians(np.asarray(ip_lat, dtype=np.float64)[c["ip"][o]])
+        lo = np.radians(np.asarray(ip_lon, dtype=np.float64)[c["ip"][o]])
+        h = (np.sin((la[1:] - la[:-1]) / 2) ** 2
+             + np.cos(la[:-1]) * np.cos(la[1:]) * np.sin((lo[1:] - lo[:-1]) / 2) ** 2)
+        km = 6371 * 2 * np.arctan2(np.sqrt(h), np.sqrt(np.clip(1 - h, 0, None)))
+        kmh = km / (np.maximum(t[1:] - t[:-1], min_gap_sec) / 3600)
+        j = np.nonzero((u[1:] == u[:-1]) & (km >= min_km) & (kmh > max_kmh))[0]
+        if not len(j):
+            return {}
+        j = j[np.lexsort((-kmh[j], u[j]))]
+        users, first = np.unique(u[j], return_index=True)
+        return {int(x): (int(o[j[f]]), int(o[j[f] + 1]), float(km[j[f]]), float(kmh[j[f]]))
+                for x, f in zip(users, first)}
+    out: Dict[int, Tuple[int, int, float, float]] = {}
+    o = _by_user_ts(frame, [i for i in range(len(frame)) if ip_known[c["ip"][i]]])
+    for a, b in zip(o, o[1:]):
+        u = c["user"][b]
+        if c["user"][a] != u:
+            continue
+        ia, ib = c["ip"][a], c["ip"][b]
+        km = distance_km(float(ip_lat[ia]), float(ip_lon[ia]), float(ip_lat[ib]), float(ip_lon[ib]))
+        kmh = km / (max(c["ts"][b] - c["ts"][a], min_gap_sec) / 3600)
+        if km >= min_km and kmh > max_kmh and (u not in out or kmh > out[u][3]):
+            out[u] = (a, b, km, kmh)
+    return out
@@ -0,0 +1,432 @@
+# src/tenantsec/review/user_scanner/signin_store.py
+from __future__ import annotations
+import mmap, os, shutil, time
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from tenantsec.core.cache import cache_dir, read_json, write_json_atomic
+
+STORE_DIR = "signins_col"          # the review window (rebuilt / expired with it)
+ARCHIVE_DIR = "signins_archive"    # append-only history, kept for get_signins_config()["archive_days"]
+
+# Dictionary-encoded string columns (int32 codes into dicts.json).
+DICT_COLUMNS = ("user", "upn", "country", "city", "app", "ip", "ca")
+# Fixed-width column typecodes: ts=int64 epoch seconds, status=uint8 (1 = success).
+TYPECODES: Dict[str, str] = {"ts": "q", "status": "B", **{c: "i" for c in DICT_COLUMNS}}
+
+# Columns with a per-partition posting list (<col>.idx: row ids grouped by
+# code, offsets in index.json), so lookups decode only matching rows.
+INDEXED_COLUMNS = ("user", "upn", "country")
+
+# normalized record key (feed_signins) -> column
+_SOURCE = {
+    "user": "userId", "upn": "userPrincipalName", "country": "country", "city": "city",
+    "app": "clientApp", "ip": "ip", "ca": "ca",
+}
+
+def to_epoch(ts: Optional[str]) -> int:
+    if not ts:
+        return 0
+    try:
+        return int(datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp())
+    except Exception:
+        return 0
+
+def to_iso(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def day_of(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%d")
+
+
+class _Dicts:
+    """String <-> code dictionaries shared by all partitions of one store."""
+    def __init__(self, path: Path):
+        self.path = path
+        data = read_json(path) or {}
+        self.values: Dict[str, List[str]] = {c: list(data.get(c) or [""]) for c in DICT_COLUMNS}
+        self.codes: Dict[str, Dict[str, int]] = {c: {v: i for i, v in enumerate(vals)}
+                                                 for c, vals in self.values.items()}
+        self.dirty = False
+
+    def encode(self, col: str, value: Any) -> int:
+        s = "" if value is None else str(value)
+        codes = self.codes[col]
+        code = codes.get(s)
+        if code is None:
+            code = len(self.values[col])
+            self.values[col].append(s)
+            codes[s] = code
+            self.dirty = True
+        return code
+
+    def decode(self, col: str, code: int) -> str:
+        vals = self.values[col]
+        return vals[code] if 0 <= code < len(vals) else ""
+
+    def save(self) -> None:
+        if self.dirty:
+            write_json_atomic(self.path, self.values)
+            self.dirty = False
+
+
+class DayPartition(Sequence):
+    """Memory-mapped columns of one UTC day; rows decode lazily."""
+    def __init__(self, path: Path, dicts: _Dicts):
+        self.path = path
+        self.day = path.name
+        self._dicts = dicts
+        self._maps: List[mmap.mmap] = []
+        self.rows = int((read_json(path / "meta.json") or {}).get("rows", 0))
+        self.cols: Dict[str, Sequence[int]] = {c: self._map(c) for c in TYPECODES}
+        self._index: Optional[Dict[str, Any]] = None
+
+    def _map(self, col: str, name: Optional[str] = None, rows: Optional[int] = None) -> Sequence[int]:
+        p = self.path / (name or f"{col}.col")
+        rows = self.rows if rows is None else rows
+        if not rows or not p.exists() or p.stat().st_size == 0:
+            return array(TYPECODES[col])
+        with open(p, "rb") as fh:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mm)
+        # only expose committed rows (meta.json is written after the data)
+        return memoryview(mm).cast(TYPECODES[col])[: rows]
+
+    def lookup(self, col: str, codes: Iterable[int]) -> List[int]:
+        """Row ids whose `col` code is in `codes` (posting list when indexed, else a column scan)."""
+        want = set(codes)
+        if self._index is None:
+            self._index = read_json(self.path / "index.json") or {}
+        idx = self._index
+        if col in INDEXED_COLUMNS and idx.get("rows") == self.rows and col in idx.get("columns", {}):
+            spans = idx["columns"][col]
+            postings = self._map(col, f"{col}.idx", self.rows)
+            out: List[int] = []
+            for c in want:
+                off, n = spans.get(str(c), (0, 0))
+                out.extend(postings[off: off + n])
+            return out
+        values = self.cols[col]
+        return [i for i in range(self.rows) if values[i] in want]
+
+    def close(self) -> None:
+        self.cols = {}
+        for mm in self._maps:
+            try:
+                mm.close()
+            except (BufferError, ValueError):
+                pass  # a caller still holds a view; GC will unmap it
+        self._maps = []
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.row(j) for j in range(*i.indices(self.rows))]
+        if i < 0:
+            i += self.rows
+        if not 0 <= i < self.rows:
+            raise IndexError(i)
+        return self.row(i)
+
+    def row(self, i: int) -> Dict[str, Any]:
+        c, d = self.cols, self._dicts
+        return {
+            "userId": d.decode("user", c["user"][i]),
+            "userPrincipalName": d.decode("upn", c["upn"][i]),
+            "createdDateTime": to_iso(c["ts"][i]),
+            "status": "success" if c["status"][i] else "failed",
+            "ip": d.decode("ip", c["ip"][i]),
+            "country": d.decode("country", c["country"][i]),
+            "city": d.decode("city", c["city"][i]),
+            "clientApp": d.decode("app", c["app"][i]),
+            "ca": d.decode("ca", c["ca"][i]),
+        }
+
+
+class SigninView(Sequence):
+    """Read-only sequence over several partitions, oldest first, without loading rows."""
+    def __init__(self, parts: List[DayPartition]):
+        self.parts = parts
+        self._offsets: List[int] = []
+        n = 0
+        for p in parts:
+            self._offsets.append(n)
+            n += len(p)
+        self._len = n
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._len))]
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        for p, off in zip(reversed(self.parts), reversed(self._offsets)):
+            if i >= off:
+                return p.row(i - off)
+        raise IndexError(i)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for p in self.parts:
+            for i in range(len(p)):
+                yield p.row(i)
+
+
+class SigninStore:
+    """
+    Columnar sign-in store under USER/signins_col/<gen>/<YYYY-MM-DD>/<column>.col.
+    Strings are dictionary-encoded once per generation; each day partition
+    holds fixed-width arrays that are memory-mapped on read.
+
+    A full rebuild writes a new generation next to the live one and
+    publish() switches current.json to it, so readers (which resolve the
+    pointer once, without locks) see either the old or the new store, never
+    a half-built one. Stores without current.json (the archive, older
+    caches) live directly in the directory.
+    """
+    def __init__(self, tenant_id: str, directory: str = STORE_DIR, *, generation: Optional[str] = None):
+        self.tenant_id = tenant_id
+        self.base = cache_dir(tenant_id, "USER") / directory
+        self.base.mkdir(parents=True, exist_ok=True)
+        if generation is None:
+            generation = (read_json(self.base / "current.json") or {}).get("generation") or ""
+        self.generation = generation
+        self.root = self.base / generation if generation else self.base
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.dicts = _Dicts(self.root / "dicts.json")
+        self._folded: Dict[str, Dict[str, List[int]]] = {}
+
+    # ---------- write ----------
+    def append(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Append normalized records (feed_signins shape) to their day partitions."""
+        by_day: Dict[str, Dict[str, array]] = {}
+        n = 0
+        for r in records:
+            ts = to_epoch(r.get("createdDateTime"))
+            cols = by_day.get(day_of(ts))
+            if cols is None:
+                cols = by_day[day_of(ts)] = {c: array(t) for c, t in TYPECODES.items()}
+            cols["ts"].append(ts)
+            cols["status"].append(1 if (r.get("status") or "").lower() == "success" else 0)
+            for col, key in _SOURCE.items():
+                cols[col].append(self.dicts.encode(col, r.get(key)))
+            n += 1
+
+        # dictionaries first, so committed codes always decode
+        self.dicts.save()
+        for day, cols in by_day.items():
+            self._append_day(day, cols)
+        return n
+
+    def _append_day(self, day: str, cols: Dict[str, array]) -> None:
+        part = self.root / day
+        part.mkdir(parents=True, exist_ok=True)
+        meta_path = part / "meta.json"
+        rows = int((read_json(meta_path) or {}).get("rows", 0))
+        for col, arr in cols.items():
+            p = part / f"{col}.col"
+            with open(p, "r+b" if p.exists() else "wb") as fh:
+                # drop any tail left by an interrupted append before writing
+                fh.truncate(rows * arr.itemsize)
+                fh.seek(0, os.SEEK_END)
+                arr.tofile(fh)
+        write_json_atomic(meta_path, {"day": day, "rows": rows + len(cols["ts"])})
+        self._index_day(day)
+
+    def _index_day(self, day: str) -> None:
+        """Rebuild the posting lists of one partition (only the days just appended to)."""
+        part = self.partition(day)
+        try:
+            doc: Dict[str, Any] = {"rows": part.rows, "columns": {}}
+            for col in INDEXED_COLUMNS:
+                groups: Dict[int, array] = {}
+                values = part.cols[col]
+                for i in range(part.rows):
+                    g = groups.get(values[i])
+                    if g is None:
+                        g = groups[values[i]] = array("i")
+                    g.append(i)
+                spans, off = {}, 0
+                with open(part.path / f"{col}.idx", "wb") as fh:
+                    for code, rows in groups.items():
+                        rows.tofile(fh)
+                        spans[str(code)] = (off, len(rows))
+                        off += len(rows)
+                doc["columns"][col] = spans
+        finally:
+            part.close()
+        # written last: a stale/missing index.json makes readers fall back to a scan
+        write_json_atomic(part.path / "index.json", doc)
+
+    # ---------- transactions ----------
+    # begin() records every partition's committed row count in txn.json;
+    # commit() writes the caller's sync state (tagged with the txn id) and
+    # removes it. A pass that dies in between is rolled back by recover():
+    # partitions it created are deleted and the others cut back to their
+    # recorded length (_append_day truncates the column files to meta rows).
+    def _rows(self, day: str) -> int:
+        return int((read_json(self.root / day / "meta.json") or {}).get("rows", 0))
+
+    def state(self) -> Dict[str, Any]:
+        """Sync state of the last committed pass (sync.json)."""
+        return read_json(self.root / "sync.json") or {}
+
+    def begin(self, txn: str) -> None:
+        self.recover()
+        write_json_atomic(self.root / "txn.json", {"id": txn, "rows": {d: self._rows(d) for d in self.days()}})
+
+    def pending(self, txn: str) -> bool:
+        """True while `txn` is the open transaction (False once committed, rolled back or cleared)."""
+        return (read_json(self.root / "txn.json") or {}).get("id") == txn
+
+    def commit(self, txn: str, state: Dict[str, Any]) -> None:
+        write_json_atomic(self.root / "sync.json", {**state, "committed": txn})
+        (self.root / "txn.json").unlink(missing_ok=True)
+
+    def recover(self, *, committed: Optional[str] = None) -> bool:
+        """
+        Finish an interrupted pass: kept if its txn id was committed (here, or
+        `committed` by the store it shadows), otherwise rolled back. True when
+        rows were rolled back.
+        """
+        txn = read_json(self.root / "txn.json")
+        if not txn:
+            return False
+        if txn.get("id") in (self.state().get("committed"), committed):
+            if self.state().get("committed") != txn.get("id"):
+                write_json_atomic(self.root / "sync.json", {**self.state(), "committed": txn["id"]})
+            (self.root / "txn.json").unlink(missing_ok=True)
+            return False
+        before: Dict[str, int] = txn.get("rows") or {}
+        for day in self.days():
+            if day not in before:
+                shutil.rmtree(self.root / day, ignore_errors=True)
+            elif self._rows(day) > before[day]:
+                write_json_atomic(self.root / day / "meta.json", {"day": day, "rows": before[day]})
+                self._index_day(day)
+        (self.root / "txn.json").unlink(missing_ok=True)
+        print(f"[signin_store] rolled back interrupted pass {txn.get('id')} in {self.root.name}")
+        return True
+
+    # ---------- generations ----------
+    @classmethod
+    def new_generation(cls, tenant_id: str, directory: str = STORE_DIR) -> "SigninStore":
+        """Empty store beside the live one; invisible to readers until publish()."""
+        return cls(tenant_id, directory, generation=f"gen-{time.time_ns():x}")
+
+    def publish(self) -> None:
+        write_json_atomic(self.base / "current.json", {"generation": self.generation})
+        self.sweep()
+
+    def sweep(self) -> None:
+        """Delete generations (and a pre-generation layout) other than the live one."""
+        live = (read_json(self.base / "current.json") or {}).get("generation")
+        if not live:
+            return
+        for p in self.base.iterdir():
+            if p.is_dir() and p.name != live and (p.name.startswith("gen-") or (p / "meta.json").exists()):
+                # a reader may still map files here; whatever can't go now goes next sweep
+                shutil.rmtree(p, ignore_errors=True)
+            elif p.is_file() and p.name in ("dicts.json", "sync.json", "txn.json"):
+                p.unlink(missing_ok=True)
+
+    def drop_partitions_before(self, day: str) -> List[str]:
+        dropped = [d for d in self.days() if d < day]
+        for d in dropped:
+            shutil.rmtree(self.root / d, ignore_errors=True)
+        return dropped
+
+    # ---------- read ----------
+    def days(self) -> List[str]:
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir() and (p / "meta.json").exists())
+
+    def partition(self, day: str) -> DayPartition:
+        return DayPartition(self.root / day, self.dicts)
+
+    def partitions(self, since: Optional[str] = None, until: Optional[str] = None) -> List[DayPartition]:
+        """Day partitions within [since, until] (YYYY-MM-DD, inclusive)."""
+        return [self.partition(d) for d in self.days()
+                if (since is None or d >= since) and (until is None or d <= until)]
+
+    def view(self, since: Optional[str] = None, until: Optional[str] = None) -> SigninView:
+        return SigninView(self.partitions(since, until))
+
+    def count(self) -> int:
+        return sum(int((read_json(self.root / d / "meta.json") or {}).get("rows", 0)) for d in self.days())
+
+    def newest(self) -> int:
+        """Latest sign-in epoch stored (0 when empty); only the newest partition is read."""
+        days = self.days()
+        if not days:
+            return 0
+        part = self.partition(days[-1])
+        try:
+            return max(part.cols["ts"], default=0)
+        finally:
+            part.close()
+
+    def codes_for(self, col: str, value: str, *, casefold: bool = False) -> List[int]:
+        """Dictionary codes equal to `value` (case-insensitively when casefold)."""
+        if not casefold:
+            code = self.dicts.codes[col].get(value)
+            return [] if code is None else [code]
+        folded = self._folded.get(col)
+        if folded is None:
+            folded = self._folded[col] = {}
+            for i, s in enumerate(self.dicts.values[col]):
+                folded.setdefault(s.casefold(), []).append(i)
+        return folded.get(value.casefold(), [])
+
+    def query(
+        self,
+        *,
+        user: Optional[str] = None,
+        upn: Optional[str] = None,
+        country: Optional[str] = None,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Sign-ins matching every given filter within [start, end] (epoch
+        seconds), newest first. Only partitions overlapping the range are
+        opened, newest day first, and rows come from the posting list of the
+        first filter given, so cost follows the matches, not the history.
+        """
+        filters: List[tuple] = []
+        if user:
+            filters.append(("user", self.codes_for("user", user)))
+        if upn:
+            filters.append(("upn", self.codes_for("upn", upn, casefold=True)))
+        if country:
+            filters.append(("country", self.codes_for("country", country.upper())))
+        if any(not codes for _col, codes in filters):
+            return []
+        lo = day_of(start) if start else None
+        hi = day_of(end) if end else None
+        out: List[Dict[str, Any]] = []
+        for day in reversed(self.days()):
+            if (lo and day < lo) or (hi and day > hi):
+                continue
+            part = self.partition(day)
+            try:
+                ts = part.cols["ts"]
+                rows = part.lookup(*filters[0]) if filters else range(part.rows)
+                rest = [(part.cols[col], set(codes)) for col, codes in filters[1:]]
+                hits = [i for i in rows
+                        if (start is None or ts[i] >= start) and (end is None or ts[i] <= end)
+                        and all(vals[i] in want for vals, want in rest)]
+                hits.sort(key=lambda i: ts[i], reverse=True)
+                out.extend(part.row(i) for i in hits)
+            finally:
+                part.close()
+            if limit and len(out) >= limit:
+                return out[:limit]
+        return out
@@ -128,9 +128,13 @@ class DisplayPanel(ttk.Frame):
     def _on_users_updated(self, evt):
         if not self._tenant_id or evt.get("tenant_id") != self._tenant_id:
             return
-        users = self._gw.get_users_index() if self._gw else []
-        self.after(0, lambda: self._populate_tree(users))
-        self.after(0, self._paint_user_box)
+        if "changes" not in evt:
+            # producer without row-level info: full reload
+            users = self._gw.get_users_index() if self._gw else []
+            self.after(0, lambda: self._populate_tree(users))
+            self.after(0, self._paint_user_box)
+            return
+        self.after(0, lambda: self._apply_row_changes(evt.get("changes") or {}, evt.get("removed") or []))
 
     def _on_org_ready(self, payload):
         if payload.get("tenant_id") == self._tenant_id:
@@ -151,6 +155,22 @@ class DisplayPanel(ttk.Frame):
         for u in users or []:
             self.tree.insert("", "end", iid=u.get("id"), values=(u.get("upn", ""), u.get("job_title", "")))
 
+    def _apply_row_changes(self, changes, removed):
+        """Patch only the rows an enrichment touched; the tree shows upn/job_title."""
+        for uid in removed:
+            if self.tree.exists(uid):
+                self.tree.delete(uid)
+        for uid, cols in changes.items():
+            if self.tree.exists(uid):
+                if "upn" in cols or "job_title" in cols:
+                    upn, job = self.tree.item(uid, "values") or ("", "")
+                    self.tree.item(uid, values=(cols.get("upn", upn), cols.get("job_title", job) or ""))
+            elif "upn" in cols:
+                self.tree.insert("", "end", iid=uid, values=(cols.get("upn", ""), cols.get("job_title") or ""))
+        sel = self.tree.selection()
+        if sel and (sel[0] in changes or sel[0] in removed):
+            self._paint_user_box()
+
     def _on_user_selected(self, _evt):
         has_sel = bool(self.tree.selection())
         for b in (self.btn_pw, self.btn_tap):
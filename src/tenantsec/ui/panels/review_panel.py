@@ -5,11 +5,14 @@ from typing import List, Dict
 from tenantsec.core.findings import Finding
 from tenantsec.app import job_runner
 from tenantsec.review.scanner import run_all_checks, org_rule_catalog, load_sheets_for_ai
+from tenantsec.core.cache import CacheLockTimeout
 from tenantsec.core.cache_manager import clear_all
 from tenantsec.ui.presenters.review_render import format_finding_to_text
 from tenantsec.ai.client import generate_exec_summary, generate_technical_report_md
 from tenantsec.ui.templates import list_themes
 
+CLEAR_TIMEOUT_SEC = 2.0   # Clear cache runs on the Tk thread; never wait out a writer
+
 
 # --- small utility to standardize async UI handoff ---
 def _run_in_bg(self, fn, *args, on_done=None, on_error=None, finally_fn=None):
@@ -377,9 +380,12 @@ class ReviewPanel(ttk.Frame):
         if not messagebox.askyesno("Confirm", f"Clear all cached data for tenant:\n{tid}?"):
             return
         try:
-            clear_all(tid)
+            # a writer finishing its commit holds the tenant lock for moments only
+            clear_all(tid, timeout=CLEAR_TIMEOUT_SEC)
             self._set_text("")  # clear current report view
             self.status.config(text="Cache cleared.")
+        except CacheLockTimeout:
+            self.status.config(text="Cache busy (a scan is saving data); try again in a moment.")
         except Exception as e:
             messagebox.showerror("Clear Cache failed", str(e))
 
@@ -10,6 +10,7 @@ from tenantsec.app import job_runner
 from tkinter import ttk, filedialog, messagebox
 
 from tenantsec.ai.client import AIConfigError
+from tenantsec.config.loader import get_scan_config
 
 class SettingsPanel(ttk.Frame):
     def __init__(self, master, event_bus_mod, app_state: "AppState"):
@@ -30,6 +31,7 @@ class SettingsPanel(ttk.Frame):
         event_bus.subscribe("data.core.ready", self._on_data_ready)
         event_bus.subscribe("org.info.ready", self._on_data_ready)
         event_bus.subscribe("users.list.updated", self._on_data_ready)
+        event_bus.subscribe("scan.plan", self._on_scan_plan)
 
     # ---------- UI build ----------
     def _build(self):
@@ -48,8 +50,17 @@ class SettingsPanel(ttk.Frame):
         ttk.Label(self, text="Client Secret").grid(row=3, column=0, sticky="e", padx=(0, 8), pady=(6, 0))
         self.ent_secret = ttk.Entry(self, show="*"); self.ent_secret.grid(row=3, column=1, sticky="ew", pady=(6, 0))
 
-        self.btn_connect = ttk.Button(self, text="Connect", command=self._on_connect)
-        self.btn_connect.grid(row=4, column=1, sticky="e", pady=(10, 0))
+        # profile selector and Connect share one row frame so they never overlap
+        prof_row = ttk.Frame(self); prof_row.grid(row=4, column=1, sticky="ew", pady=(10, 0))
+        ttk.Label(prof_row, text="Scan profile").pack(side="left", padx=(0, 6))
+        scan_cfg = get_scan_config()
+        self.var_profile = tk.StringVar(value=self.app_state.scan_profile or scan_cfg["default_profile"])
+        self.cmb_profile = ttk.Combobox(prof_row, textvariable=self.var_profile, state="readonly", width=12,
+                                        values=list(scan_cfg["profiles"]))
+        self.cmb_profile.pack(side="left")
+
+        self.btn_connect = ttk.Button(prof_row, text="Connect", command=self._on_connect)
+        self.btn_connect.pack(side="right", padx=(6, 0))
 
         creds = self.app_state.credentials
         self.ent_tenant.insert(0, creds.get("tenant_id", ""))
@@ -93,6 +104,7 @@ class SettingsPanel(ttk.Frame):
             "client_secret": self.ent_secret.get().strip(),
             "auth_mode": "app-only",
         }
+        self.app_state.scan_profile = self.var_profile.get() or None
         self.status.config(text="Connecting...")
         self.btn_connect.state(["disabled"])
         event_bus.publish("auth.connect.requested", creds)
@@ -109,6 +121,13 @@ class SettingsPanel(ttk.Frame):
             self.btn_connect.state(["!disabled"])
         self.after(0, ui)
 
+    def _on_scan_plan(self, plan):
+        def ui():
+            text = self.status.cget("text")
+            self.status.config(text=f"{text}  |  {plan['profile']} scan: {len(plan['datasets'])} datasets, "
+                                    f"~{plan['estimated_requests']} requests")
+        self.after(0, ui)
+
     # ---------- Data readiness → rebuild dynamic options ----------
     def _on_data_ready(self, _payload):
         self.after(0, self._rebuild_checklists)
@@ -7,6 +7,7 @@ from tenantsec.app import event_bus
 from tenantsec.ui.presenters.review_render import format_finding_to_text
 from tenantsec.review.user_scanner import load_user_sheets
 from tenantsec.review.user_scanner.sheets import load_user_sheets
+from tenantsec.review.user_scanner.ranking import load_ranking
 from tenantsec.ui.presenters.user_report_render import render_user_report
 
 class UserPanel(ttk.Frame):
@@ -19,6 +20,8 @@ class UserPanel(ttk.Frame):
         # Subscribe once
         event_bus.subscribe("user.review.ready", self._on_user_review_ready)
         event_bus.subscribe("user.review.failed", self._on_user_review_failed)
+        event_bus.subscribe("user.quickscan.ready", self._on_quick_scan_ready)
+        event_bus.subscribe("user.quickscan.failed", self._on_quick_scan_failed)
 
     def _build_layout(self):
         self.columnconfigure(0, weight=1)
@@ -29,6 +32,8 @@ class UserPanel(ttk.Frame):
 
         self.btn_run = ttk.Button(bar, text="Run User Checks", command=self._on_run)
         self.btn_run.pack(side="left")
+        self.btn_quick = ttk.Button(bar, text="Quick Estimate", command=self._on_quick)
+        self.btn_quick.pack(side="left", padx=(6, 0))
         ttk.Button(bar, text="Copy", command=self._on_copy).pack(side="left", padx=(6, 0))
         ttk.Button(bar, text="Save…", command=self._on_save).pack(side="left", padx=(6, 0))
 
@@ -80,6 +85,50 @@ class UserPanel(ttk.Frame):
 
 
 
+    def _on_quick(self):
+        tenant_id = self.app_state.credentials.get("tenant_id")
+        if not tenant_id:
+            messagebox.showwarning("Not connected", "Connect to a tenant first.")
+            return
+        if not hasattr(self.app_state, "orchestrator"):
+            messagebox.showerror("Setup error", "Orchestrator not attached to AppState.")
+            return
+        self.status.config(text="Sampling users…")
+        self.btn_quick.state(["disabled"])
+        event_bus.publish(
+            "jobs.callback.request",
+            lambda: self.app_state.orchestrator.start_quick_scan(tenant_id)
+        )
+
+    def _on_quick_scan_ready(self, report):
+        self.after(0, lambda: self._show_quick_scan(report))
+
+    def _show_quick_scan(self, report):
+        lines = [
+            "=== PySecCheck — Quick Posture Estimate ===",
+            f"Tenant: {report.get('tenant_id')}",
+            f"Sample: {report.get('sample_size')} of {report.get('population')} users "
+            f"in {report.get('strata')} strata ({report.get('signin_days')}d sign-ins, "
+            f"{int(report.get('confidence', 0.95) * 100)}% intervals)",
+            "",
+        ]
+        for e in report.get("estimates", []):
+            lines.append(f"[{str(e.get('severity', 'info')).upper()}] {e.get('title')}")
+            lines.append(f"  ~{e['prevalence'] * 100:.1f}% of users "
+                         f"({e['ci_low'] * 100:.1f}–{e['ci_high'] * 100:.1f}%), ≈{e['estimated_users']} users")
+        if not report.get("estimates"):
+            lines.append("No issues found in the sample. ✅")
+        for err in report.get("errors", []):
+            lines.append(f"  note: {err}")
+        self._set_text("\n".join(lines))
+        self.status.config(text=f"Quick estimate in {report.get('elapsed_sec')}s")
+        self.btn_quick.state(["!disabled"])
+
+    def _on_quick_scan_failed(self, payload):
+        messagebox.showerror("Quick estimate failed", payload.get("error", "Unknown error"))
+        self.status.config(text="Quick estimate failed")
+        self.btn_quick.state(["!disabled"])
+
     # replace BOTH definitions with this single one
     def _on_user_review_ready(self, payload):
         tid = payload.get("tenant_id")
@@ -150,5 +199,5 @@ class UserPanel(ttk.Frame):
             messagebox.showerror("Save failed", str(e))
 
     def _render_report(self, findings, tenant_id): 
-        return render_user_report(tenant_id, findings)
+        return render_user_report(tenant_id, findings, load_ranking(tenant_id))
 
@@ -1,8 +1,11 @@
 # src/tenantsec/ui/presenters/user_report_render.py
 from __future__ import annotations
+import time
 from collections import defaultdict
 from typing import List, Dict
+from tenantsec.core.cache import cache_dir, read_json
 from tenantsec.core.findings import Finding
+from tenantsec.review.user_scanner.signin_store import SigninStore, ARCHIVE_DIR
 
 CATEGORY_PREFIXES = {
     "🛡️ Authentication / Sign-in": ("user.signin.", "user.mfa."),
@@ -11,6 +14,8 @@ CATEGORY_PREFIXES = {
     "🛡️ Risk Indicators":         ("user.risk.",),
     "🛡️ Licensing / Usage":       ("user.license.",),
 }
+AUTH_CATEGORY = "🛡️ Authentication / Sign-in"
+RECENT_DAYS = 30
 
 def _user_key(f: Finding) -> str:
     # Try UPN from evidence; fall back to Finding title suffix or "Unknown"
@@ -28,11 +33,38 @@ def _cat_of(f: Finding) -> str:
         if any(fid.startswith(p) for p in prefs): return cat
     return "🛡️ Other"
 
-def render_user_report(tenant_id: str, findings: List[Finding]) -> str:
+def _priority_lines(ranking: Dict, top: int = 10) -> List[str]:
+    users = (ranking or {}).get("users") or []
+    if not users:
+        return []
+    lines = ["🎯 Priority — highest-risk users", ""]
+    for i, u in enumerate(users[:top], 1):
+        why = [f"{u[k]} {label}" for k, label in (("failed", "failed"), ("foreign_success", "foreign"),
+                                                   ("ca_failure", "CA blocked"), ("novelty", "novelty pts"),
+                                                   ("finding_points", "finding pts")) if u.get(k)]
+        lines.append(f"  {i:>2}. {u.get('upn')}  score {u.get('score')}  ({', '.join(why)})")
+    lines.append("")
+    return lines
+
+def _recent_signin_lines(archive: SigninStore, upn: str, since: int, home: str) -> List[str]:
+    # the archive's upn index only opens the partitions in range
+    entries = archive.query(upn=upn, start=since, limit=3)
+    if not entries:
+        return [f"    • No sign-ins archived in the last {RECENT_DAYS} days"]
+    out = [f"    Recent sign-ins ({RECENT_DAYS}d):"]
+    for e in entries:
+        ctry = (e.get("country") or "").upper()
+        flag = " ⚠" if home and ctry and ctry != home and e.get("status") == "success" else ""
+        out.append(f"      - {e.get('createdDateTime')} • {e.get('city')},{ctry} • {e.get('status')}"
+                   f" • {e.get('clientApp')} • {e.get('ip')}{flag}")
+    return out
+
+def render_user_report(tenant_id: str, findings: List[Finding], ranking: Dict | None = None) -> str:
     header = [
         "=== PySecCheck — User Security Review ===",
         f"Tenant: {tenant_id}",
         "",
+        *_priority_lines(ranking),
         "🧩 User Checks — Categorized",
         ""
     ]
@@ -44,6 +76,11 @@ def render_user_report(tenant_id: str, findings: List[Finding]) -> str:
     for f in findings:
         per_user[_user_key(f)][_cat_of(f)].append(f)
 
+    archive = SigninStore(tenant_id, ARCHIVE_DIR)
+    since = int(time.time()) - RECENT_DAYS * 86400
+    org = read_json(cache_dir(tenant_id, "USER") / "org.json") or {}
+    home = ((org.get("organization") or {}).get("country") or "").upper()
+
     lines = header[:]
     for upn in sorted(per_user.keys(), key=lambda s: s.lower()):
         lines.append(f"— {upn}")
@@ -56,7 +93,6 @@ def render_user_report(tenant_id: str, findings: List[Finding]) -> str:
                     lines.append("    • No evidence of risky sign-ins in the evaluated window")
                 else:
                     lines.append("    • No findings detected ✅")
-                continue
             for f in fs:
                 lines.append(f"    [{f.severity.upper()}] {f.title}")
                 lines.append(f"      • id: {f.id}")
@@ -68,6 +104,8 @@ def render_user_report(tenant_id: str, findings: List[Finding]) -> str:
                     for e in f.evidence:
                         kv = ", ".join(f"{k}={v}" for k, v in (e or {}).items() if v is not None)
                         lines.append(f"        - {kv}")
+            if cat == AUTH_CATEGORY and "@" in upn:
+                lines += _recent_signin_lines(archive, upn, since, home)
             lines.append("")  # gap after category
         lines.append("")      # gap after user
     return "\n".join(lines)